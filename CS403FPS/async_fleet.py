@@ -0,0 +1,135 @@
+"""
+Runs every rover in the fleet as a task on one asyncio event loop.
+
+Each rover is a coroutine (Rover.wait_for_command_async) waiting on its
+own asyncio.Queue, so an idle rover costs a Rover object and a queue
+instead of a whole process. Programs run on vm.run_async, which hands
+control back to the loop after every rover feature, so rovers with
+commands take turns one feature at a time. All rovers share one
+ProgramCache.
+
+Commands arrive on the transport.FLEET socket like with fleet.py, so
+main.py works the same with either. Only one of the two can run at a
+time. Run it with:
+    python async_fleet.py
+"""
+import asyncio
+import itertools
+
+import chunked_map
+import fleet_config
+import transport
+from command_queue import QueuedCommand
+from program_cache import ProgramCache
+from rover import (
+    COMMAND_QUEUE_SIZE,
+    MAP_FILE,
+    MAX_RUNTIME,
+    PROGRAM_CACHE_DIR,
+    PROGRAM_CACHE_SIZE,
+    Rover,
+)
+from shared_map import SharedMap
+
+
+class AsyncFleetListener(transport.CommandListener):
+    # Accepts on its own thread and hands commands over to the event loop
+    def __init__(self, fleet):
+        self.fleet = fleet
+        super().__init__(transport.FLEET, None)
+
+    def dispatch(self, message, reply):
+        future = asyncio.run_coroutine_threadsafe(
+            self.fleet.route(message.get("rover"), message["command"], reply),
+            self.fleet.loop,
+        )
+        return future.result()
+
+
+class AsyncFleet:
+    def __init__(self, rover_names, queue_size=COMMAND_QUEUE_SIZE, shared_map=None, output=None):
+        self.rover_names = rover_names
+        self.shared_map = shared_map
+        self.output = output
+        self.queue_size = queue_size
+        self.programs = ProgramCache(PROGRAM_CACHE_SIZE, PROGRAM_CACHE_DIR)
+        self.rovers = {}
+        self.queues = {}
+        self.seq = {rover_name: itertools.count(1) for rover_name in rover_names}
+        self.loop = None
+
+    def print(self, msg):
+        print(f"Fleet: {msg}")
+
+    async def route(self, rover_name, command, reply):
+        """Queues a command for the rover, returns (seq, queued)."""
+        commands = self.queues.get(rover_name)
+        if commands is None:
+            raise LookupError(f"Unknown rover name given: {rover_name}")
+
+        item = QueuedCommand(next(self.seq[rover_name]), command, self.replier(reply))
+        # Waits while the rover's queue is full
+        await commands.put(item)
+        return item.seq, commands.qsize()
+
+    def replier(self, reply):
+        # Sending the completion status blocks on the socket, keep it
+        # off the event loop
+        def reply_async(ok, error=None):
+            self.loop.run_in_executor(None, reply, ok, error)
+        return reply_async
+
+    async def run(self, runtime=MAX_RUNTIME):
+        self.loop = asyncio.get_running_loop()
+        for rover_name in self.rover_names:
+            self.rovers[rover_name] = Rover(
+                rover_name,
+                programs=self.programs,
+                shared_map=self.shared_map,
+                output=self.output,
+            )
+            self.queues[rover_name] = asyncio.Queue(self.queue_size)
+
+        listener = AsyncFleetListener(self)
+        listener.start()
+        self.print(
+            f"{len(self.rovers)} rovers on one event loop, "
+            f"listening on {transport.rover_address(transport.FLEET)}"
+        )
+
+        tasks = [
+            asyncio.ensure_future(rover.wait_for_command_async(self.queues[rover_name]))
+            for rover_name, rover in self.rovers.items()
+        ]
+        try:
+            await asyncio.wait_for(asyncio.gather(*tasks), runtime)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            listener.close()
+            self.print(f"Program cache: {self.programs}")
+
+
+def main():
+    config = fleet_config.load()
+    rover_names = fleet_config.rover_names(config)
+    chunked_map.check_writers(MAP_FILE, len(rover_names), fleet_config.shared_map(config))
+    shared_map = None
+    if fleet_config.shared_map(config):
+        shared_map = SharedMap.from_file(MAP_FILE)
+    fleet = AsyncFleet(
+        rover_names,
+        shared_map=shared_map,
+        output=fleet_config.output(config),
+    )
+    try:
+        asyncio.run(fleet.run())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if shared_map is not None:
+            shared_map.close()
+
+
+if __name__ == "__main__":
+    main()
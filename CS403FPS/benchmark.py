@@ -0,0 +1,78 @@
+"""
+Times rover programs on the tree walker and on the VM.
+
+Each program is parsed and checked once, then run with run() on the
+nodes of the tree and compiled and run with vm.run, best of a few
+repeats each. The rover uses the null output sink so printing doesn't
+count towards either.
+
+    python benchmark.py [repeats]
+
+The tree walker timed here is the current one, which already converts
+literals and resolves variables ahead of the run, so the speedups are
+smaller than against the tree walker rovers used before the VM.
+"""
+import random
+import sys
+import time
+
+import compiler
+import parser1 as parser
+import vm
+from parser_components import Context
+from rover import Rover
+
+PROGRAMS = {
+    "count": (
+        "{ int x ; int y ; x = 0 ; y = 0 ;"
+        " while ( x < 200000 ) { x = x + 1 ; y = y * 1 ; } }"
+    ),
+    "arithmetic": (
+        "{ int i ; int s ; i = 0 ; s = 0 ; while ( i < 200000 ) {"
+        " s = s + i * 2 - 1 ; if ( s > 1000 ) { s = s - 1000 ; } i = i + 1 ; } }"
+    ),
+    "blocks": (
+        "{ int i ; int s ; i = 0 ; s = 0 ; while ( i < 200000 ) {"
+        " int t ; { int u ; u = i ; t = u * 2 ; } s = s + t ; i = i + 1 ; } }"
+    ),
+    "move": (
+        "{ int i ; i = 0 ; while ( i < 20000 ) {"
+        " rover . turnRight ; rover . move_tile ; i = i + 1 ; } }"
+    ),
+}
+
+
+def best_of(repeats, func):
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        took = time.perf_counter() - start
+        best = took if best is None else min(best, took)
+    return best
+
+
+def run_tree(tree, context):
+    for child in tree.children:
+        child.run(context)
+
+
+def benchmark(source, rover, repeats=3):
+    """Returns the best (tree walk, VM) times in seconds for the source."""
+    tree = parser.get_parse_tree(source)
+    context = Context(rover)
+    tree.check_semantics(context)
+    program = compiler.compile_source(source)
+    return (
+        best_of(repeats, lambda: run_tree(tree, context)),
+        best_of(repeats, lambda: vm.run(program, rover)),
+    )
+
+
+if __name__ == "__main__":
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    rover = Rover("Bench", output="null", rng=random.Random(1))
+    print(f"{'program':<12} {'tree walk':>10} {'vm':>10} {'speedup':>8}")
+    for name, source in PROGRAMS.items():
+        tree_time, vm_time = benchmark(source, rover, repeats)
+        print(f"{name:<12} {tree_time:>9.3f}s {vm_time:>9.3f}s {tree_time / vm_time:>7.1f}x")
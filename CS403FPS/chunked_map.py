@@ -0,0 +1,265 @@
+"""
+World map stored on disk in fixed-size square chunks.
+
+For terrain too big to hold in memory, even one byte per tile, the map
+is kept in a chunk file and only a bounded number of chunks are
+resident at a time. A chunk is read the first time a tile in it is
+touched. The least recently used chunk is dropped when the cache is
+full, and written back to the file first if a tile in it changed.
+ChunkedMap has the same get/set/row/count/find/nth interface as a Grid,
+so the rover features don't know the difference.
+
+Chunk file layout:
+
+    magic        4 bytes   b"RVCH"
+    width        uint32
+    height       uint32
+    chunk size   uint16    chunks are chunk_size x chunk_size tiles
+    chunks       row of chunks by row of chunks, each chunk row by row,
+                 the chunks on the right and bottom edges are padded
+                 with walls
+
+Make one from a map file with:
+    python chunked_map.py map.txt world.chunks
+
+Changes are written back to the chunk file, so a chunk file can only be
+used by one rover at a time. check_writers() refuses it for a shared map
+or more than one rover.
+"""
+import collections
+import os
+import pathlib
+import struct
+import sys
+
+import grid
+
+MAGIC = b"RVCH"
+HEADER = struct.Struct("<4sIIH")
+
+# Tiles along each side of a chunk
+CHUNK_SIZE = 256
+
+# How many chunks a map keeps in memory (64 chunks of 256x256 is 4 MB)
+CACHE_CHUNKS = 64
+
+
+def is_chunk_file(path):
+    try:
+        with open(path, "rb") as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+def check_writers(path, rovers, shared_map=False):
+    """Raises ValueError if path is a chunk file that more than one rover,
+    or a shared map, would write back to."""
+    if (rovers > 1 or shared_map) and is_chunk_file(path):
+        raise ValueError(
+            f"{path} is a chunk file, changes are written back to it so only one "
+            f"rover can use it at a time and it can't be shared"
+        )
+
+
+def convert(source_path, path, chunk_size=CHUNK_SIZE):
+    """Writes the map file at source_path out as a chunk file."""
+    source = grid.load(source_path)
+    width, height = source.width, source.height
+    path = pathlib.Path(path)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with tmp.open("wb") as f:
+        f.write(HEADER.pack(MAGIC, width, height, chunk_size))
+        blank_row = grid.PAD_TILE * chunk_size
+        for top in range(0, height, chunk_size):
+            band = [
+                source.row(x).encode("ascii")
+                for x in range(top, min(top + chunk_size, height))
+            ]
+            padding = blank_row * (chunk_size - len(band))
+            for left in range(0, width, chunk_size):
+                f.write(b"".join(
+                    row[left:left + chunk_size].ljust(chunk_size, grid.PAD_TILE)
+                    for row in band
+                ))
+                f.write(padding)
+    os.replace(tmp, path)
+
+
+class ChunkedMap:
+    def __init__(self, path, cache_chunks=CACHE_CHUNKS):
+        self.path = path
+        self.file = open(path, "r+b")
+        magic, self.width, self.height, self.chunk_size = HEADER.unpack(
+            self.file.read(HEADER.size)
+        )
+        if magic != MAGIC:
+            self.file.close()
+            raise ValueError(f"{path} is not a chunk file")
+        self.chunks_across = -(-self.width // self.chunk_size)
+        self.chunk_bytes = self.chunk_size * self.chunk_size
+        self.cache_chunks = cache_chunks
+        # (chunk row, chunk column) -> bytearray, least recently used first
+        self.resident = collections.OrderedDict()
+        self.dirty = set()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.writebacks = 0
+
+    def offset(self, key):
+        row, column = key
+        return HEADER.size + (row * self.chunks_across + column) * self.chunk_bytes
+
+    def read_chunk(self, key):
+        self.file.seek(self.offset(key))
+        return bytearray(self.file.read(self.chunk_bytes))
+
+    def write_chunk(self, key, chunk):
+        self.file.seek(self.offset(key))
+        self.file.write(chunk)
+        self.dirty.discard(key)
+        self.writebacks += 1
+
+    def chunk(self, key):
+        """Returns the chunk, reading it in (and evicting another) on a miss."""
+        chunk = self.resident.get(key)
+        if chunk is not None:
+            self.hits += 1
+            self.resident.move_to_end(key)
+            return chunk
+
+        self.misses += 1
+        chunk = self.resident[key] = self.read_chunk(key)
+        if len(self.resident) > self.cache_chunks:
+            old_key, old_chunk = self.resident.popitem(last=False)
+            self.evictions += 1
+            if old_key in self.dirty:
+                self.write_chunk(old_key, old_chunk)
+        return chunk
+
+    def locate(self, x, y):
+        # Negative indices count from the end like they do on a Grid
+        if x < 0:
+            x += self.height
+        if y < 0:
+            y += self.width
+        if not (0 <= x < self.height and 0 <= y < self.width):
+            raise IndexError(f"Map position {[x, y]} is out of range")
+        size = self.chunk_size
+        return (x // size, y // size), (x % size) * size + y % size
+
+    def get(self, x, y):
+        key, i = self.locate(x, y)
+        return chr(self.chunk(key)[i])
+
+    def set(self, x, y, tile):
+        key, i = self.locate(x, y)
+        self.chunk(key)[i] = ord(tile)
+        self.dirty.add(key)
+
+    def row(self, x, start=0, end=None):
+        """Returns row x, or the tiles from start up to end in it."""
+        if x < 0:
+            x += self.height
+        end = self.width if end is None else min(end, self.width)
+        if start >= end:
+            return ""
+        (chunk_row, _), _ = self.locate(x, start)
+        size = self.chunk_size
+        offset = x % size * size
+        parts = []
+        for column in range(start // size, (end - 1) // size + 1):
+            chunk = self.chunk((chunk_row, column))
+            left = max(start - column * size, 0)
+            right = min(end - column * size, size)
+            parts.append(chunk[offset + left:offset + right])
+        return b"".join(parts).decode("ascii")
+
+    def rows(self):
+        for x in range(self.height):
+            yield self.row(x)
+
+    def scan_rows(self):
+        # Yields (x, row bytes) for every row without going through the
+        # chunk cache, so a full scan doesn't flush out the chunks the
+        # rover is working in. Resident chunks are used as they may have
+        # changes that aren't written back yet
+        size = self.chunk_size
+        for chunk_row in range(-(-self.height // size)):
+            chunks = []
+            for column in range(self.chunks_across):
+                key = (chunk_row, column)
+                chunk = self.resident.get(key)
+                chunks.append(chunk if chunk is not None else self.read_chunk(key))
+            for x in range(chunk_row * size, min((chunk_row + 1) * size, self.height)):
+                offset = x % size * size
+                row = b"".join(chunk[offset:offset + size] for chunk in chunks)
+                yield x, row[:self.width]
+
+    def count(self, tile):
+        """Returns how many tiles of the given type the map has."""
+        value = ord(tile)
+        return sum(row.count(value) for _, row in self.scan_rows())
+
+    def find(self, tile):
+        """Returns the (x, y) of every tile of the given type, row by row."""
+        value = ord(tile)
+        found = []
+        for x, row in self.scan_rows():
+            y = row.find(value)
+            while y != -1:
+                found.append((x, y))
+                y = row.find(value, y + 1)
+        return found
+
+    def nth(self, tile, n):
+        """Returns the (x, y) of the n-th tile of the given type, row by row."""
+        value = ord(tile)
+        for x, row in self.scan_rows():
+            in_row = row.count(value)
+            if n >= in_row:
+                n -= in_row
+                continue
+            y = row.find(value)
+            for _ in range(n):
+                y = row.find(value, y + 1)
+            return x, y
+        raise IndexError(f"The map has no {n}th {tile!r} tile")
+
+    def flush(self):
+        """Writes every changed chunk back to the chunk file."""
+        for key in sorted(self.dirty):
+            self.write_chunk(key, self.resident[key])
+        self.file.flush()
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "writebacks": self.writebacks,
+            "resident": len(self.resident),
+            "max_resident": self.cache_chunks,
+        }
+
+    def __str__(self):
+        stats = self.stats()
+        return (
+            f"{stats['hit_rate']:.1%} hit rate ({self.hits} hits, {self.misses} misses), "
+            f"{self.evictions} evictions, {self.writebacks} written back, "
+            f"{len(self.resident)}/{self.cache_chunks} chunks resident"
+        )
+
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (3, 4):
+        raise Exception("Usage: python chunked_map.py <map file> <chunk file> [chunk size]")
+    convert(sys.argv[1], sys.argv[2], *(int(arg) for arg in sys.argv[3:]))
+    print(f"Wrote {sys.argv[2]}")
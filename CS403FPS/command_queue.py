@@ -0,0 +1,62 @@
+"""
+Bounded FIFO of commands waiting to run on a rover.
+
+Every command gets a sequence number when it is queued. When the queue
+is full, put() blocks the sender instead of dropping anything, so a
+burst of commands is run back to back in the order it arrived.
+"""
+import itertools
+import queue
+import time
+
+
+class QueuedCommand:
+    __slots__ = ("seq", "command", "reply", "queued_at")
+
+    def __init__(self, seq, command, reply):
+        self.seq = seq
+        self.command = command
+        self.reply = reply
+        self.queued_at = time.monotonic()
+
+    @property
+    def wait_time(self):
+        return time.monotonic() - self.queued_at
+
+
+class CommandQueue:
+    def __init__(self, max_size):
+        self.commands = queue.Queue(max_size)
+        self.seq = itertools.count(1)
+        self.run_count = 0
+        self.max_depth = 0
+        self.total_wait = 0.0
+
+    def __len__(self):
+        return self.commands.qsize()
+
+    def put(self, command, reply=None):
+        """Queues a command, returns its sequence number and the queue depth."""
+        item = QueuedCommand(next(self.seq), command, reply)
+        self.commands.put(item)
+        depth = len(self)
+        self.max_depth = max(self.max_depth, depth)
+        return item.seq, depth
+
+    def get(self, timeout=None):
+        """Returns the oldest QueuedCommand, or None after timeout seconds."""
+        try:
+            item = self.commands.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        self.run_count += 1
+        self.total_wait += item.wait_time
+        return item
+
+    def stats(self):
+        return {
+            "depth": len(self),
+            "max_depth": self.max_depth,
+            "run": self.run_count,
+            "average_wait": self.total_wait / self.run_count if self.run_count else 0.0,
+        }
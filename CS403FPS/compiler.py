@@ -0,0 +1,306 @@
+"""
+Compiles the tree made by parser1.Program() into flat bytecode for vm.run.
+
+Every instruction is an (opcode, arg) tuple. Variables get a slot in one
+flat frame from the (depth, slot) address check_semantics resolved them
+to, so the VM never looks a name up, and control flow is turned into jumps to absolute instruction
+indices. The common `x < 3` / `x + y` / `x = y` shapes are fused into a
+single instruction as they are emitted, and int stores skip the int()
+conversion when the value is already known to be an int. compile_source runs the tree through
+optimizer.optimize first.
+"""
+import optimizer
+import parser1 as parser
+from parser_components import (
+    BINARY_OPERATORS,
+    STMT_ASSIGN,
+    STMT_BLOCK,
+    STMT_FEATURE,
+    STMT_IF,
+    STMT_INCREMENT,
+    STMT_WHILE,
+    UNARY_OPERATORS,
+    Context,
+    LocNode,
+)
+
+# Opcodes
+LOAD_CONST = 0          # push arg
+LOAD = 1                # push slots[arg]
+STORE = 2               # slots[arg] = pop()
+STORE_INT = 3           # slots[arg] = int(pop())
+LOAD_ELEM = 4           # arg = (slot, ndims), pops the indices
+STORE_ELEM = 5          # arg = (slot, ndims, is_int), pops the value then the indices
+INIT = 6                # slots[arg] = None, run on every block entry
+INIT_ARRAY = 7          # arg = (slot, dims), builds a fresh nested list
+BINARY = 8              # arg = operator index, applied to the top two values
+BINARY_CONST = 9        # arg = (operator index, constant right operand)
+LOAD_BINARY_CONST = 10  # arg = (slot, operator index, constant right operand)
+UNARY = 11              # arg = operator index, applied to the top value
+JUMP = 12               # pc = arg
+JUMP_IF_FALSE = 13      # pc = arg when pop() is falsy
+FEATURE = 14            # calls the rover method at features[arg]
+SWITCH_MAP = 15         # rover.switch_map(arg)
+# Fused forms of LOAD_BINARY_CONST followed by a jump or a store
+TEST_CONST_JUMP = 16    # arg = (slot, operator index, constant, target)
+BINARY_CONST_STORE = 17 # arg = (slot, operator index, constant, target slot, is_int)
+INCREMENT = 18          # arg = (slot, constant), slots[slot] += constant
+# Fused forms of two loads and a binary operator, alone or followed by a
+# jump or a store, and of a load followed by a store
+LOAD_BINARY = 19        # arg = (slot, operator index, right slot)
+TEST_JUMP = 20          # arg = (slot, operator index, right slot, target)
+BINARY_STORE = 21       # arg = (slot, operator index, right slot, target slot, is_int)
+MOVE = 22               # arg = (slot, target slot, is_int)
+
+OPNAMES = {
+    value: name
+    for name, value in list(globals().items())
+    if name.isupper() and isinstance(value, int)
+}
+
+# Bump whenever the instruction set or its arguments change, so stale
+# precompiled .rvc files are ignored
+BYTECODE_VERSION = 3
+
+
+# BINARY and UNARY instructions refer to the operators by their index in
+# these tables so the bytecode stays plain data
+BINARY_OPS = {vocab: index for index, (vocab, _) in enumerate(BINARY_OPERATORS)}
+UNARY_OPS = {vocab: index for index, (vocab, _) in enumerate(UNARY_OPERATORS)}
+
+
+class CodeObject:
+    """A compiled rover program.
+
+    code is the list of (opcode, arg) instructions, nslots the size of
+    the variable frame and features the rover method names FEATURE
+    instructions index into. removed is how many nodes the optimizer
+    took out of the tree, None when it's not known (e.g. the program
+    was loaded from a .rvc file).
+    """
+    __slots__ = ("code", "nslots", "features", "removed")
+
+    def __init__(self, code, nslots, features, removed=None):
+        self.code = code
+        self.nslots = nslots
+        self.features = features
+        self.removed = removed
+
+    def dis(self):
+        """Returns a readable listing of the bytecode."""
+        lines = []
+        for pc, (op, arg) in enumerate(self.code):
+            if op == FEATURE:
+                arg = f"{arg} ({self.features[arg]})"
+            lines.append(f"{pc:>5} {OPNAMES[op]:<14} {'' if arg is None else arg}")
+        return "\n".join(lines)
+
+
+class Compiler:
+    def __init__(self):
+        self.code = []
+        # (first slot, number of slots) of the frame of every block being
+        # compiled, by depth
+        self.frames = []
+        self.nslots = 0
+        self.features = []
+        # Instructions before this index may be jumped over, so they
+        # are never fused with what comes after
+        self.barrier = 0
+
+    def emit(self, op, arg=None):
+        self.code.append((op, arg))
+        return len(self.code) - 1
+
+    def emit_binary(self, index):
+        code = self.code
+        if len(code) - 1 >= self.barrier and code[-1][0] == LOAD_CONST:
+            const = code.pop()[1]
+            if len(code) - 1 >= self.barrier and code[-1][0] == LOAD:
+                self.emit(LOAD_BINARY_CONST, (code.pop()[1], index, const))
+            else:
+                self.emit(BINARY_CONST, (index, const))
+        elif len(code) - 2 >= self.barrier and code[-1][0] == LOAD and code[-2][0] == LOAD:
+            right = code.pop()[1]
+            self.emit(LOAD_BINARY, (code.pop()[1], index, right))
+        else:
+            self.emit(BINARY, index)
+
+    def emit_jump_if_false(self):
+        code = self.code
+        if len(code) - 1 >= self.barrier:
+            if code[-1][0] == LOAD_BINARY_CONST:
+                return self.emit(TEST_CONST_JUMP, code.pop()[1] + (None,))
+            if code[-1][0] == LOAD_BINARY:
+                return self.emit(TEST_JUMP, code.pop()[1] + (None,))
+        return self.emit(JUMP_IF_FALSE)
+
+    def emit_store(self, slot, is_int):
+        code = self.code
+        last = code[-1][0] if len(code) - 1 >= self.barrier else None
+        if last == LOAD_BINARY_CONST:
+            self.emit(BINARY_CONST_STORE, code.pop()[1] + (slot, is_int))
+        elif last == LOAD_BINARY:
+            self.emit(BINARY_STORE, code.pop()[1] + (slot, is_int))
+        elif last == LOAD:
+            self.emit(MOVE, (code.pop()[1], slot, is_int))
+        elif is_int:
+            self.emit(STORE_INT, slot)
+        else:
+            self.emit(STORE, slot)
+
+    def label(self):
+        self.barrier = len(self.code)
+        return self.barrier
+
+    def patch(self, index, target):
+        op, arg = self.code[index]
+        if op in (TEST_CONST_JUMP, TEST_JUMP):
+            target = arg[:3] + (target,)
+        self.code[index] = (op, target)
+
+    def slot(self, address):
+        depth, slot = address
+        return self.frames[depth][0] + slot
+
+    def feature_index(self, name):
+        if name not in self.features:
+            self.features.append(name)
+        return self.features.index(name)
+
+    def compile(self, node):
+        return getattr(self, f"compile_{type(node).__name__}")(node)
+
+    #<program>  ::= <block>
+    def compile_ProgramNode(self, node):
+        for child in node.children:
+            self.compile(child)
+        return CodeObject(self.code, self.nslots, tuple(self.features))
+
+    #<block>    ::= { <decls> <stmts> }
+    def compile_BlockNode(self, node):
+        # A block's slots come after its enclosing block's, blocks side
+        # by side share the same slots
+        base = sum(self.frames[-1]) if self.frames else 0
+        self.frames.append((base, node.nslots))
+        self.nslots = max(self.nslots, base + node.nslots)
+        self.compile(node.children[0])
+        self.compile(node.children[1])
+        self.frames.pop()
+
+    def compile_DeclsNode(self, node):
+        for decl in node.children:
+            self.compile(decl)
+
+    #<decl>     ::= <type> ID ;
+    def compile_DeclNode(self, node):
+        slot = self.slot(node.address)
+        if node.dims:
+            self.emit(INIT_ARRAY, (slot, node.dims))
+        else:
+            self.emit(INIT, slot)
+
+    def compile_StmtsNode(self, node):
+        for stmt in node.children:
+            self.compile(stmt)
+
+    def compile_StmtNode(self, node):
+        kind = node.kind
+
+        #<loc> = <bool> ;
+        if kind == STMT_ASSIGN:
+            loc = node.children[0]
+            value = node.children[2]
+            slot, ndims = self.compile_indices(loc)
+            self.compile(value)
+            if ndims:
+                self.emit(STORE_ELEM, (slot, ndims, loc.ttype == 'int'))
+            else:
+                self.emit_store(slot, loc.ttype == 'int' and needs_int(value))
+
+        #<loc> = <loc> + constant ;
+        elif kind == STMT_INCREMENT:
+            self.emit(INCREMENT, (self.slot(node.children[0].address), node.children[2].value))
+
+        #<block>
+        elif kind == STMT_BLOCK:
+            self.compile(node.children[0])
+
+        #ROVER . <feature> ;
+        elif kind == STMT_FEATURE:
+            self.compile(node.children[1])
+
+        #IF ( <bool> ) <stmt> [ELSE <stmt>]
+        elif kind == STMT_IF:
+            self.compile(node.children[1])
+            jump_else = self.emit_jump_if_false()
+            self.compile(node.children[2])
+            if len(node.children) > 3:
+                jump_end = self.emit(JUMP)
+                self.patch(jump_else, self.label())
+                self.compile(node.children[4])
+                self.patch(jump_end, self.label())
+            else:
+                self.patch(jump_else, self.label())
+
+        #WHILE ( <bool> ) <stmt>
+        elif kind == STMT_WHILE:
+            top = self.label()
+            self.compile(node.children[1])
+            jump_end = self.emit_jump_if_false()
+            self.compile(node.children[2])
+            self.emit(JUMP, top)
+            self.patch(jump_end, self.label())
+
+    def compile_FeatureNode(self, node):
+        if node.map_number is not None:
+            self.emit(SWITCH_MAP, node.map_number)
+        else:
+            self.emit(FEATURE, self.feature_index(node.method))
+
+    # Pushes the subscripts of a <loc>, returns its slot and the number
+    # of subscripts that were pushed
+    def compile_indices(self, node):
+        for index in node.subscripts:
+            self.compile(index)
+        return self.slot(node.address), len(node.subscripts)
+
+    def compile_LocNode(self, node):
+        slot, ndims = self.compile_indices(node)
+        if ndims:
+            self.emit(LOAD_ELEM, (slot, ndims))
+        else:
+            self.emit(LOAD, slot)
+
+    def compile_BinaryNode(self, node):
+        self.compile(node.children[0])
+        self.compile(node.children[1])
+        self.emit_binary(BINARY_OPS[node.token.ttype])
+
+    def compile_UnaryNode(self, node):
+        self.compile(node.children[0])
+        self.emit(UNARY, UNARY_OPS[node.token.ttype])
+
+    def compile_LiteralNode(self, node):
+        self.emit(LOAD_CONST, node.value)
+
+
+# An int expression that isn't a plain variable always works out to an
+# int, a variable may still be unset and int() has to raise for it
+def needs_int(node):
+    return node.ttype != 'int' or isinstance(node, LocNode)
+
+
+def compile_program(tree):
+    """Returns the CodeObject for a semantically checked ProgramNode."""
+    return Compiler().compile(tree)
+
+
+def compile_source(source):
+    """Parses, checks, optimizes and compiles program source into a CodeObject."""
+    tree = parser.get_parse_tree(source)
+    tree.check_semantics(Context())
+    removed = optimizer.optimize(tree)
+    program = compile_program(tree)
+    program.removed = removed
+    return program
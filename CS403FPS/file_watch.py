@@ -0,0 +1,110 @@
+"""
+Blocks until a command file changes instead of sleeping and re-reading it.
+
+On Linux the directory holding the file is watched with inotify (called
+through ctypes, no extra packages needed), so the watcher sleeps in the
+kernel until the file is written or renamed into place. Everywhere else
+the file is polled with os.stat, which only looks at the mtime and size
+and never opens the file.
+"""
+import ctypes
+import ctypes.util
+import os
+import pathlib
+import select
+import struct
+import time
+
+# Seconds between os.stat calls for the polling fallback
+STAT_INTERVAL = 0.05
+
+# inotify event masks from <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+EVENT_HEADER = struct.Struct("iIII")
+
+
+class InotifyWatcher:
+    def __init__(self, path):
+        self.path = pathlib.Path(path)
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        # Raises AttributeError when libc has no inotify (not Linux)
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+        # Watch the directory, the file itself is replaced by renames
+        watch = libc.inotify_add_watch(
+            self.fd,
+            os.fsencode(self.path.parent),
+            IN_CLOSE_WRITE | IN_MOVED_TO,
+        )
+        if watch < 0:
+            os.close(self.fd)
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {self.path.parent}")
+
+    def wait(self, timeout=None):
+        """Returns True once the file was written, False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        name = os.fsencode(self.path.name)
+        while True:
+            remaining = None if deadline is None else max(0, deadline - time.monotonic())
+            readable, _, _ = select.select([self.fd], [], [], remaining)
+            if not readable:
+                return False
+            try:
+                data = os.read(self.fd, 4096)
+            except BlockingIOError:
+                continue
+
+            offset = 0
+            while offset < len(data):
+                _, _, _, length = EVENT_HEADER.unpack_from(data, offset)
+                offset += EVENT_HEADER.size
+                event_name = data[offset:offset + length].rstrip(b"\0")
+                offset += length
+                if event_name == name:
+                    return True
+
+    def close(self):
+        os.close(self.fd)
+
+
+class StatWatcher:
+    def __init__(self, path, interval=STAT_INTERVAL):
+        self.path = pathlib.Path(path)
+        self.interval = interval
+        self.last = self.snapshot()
+
+    def snapshot(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def wait(self, timeout=None):
+        """Returns True once the file changed, False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            current = self.snapshot()
+            if current != self.last:
+                self.last = current
+                return True
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(self.interval)
+
+    def close(self):
+        pass
+
+
+def watch(path):
+    """Returns the best available watcher for path."""
+    try:
+        return InotifyWatcher(path)
+    except (AttributeError, OSError, TypeError):
+        return StatWatcher(path)
@@ -0,0 +1,394 @@
+"""
+Runs a large fleet of rovers on a pool of worker processes.
+
+Instead of one process per rover, the rovers registered in fleet.json
+are spread over one worker process per CPU. Each worker hosts many
+rovers and runs an event loop: it sleeps on its pipe to the supervisor,
+queues incoming commands per rover and runs them one at a time, taking
+turns between the rovers that have work.
+
+The supervisor listens on the transport.FLEET socket, routes every
+command to the worker hosting the named rover and relays the ack and
+completion status back to the controller. It also watches the worker
+processes, a worker that dies is restarted with fresh rovers and the
+commands it still had are reported as failed. On a shared map the
+markers of the dead rovers are cleared before the fresh ones spawn.
+Restarts wait RESTART_DELAY, doubled for every time in a row the worker
+died before its rovers were up. A worker that does that
+MAX_STARTUP_FAILURES times in a row, or dies more than MAX_RESTARTS
+times in all, is left down and commands for its rovers are refused.
+
+Commands are handed to a worker through its outbox, drained by a sender
+thread per worker, so a worker that is slow to read its pipe only holds
+up its own rovers.
+
+Run it with:
+    python fleet.py
+and send commands with main.py as usual.
+"""
+import collections
+import itertools
+import multiprocessing
+import multiprocessing.connection
+import os
+import queue
+import threading
+import time
+
+import chunked_map
+import fleet_config
+import transport
+from rover import MAP_FILE, MAX_RUNTIME, Rover
+from shared_map import SharedMap
+
+# How long the supervisor waits for a worker to exit when shutting down
+SHUTDOWN_TIMEOUT = 5
+
+# Seconds before a dead worker is started again, doubled for every
+# startup failure in a row up to MAX_RESTART_DELAY
+RESTART_DELAY = 0.5
+MAX_RESTART_DELAY = 30
+
+# A worker is given up on after dying this many times in a row before
+# its rovers were up, or this many times in all
+MAX_STARTUP_FAILURES = 5
+MAX_RESTARTS = 50
+
+# Sent by a worker once its rovers are up
+READY = "ready"
+
+
+def run_worker(rover_names, conn, shared_map=None, output=None):
+    # Messages from the supervisor are (request_id, rover_name, command),
+    # None stops the worker. Results go back as (request_id, ok, error),
+    # after READY once the rovers are up
+    rovers = {
+        rover_name: Rover(rover_name, shared_map=shared_map, output=output)
+        for rover_name in rover_names
+    }
+    try:
+        conn.send(READY)
+    except OSError:
+        return
+    commands = {rover_name: collections.deque() for rover_name in rover_names}
+    # Rovers with commands waiting, in the order they get a turn
+    ready = collections.deque()
+
+    try:
+        while True:
+            # Only block on the pipe when no rover has anything to do
+            timeout = 0 if ready else None
+            try:
+                while conn.poll(timeout):
+                    message = conn.recv()
+                    if message is None:
+                        return
+                    request_id, rover_name, command = message
+                    if not commands[rover_name]:
+                        ready.append(rover_name)
+                    commands[rover_name].append((request_id, command))
+                    timeout = 0
+            except (EOFError, OSError):
+                # The supervisor went away
+                return
+
+            rover_name = ready.popleft()
+            request_id, command = commands[rover_name].popleft()
+            ok, error = rovers[rover_name].run_command(command)
+            if commands[rover_name]:
+                ready.append(rover_name)
+            try:
+                conn.send((request_id, ok, error))
+            except OSError:
+                return
+    finally:
+        if shared_map is not None:
+            shared_map.close()
+
+
+class Worker:
+    def __init__(self, index, rover_names, shared_map=None, output=None):
+        self.index = index
+        self.rover_names = rover_names
+        self.shared_map = shared_map
+        self.output = output
+        self.process = None
+        self.conn = None
+        self.restarts = 0
+        # Set once the process sent READY
+        self.ready = False
+        # Times in a row the process died before it was ready
+        self.startup_failures = 0
+        # Set from the worker's death until it's started again, with the
+        # time.monotonic() to do that at
+        self.down = False
+        self.respawn_at = None
+        self.given_up = False
+        # Bumped on every restart, messages queued for an older process
+        # were already reported as failed and are dropped
+        self.generation = 0
+        # (generation, message) waiting for the sender thread, None stops it
+        self.outbox = queue.Queue()
+        self.sender = threading.Thread(
+            target=self.send_messages, name=f"fleet-worker-{index}-sender", daemon=True
+        )
+        # Held while replacing the process, and by the sender while it
+        # picks the connection to send on
+        self.lock = threading.Lock()
+
+    def start(self):
+        if self.sender.ident is None:
+            self.sender.start()
+        self.ready = False
+        self.conn, child = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(
+            target=run_worker,
+            args=(self.rover_names, child, self.shared_map, self.output),
+            name=f"fleet-worker-{self.index}",
+            daemon=True,
+        )
+        self.process.start()
+        child.close()
+
+    def send(self, generation, message):
+        self.outbox.put((generation, message))
+
+    def send_messages(self):
+        while True:
+            item = self.outbox.get()
+            if item is None:
+                message = None
+            else:
+                generation, message = item
+            with self.lock:
+                if item is not None and generation != self.generation:
+                    continue
+                conn = self.conn
+            try:
+                conn.send(message)
+            except OSError:
+                # The worker just died, restart() fails the command
+                pass
+            if message is None:
+                return
+
+    def stop(self):
+        # Sent after any commands still in the outbox
+        self.outbox.put(None)
+        self.sender.join(SHUTDOWN_TIMEOUT)
+        self.process.join(SHUTDOWN_TIMEOUT)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.conn.close()
+
+
+class FleetListener(transport.CommandListener):
+    def __init__(self, fleet):
+        self.fleet = fleet
+        super().__init__(transport.FLEET, None)
+
+    def dispatch(self, message, reply):
+        return self.fleet.route(message.get("rover"), message["command"], reply)
+
+
+class Fleet:
+    def __init__(self, rover_names, workers=None, shared_map=None, output=None):
+        workers = min(workers or os.cpu_count() or 1, len(rover_names))
+        self.shared_map = shared_map
+        self.workers = [
+            Worker(index, rover_names[index::workers], shared_map, output)
+            for index in range(workers)
+        ]
+        self.routes = {
+            rover_name: worker
+            for worker in self.workers
+            for rover_name in worker.rover_names
+        }
+        self.seq = {rover_name: itertools.count(1) for rover_name in rover_names}
+        self.queued = collections.Counter()
+        self.request_ids = itertools.count(1)
+        # request_id -> (worker, rover_name, reply)
+        self.pending = {}
+        self.lock = threading.Lock()
+        self.listener = None
+        self.stopped = threading.Event()
+
+    def print(self, msg):
+        print(f"Fleet: {msg}")
+
+    def route(self, rover_name, command, reply):
+        """Hands a command to the worker hosting the rover, returns (seq, queued)."""
+        worker = self.routes.get(rover_name)
+        if worker is None:
+            raise LookupError(f"Unknown rover name given: {rover_name}")
+
+        with self.lock:
+            if worker.given_up:
+                raise LookupError(f"{rover_name} is unavailable, its worker kept crashing")
+            if worker.down:
+                raise LookupError(f"{rover_name} is restarting after its worker crashed, try again")
+            request_id = next(self.request_ids)
+            self.pending[request_id] = (worker, rover_name, reply)
+            self.queued[rover_name] += 1
+            seq, queued = next(self.seq[rover_name]), self.queued[rover_name]
+            generation = worker.generation
+        worker.send(generation, (request_id, rover_name, command))
+        return seq, queued
+
+    def finish(self, request_id, ok, error):
+        with self.lock:
+            entry = self.pending.pop(request_id, None)
+            if entry is None:
+                return
+            _, rover_name, reply = entry
+            self.queued[rover_name] -= 1
+        if reply is not None:
+            reply(ok, error)
+
+    def receive(self, worker):
+        message = worker.conn.recv()
+        if message == READY:
+            worker.ready = True
+            worker.startup_failures = 0
+        else:
+            self.finish(*message)
+
+    def restart(self, worker):
+        """Cleans up after a dead worker and schedules its restart, see respawn()."""
+        with worker.lock:
+            # Collect whatever finished before the worker died
+            try:
+                while worker.conn.poll(0):
+                    self.receive(worker)
+            except (EOFError, OSError):
+                pass
+            worker.conn.close()
+
+            with self.lock:
+                lost = [
+                    request_id
+                    for request_id, (owner, _, _) in self.pending.items()
+                    if owner is worker
+                ]
+                # Whatever is still in the outbox is in lost
+                worker.generation += 1
+                # route() refuses the worker's rovers until respawn()
+                worker.down = True
+            exitcode = worker.process.exitcode
+            for request_id in lost:
+                self.finish(
+                    request_id,
+                    False,
+                    f"Worker {worker.index} crashed (exit code {exitcode}), its rovers were restarted",
+                )
+
+            # The dead rovers' markers would stay on the map for good
+            if self.shared_map is not None:
+                for rover_name in worker.rover_names:
+                    self.shared_map.remove_rover(rover_name)
+
+            worker.restarts += 1
+            if not worker.ready:
+                worker.startup_failures += 1
+            if worker.startup_failures >= MAX_STARTUP_FAILURES or worker.restarts > MAX_RESTARTS:
+                self.print(
+                    f"Worker {worker.index} died (exit code {exitcode}) {worker.restarts} times, "
+                    f"{worker.startup_failures} in a row before its rovers were up. Giving up on "
+                    f"it, {', '.join(worker.rover_names)} won't take commands"
+                )
+                worker.given_up = True
+                return
+
+            delay = RESTART_DELAY
+            if worker.startup_failures:
+                delay = min(RESTART_DELAY * 2 ** (worker.startup_failures - 1), MAX_RESTART_DELAY)
+            worker.respawn_at = time.monotonic() + delay
+            self.print(
+                f"Worker {worker.index} died (exit code {exitcode}), restarting it "
+                f"with {len(worker.rover_names)} rovers in {delay:g}s ({worker.restarts} restarts)"
+            )
+
+    def respawn(self, worker):
+        with worker.lock:
+            worker.respawn_at = None
+            worker.start()
+            with self.lock:
+                worker.down = False
+
+    def start(self):
+        for worker in self.workers:
+            worker.start()
+        self.listener = FleetListener(self)
+        self.listener.start()
+        self.print(
+            f"{len(self.routes)} rovers on {len(self.workers)} workers, "
+            f"listening on {transport.rover_address(transport.FLEET)}"
+        )
+
+    def supervise(self, runtime=MAX_RUNTIME):
+        # Sleeps until a worker reports a result or a worker process exits
+        # or a dead worker is due to be started again
+        deadline = time.monotonic() + runtime
+        while time.monotonic() < deadline and not self.stopped.is_set():
+            waitables = {}
+            wake = deadline
+            for worker in self.workers:
+                if worker.given_up:
+                    continue
+                if worker.down:
+                    if worker.respawn_at > time.monotonic():
+                        wake = min(wake, worker.respawn_at)
+                        continue
+                    self.respawn(worker)
+                waitables[worker.conn] = worker
+                waitables[worker.process.sentinel] = worker
+            if wake == deadline and not waitables:
+                self.print("Every worker was given up on, stopping")
+                return
+
+            timeout = max(0, wake - time.monotonic())
+            for ready in multiprocessing.connection.wait(list(waitables), timeout):
+                worker = waitables[ready]
+                if ready is worker.conn:
+                    try:
+                        self.receive(worker)
+                    except (EOFError, OSError):
+                        # The sentinel reports the crash
+                        pass
+                elif not worker.process.is_alive() and not self.stopped.is_set():
+                    self.restart(worker)
+
+    def stop(self):
+        self.stopped.set()
+        if self.listener is not None:
+            self.listener.close()
+        for worker in self.workers:
+            worker.stop()
+        if self.shared_map is not None:
+            self.shared_map.close()
+
+
+def main():
+    config = fleet_config.load()
+    rover_names = fleet_config.rover_names(config)
+    chunked_map.check_writers(MAP_FILE, len(rover_names), fleet_config.shared_map(config))
+    shared_map = None
+    if fleet_config.shared_map(config):
+        shared_map = SharedMap.from_file(MAP_FILE, rover_names)
+    fleet = Fleet(
+        rover_names,
+        fleet_config.worker_count(config),
+        shared_map,
+        fleet_config.output(config),
+    )
+    fleet.start()
+    try:
+        fleet.supervise()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        fleet.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Reads the fleet configuration (fleet.json) that registers the rovers.
+
+    rovers     names of the rovers to create
+    generate   {"prefix": "Sim", "count": 200} adds Sim1 .. Sim200,
+               handy for simulating a large fleet
+    workers    how many worker processes the fleet supervisor starts,
+               null means one per CPU
+    shared_map whether the rovers share one map, or each get their own
+               copy of map.txt (default) and can switch_map
+    output     where the rovers' output goes, "text" (default), "json"
+               or "null" (see output_sink.py)
+
+A missing file gives the two default rovers.
+"""
+import json
+import pathlib
+
+FLEET_CONFIG = pathlib.Path(pathlib.Path(__file__).parent.resolve(), "fleet.json")
+
+DEFAULT_ROVERS = ["Rover1", "Rover2"]
+
+
+def load(path=FLEET_CONFIG):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def rover_names(config):
+    names = list(config.get("rovers", DEFAULT_ROVERS))
+    generate = config.get("generate") or {}
+    prefix = generate.get("prefix", "Sim")
+    names += [f"{prefix}{i}" for i in range(1, generate.get("count", 0) + 1)]
+
+    seen = set()
+    for name in names:
+        if name in seen:
+            raise ValueError(f"Rover {name} is registered more than once in the fleet config")
+        seen.add(name)
+    return names
+
+
+def worker_count(config):
+    return config.get("workers") or None
+
+
+def shared_map(config):
+    return config.get("shared_map", False)
+
+
+def output(config):
+    return config.get("output", "text")
@@ -0,0 +1,243 @@
+"""
+Map grid stored as one flat buffer, one byte per tile.
+
+Tile (x, y) lives at x * stride + y, x being the row and y the column
+like rover positions. stride is the width for maps held in memory, a
+memory mapped file (see load()) keeps its line breaks so its stride is
+the width plus the newline. A bytearray costs one byte per tile where the old
+list of lists of one character strings cost 50+, so maps in the
+10000x10000 range fit in memory.
+
+count() and find() for the tile types in INDEXED_TILES are answered from
+an index of where those tiles are, built the first time a type is asked
+for and kept up to date by set(), so they cost O(result). Other types
+are scanned for over the whole buffer in C, with NumPy when it's
+installed and with bytearray.count and bytearray.find when it isn't.
+"""
+import mmap
+import os
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Tile used to pad rows shorter than the widest row of a map file
+PAD_TILE = b"X"
+
+# Tiles the rovers look up by type (nodes, waypoints and caches). Empty
+# tiles aren't indexed, on a large map the index would take more memory
+# than the map itself
+INDEXED_TILES = "DWC"
+
+# How many bytes of a buffer without count/find (e.g. a memory mapped
+# file) are copied at a time when scanning it without NumPy
+SCAN_CHUNK = 1 << 24
+
+
+def read_tiles(path):
+    """Returns (width, height, tiles) for a map file.
+
+    A trailing newline at the end of the file is ignored and shorter
+    rows are padded with walls.
+    """
+    with open(path, "rb") as m:
+        rows = [line.rstrip(b"\r\n") for line in m]
+    width = max((len(row) for row in rows), default=0)
+    tiles = bytearray(b"".join(row.ljust(width, PAD_TILE) for row in rows))
+    return width, len(rows), tiles
+
+
+def map_file(path):
+    """Returns a Grid over the memory mapped map file.
+
+    Only the pages holding tiles the rover touches are ever read, and
+    changed tiles are copy-on-write, the file itself is never modified.
+    Returns None when the rows aren't all the same width, the file
+    needs to be read with Grid.from_file then. Like read_tiles(), a
+    trailing newline is ignored.
+    """
+    with open(path, "rb") as m:
+        size = os.fstat(m.fileno()).st_size
+        if size == 0:
+            return None
+        tiles = mmap.mmap(m.fileno(), 0, access=mmap.ACCESS_COPY)
+
+    first = tiles.find(b"\n")
+    if first == -1:
+        return Grid(size, 1, tiles, stride=size)
+    newline = b"\r\n" if first > 0 and tiles[first - 1] == ord("\r") else b"\n"
+    width = first + 1 - len(newline)
+    stride = width + len(newline)
+    if tiles[size - len(newline):] == newline:
+        size -= len(newline)
+    height = (size + len(newline)) // stride
+
+    # Spot check a few line breaks instead of reading the whole file
+    if (size + len(newline)) % stride != 0 or any(
+        tiles[x * stride + width:(x + 1) * stride] != newline
+        for x in {0, height // 2, height - 2}
+        if 0 <= x < height - 1
+    ):
+        tiles.close()
+        return None
+    return Grid(width, height, tiles, stride=stride)
+
+
+def load(path):
+    """Returns the Grid for a map file, memory mapped when its rows allow it.
+
+    Chunk files (see chunked_map.py) give a ChunkedMap instead.
+    """
+    # Imported here, chunked_map builds on this module
+    import chunked_map
+    if chunked_map.is_chunk_file(path):
+        return chunked_map.ChunkedMap(path)
+
+    grid = map_file(path)
+    if grid is None:
+        grid = Grid.from_file(path)
+    return grid
+
+
+class Grid:
+    def __init__(self, width, height, tiles=None, indexed=INDEXED_TILES, stride=None):
+        self.width = width
+        self.height = height
+        self.stride = width if stride is None else stride
+        # Any writable buffer of stride * height bytes
+        self.tiles = bytearray(width * height) if tiles is None else tiles
+        self.indexed = {ord(tile) for tile in indexed}
+        # Tile value -> set of flat indices holding it
+        self.positions = {}
+        # Flat indices set() changed since take_changes(), None when
+        # nobody is tracking changes
+        self.changed = None
+
+    @classmethod
+    def from_file(cls, path):
+        return cls(*read_tiles(path))
+
+    def index(self, x, y):
+        # Negative indices count from the end like they did on lists
+        if x < 0:
+            x += self.height
+        if y < 0:
+            y += self.width
+        if not (0 <= x < self.height and 0 <= y < self.width):
+            raise IndexError(f"Map position {[x, y]} is out of range")
+        return x * self.stride + y
+
+    def get(self, x, y):
+        return chr(self.tiles[self.index(x, y)])
+
+    def set(self, x, y, tile):
+        i = self.index(x, y)
+        value = ord(tile)
+        positions = self.positions
+        if positions:
+            old = positions.get(self.tiles[i])
+            if old is not None:
+                old.discard(i)
+            new = positions.get(value)
+            if new is not None:
+                new.add(i)
+        if self.changed is not None:
+            self.changed.add(i)
+        self.tiles[i] = value
+
+    def row(self, x, start=0, end=None):
+        """Returns row x, or the tiles from start up to end in it."""
+        offset = self.index(x, 0)
+        end = self.width if end is None else min(end, self.width)
+        return bytes(self.tiles[offset + start:offset + end]).decode("ascii")
+
+    def rows(self):
+        for x in range(self.height):
+            yield self.row(x)
+
+    def chunks(self):
+        # Yields (offset, data) covering the tiles with data having count
+        # and find. bytearray has them, other buffers are copied a chunk
+        # at a time
+        if isinstance(self.tiles, bytearray):
+            yield 0, self.tiles
+            return
+        for offset in range(0, len(self.tiles), SCAN_CHUNK):
+            yield offset, bytes(self.tiles[offset:offset + SCAN_CHUNK])
+
+    def indexed_positions(self, value):
+        # Returns the index for the tile value, or None if it isn't indexed
+        positions = self.positions.get(value)
+        if positions is None and value in self.indexed:
+            positions = self.positions[value] = set(self.scan(value))
+        return positions
+
+    def scan(self, value):
+        """Returns the flat index of every tile with the given value."""
+        if numpy is not None:
+            return numpy.flatnonzero(numpy.frombuffer(self.tiles, numpy.uint8) == value).tolist()
+        indices = []
+        for offset, data in self.chunks():
+            i = data.find(value)
+            while i != -1:
+                indices.append(offset + i)
+                i = data.find(value, i + 1)
+        return indices
+
+    def count(self, tile):
+        """Returns how many tiles of the given type the map has."""
+        value = ord(tile)
+        positions = self.indexed_positions(value)
+        if positions is not None:
+            return len(positions)
+        if numpy is not None:
+            return int(numpy.count_nonzero(numpy.frombuffer(self.tiles, numpy.uint8) == value))
+        return sum(data.count(value) for _, data in self.chunks())
+
+    def find(self, tile):
+        """Returns the (x, y) of every tile of the given type, row by row."""
+        value = ord(tile)
+        positions = self.indexed_positions(value)
+        indices = sorted(positions) if positions is not None else self.scan(value)
+        stride = self.stride
+        return [divmod(i, stride) for i in indices]
+
+    def nth(self, tile, n):
+        """Returns the (x, y) of the n-th tile of the given type, row by row.
+
+        Unlike find() this never builds the list of all matches, so it
+        stays cheap for common tiles on huge maps.
+        """
+        value = ord(tile)
+        width = self.width
+        stride = self.stride
+        for x in range(self.height):
+            row = bytes(self.tiles[x * stride:x * stride + width])
+            in_row = row.count(value)
+            if n >= in_row:
+                n -= in_row
+                continue
+            y = row.find(value)
+            for _ in range(n):
+                y = row.find(value, y + 1)
+            return x, y
+        raise IndexError(f"The map has no {n}th {tile!r} tile")
+
+    def track_changes(self):
+        """Starts recording the tiles set() changes, returns True if it can."""
+        self.changed = set()
+        return True
+
+    def take_changes(self):
+        """Returns the (x, y) of every tile changed since the last call."""
+        changed, self.changed = self.changed, set()
+        stride = self.stride
+        return [divmod(i, stride) for i in changed]
+
+    def flush(self):
+        # Nothing to write back, changes never go to the map file
+        pass
+
+    def __str__(self):
+        return "\n".join(self.rows())
@@ -0,0 +1,83 @@
+"""
+Single pass lexer for rover programs.
+
+The keyword/operator table and the token regex are built once at import
+time. Tokens are streamed out of the source buffer from left to right,
+so whitespace between lexemes is optional (`n=n+1;` is the same as
+`n = n + 1 ;`). Every token records the line and column it started on.
+"""
+import re
+
+from parser_components import Token, Vocab
+
+
+TYPES = ["int", "char", "bool", "double"]
+
+# Vocab entries that are token classes rather than literal lexemes
+_TOKEN_CLASSES = (Vocab.EOS, Vocab.ID, Vocab.NUM, Vocab.REAL, Vocab.BASIC)
+
+# Maps the text of every keyword and operator straight to its Vocab entry
+KEYWORDS = {
+    entry.value: entry
+    for entry in Vocab
+    if entry not in _TOKEN_CLASSES
+}
+KEYWORDS.update({ttype: Vocab.BASIC for ttype in TYPES})
+
+# Longest operators first so that `<=` is never lexed as `<` `=`
+_OPERATORS = sorted(
+    (lexeme for lexeme in KEYWORDS if not lexeme[0].isalpha()),
+    key=len,
+    reverse=True,
+)
+
+TOKEN_RE = re.compile(
+    r"(?P<newline>\n)"
+    r"|(?P<space>[ \t\r\f\v]+)"
+    r"|(?P<real>\d+\.\d+)"
+    r"|(?P<num>\d+)"
+    r"|(?P<word>[A-Za-z_][A-Za-z0-9_]*)"
+    r"|(?P<op>" + "|".join(re.escape(op) for op in _OPERATORS) + r")"
+)
+
+
+class UnexpectedCharacterError(Exception):
+    pass
+
+
+def tokenize(source):
+    """Yields the tokens of the given source, ending with an EOS token."""
+    line = 1
+    line_start = 0
+    pos = 0
+    end = len(source)
+    match = TOKEN_RE.match
+    keywords = KEYWORDS
+
+    while pos < end:
+        m = match(source, pos)
+        if m is None:
+            raise UnexpectedCharacterError(
+                f"Unexpected character found: {source[pos]!r} "
+                f"at line {line}, column {pos - line_start + 1}"
+            )
+        kind = m.lastgroup
+        value = m.group()
+        column = pos - line_start + 1
+        pos = m.end()
+
+        if kind == "newline":
+            line += 1
+            line_start = pos
+        elif kind == "space":
+            continue
+        elif kind == "word":
+            yield Token(value, keywords.get(value, Vocab.ID), line, column)
+        elif kind == "op":
+            yield Token(value, keywords[value], line, column)
+        elif kind == "num":
+            yield Token(value, Vocab.NUM, line, column)
+        else:
+            yield Token(value, Vocab.REAL, line, column)
+
+    yield Token(line=line, column=pos - line_start + 1)
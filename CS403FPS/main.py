@@ -1,13 +1,55 @@
 import pathlib
 import sys
 
-from rover import ROVER_COMMAND_FILES
+import compiler
+import program_file
+import transport
+from rover import PROGRAM_CACHE_DIR, ROVER_1, ROVER_COMMAND_FILES, write_command
+
+
+def precompile(filepaths):
+    # Compile each command file into the rovers' program cache so a
+    # (re)started rover can load it without parsing
+    for filepath in filepaths:
+        fcontent = pathlib.Path(filepath).read_text()
+        program = compiler.compile_source(fcontent)
+        path = program_file.cache_path(PROGRAM_CACHE_DIR, fcontent)
+        program_file.write(path, program, fcontent)
+        print(f"Compiled {filepath} -> {path}, the optimizer removed {program.removed} nodes")
+
+
+def report_replies(conn, rover_name, fcontent):
+    # Once connected the command is only ever sent this once, losing the
+    # connection is reported instead of trying another way in, which
+    # could run it twice
+    try:
+        for reply in transport.send_command(conn, rover_name, fcontent):
+            if reply["status"] == "ack":
+                print(
+                    f"{rover_name} queued the command as #{reply['seq']} "
+                    f"({reply['queued']} queued), waiting for it to finish..."
+                )
+            elif reply["ok"]:
+                print(f"{rover_name} finished running the command successfully")
+            else:
+                print(f"{rover_name} failed to run the command:\n{reply['error']}")
+    except OSError as e:
+        raise Exception(
+            f"Lost the connection to {rover_name} before it reported back ({e}), "
+            f"the command may still run. See the rover for more details"
+        ) from e
 
 
 def main():
-    # Get the command from the file given and move it
-    # to the file the rover is watching (default is Rover1)
-    rover_name = "Rover1"
+    if len(sys.argv) >= 2 and sys.argv[1] == "--compile":
+        if len(sys.argv) < 3:
+            raise Exception("Missing file path to compile.")
+        precompile(sys.argv[2:])
+        return
+
+    # Get the command from the file given and send it to the rover
+    # (default is Rover1), any rover registered in fleet.json works
+    rover_name = ROVER_1
     if len(sys.argv) < 2:
         raise Exception("Missing file path to parse.")
     elif len(sys.argv) == 3:
@@ -22,8 +64,25 @@ def main():
     with filepath.open() as f:
         fcontent = f.read()
 
-    with ROVER_COMMAND_FILES[rover_name].open("w") as f:
-        f.write(fcontent)
+    # Go through the fleet supervisor when it's running, then the
+    # rover's own socket
+    conn = None
+    for via in (transport.FLEET, rover_name):
+        try:
+            conn = transport.connect(via)
+            break
+        except OSError:
+            # Nobody is listening there, try the next way in
+            pass
+
+    if conn is not None:
+        with conn:
+            report_replies(conn, rover_name, fcontent)
+        return
+
+    # The rover isn't listening on a socket, fall back to the command file
+
+    write_command(rover_name, fcontent)
 
     print("Command sent successfully! See the rover for more details")
 
@@ -0,0 +1,86 @@
+"""
+Registry of the maps rovers can switch between.
+
+Map files named map.txt (id 1) and map<N>.txt (id N) are discovered in
+the rover directory at startup, more can be added with register(). Two
+files for the same id (map.txt and map1.txt, or map2.txt and map02.txt)
+are an error. Each
+map is parsed once, the first time it's used, into an immutable
+template. Every rover that switches to it afterwards gets a copy of
+the template's tiles, a single memcpy with no file I/O.
+
+Maps too big to copy around (files over TEMPLATE_MAX_BYTES bytes) and
+chunk files are loaded with grid.load() every time instead, which
+memory maps them and only reads what the rover touches. They are never
+read in whole to build a template.
+"""
+import collections
+import os
+import pathlib
+import re
+
+import chunked_map
+import grid
+from grid import Grid
+
+# Directory searched for map files
+MAP_DIR = pathlib.Path(__file__).parent.resolve()
+
+# map.txt is map 1, map2.txt map 2 and so on
+MAP_NAME = re.compile(r"map(\d*)\.txt")
+
+# Map files bigger than this aren't kept as templates
+TEMPLATE_MAX_BYTES = 1 << 24
+
+MapTemplate = collections.namedtuple("MapTemplate", ["width", "height", "tiles"])
+
+
+class MapRegistry:
+    def __init__(self):
+        # id -> path
+        self.paths = {}
+        # resolved path -> MapTemplate, or None for maps that aren't templated
+        self.templates = {}
+
+    def discover(self, directory=MAP_DIR):
+        """Registers every map file in the directory."""
+        for path in sorted(pathlib.Path(directory).iterdir()):
+            match = MAP_NAME.fullmatch(path.name)
+            if match:
+                self.register(int(match.group(1) or 1), path)
+
+    def register(self, map_id, path):
+        """Registers the map at path under map_id, raises ValueError if
+        the id is already taken by another file."""
+        path = pathlib.Path(path)
+        known = self.paths.get(map_id)
+        if known is not None and known.resolve() != path.resolve():
+            raise ValueError(f"Map {map_id} is both {known} and {path}")
+        self.paths[map_id] = path
+
+    def ids(self):
+        return sorted(self.paths)
+
+    def path(self, map_id):
+        """Returns the path of a registered map, raises KeyError for unknown ids."""
+        return self.paths[map_id]
+
+    def template(self, path):
+        key = pathlib.Path(path).resolve()
+        if key not in self.templates:
+            template = None
+            if not chunked_map.is_chunk_file(path) and os.path.getsize(path) <= TEMPLATE_MAX_BYTES:
+                width, height, tiles = grid.read_tiles(path)
+                template = MapTemplate(width, height, bytes(tiles))
+            self.templates[key] = template
+        return self.templates[key]
+
+    def load(self, path):
+        """Returns a fresh, writable copy of the map at path."""
+        template = self.template(path)
+        if template is None:
+            return grid.load(path)
+        return Grid(template.width, template.height, bytearray(template.tiles))
+
+    def __len__(self):
+        return len(self.paths)
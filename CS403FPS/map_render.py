@@ -0,0 +1,122 @@
+"""
+Draws a rover's map, writing only the tiles that changed since the last frame.
+
+The first frame (and any frame after the rover switched maps or the
+view moved) shows the whole map. After that only the changed tiles are
+written:
+
+    diff   the default, one line listing the changed tiles as
+           printing map changes: [[x, y, "tile"], ...]
+    full   the whole map every time, like print_map used to
+    ansi   the map stays at the top of the screen and the changed tiles
+           are redrawn in place with cursor moves, other output scrolls
+           underneath it. Only for a single rover writing to a terminal,
+           rovers sharing one would draw over each other's maps
+
+Grids that can record their changes (Grid.track_changes) are asked for
+the changed tiles directly. For other maps the view is compared with the
+last frame. frame() returns the text of a frame for the rover to write
+to its output.
+"""
+import atexit
+import json
+import sys
+
+# diff, full or ansi, see above
+RENDER_MODE = "diff"
+
+CLEAR_SCREEN = "\x1b[2J\x1b[H"
+SAVE_CURSOR = "\x1b7"
+RESTORE_CURSOR = "\x1b8"
+RESET_SCROLL_REGION = "\x1b[r"
+
+
+class MapRenderer:
+    def __init__(self, mode=RENDER_MODE):
+        self.mode = mode
+        self.grid = None
+        # (top, left, rows, columns) of the last frame
+        self.view = None
+        # The rows of the view as of the last frame
+        self.shown = None
+        self.tracked = False
+        self.scroll_region = None
+
+    def frame(self, grid, view=None):
+        """Returns the text of a frame, view is (top, left, rows, columns)."""
+        top, left, rows, columns = view if view is not None else (0, 0, grid.height, grid.width)
+        view = (top, left, min(rows, grid.height - top), min(columns, grid.width - left))
+
+        mode = self.mode
+        if mode == "full" or grid is not self.grid or view != self.view:
+            return self.full_frame(grid, view, mode)
+        return self.changes_frame(grid, mode)
+
+    def full_frame(self, grid, view, mode):
+        if grid is not self.grid:
+            track_changes = getattr(grid, "track_changes", None)
+            self.tracked = track_changes is not None and track_changes()
+        elif self.tracked:
+            grid.take_changes()
+        self.grid = grid
+        self.view = top, left, rows, columns = view
+        self.shown = [grid.row(x, left, left + columns) for x in range(top, top + rows)]
+
+        if mode == "ansi":
+            # Keep the map at the top, everything printed after it
+            # scrolls in the region below
+            if self.scroll_region is None:
+                atexit.register(self.reset_terminal)
+            self.scroll_region = rows + 2
+            return (
+                CLEAR_SCREEN + "\n".join(self.shown)
+                + f"\x1b[{self.scroll_region}r\x1b[{self.scroll_region};1H"
+            )
+
+        header = "printing map\n"
+        if (rows, columns) != (grid.height, grid.width):
+            header += (
+                f"(rows {top}-{top + rows - 1}, columns {left}-{left + columns - 1} "
+                f"of {grid.height}x{grid.width})\n"
+            )
+        return header + "".join(row + "\n" for row in self.shown)
+
+    def changed_tiles(self, grid):
+        # (x, y) of the tiles that may have changed since the last frame
+        if self.tracked:
+            return grid.take_changes()
+        top, left, rows, columns = self.view
+        changed = []
+        for x in range(top, top + rows):
+            old = self.shown[x - top]
+            new = grid.row(x, left, left + columns)
+            if new != old:
+                changed.extend((x, left + y) for y in range(columns) if new[y] != old[y])
+        return changed
+
+    def changes_frame(self, grid, mode):
+        top, left, rows, columns = self.view
+        changes = []
+        for x, y in sorted(set(self.changed_tiles(grid))):
+            if not (top <= x < top + rows and left <= y < left + columns):
+                continue
+            tile = grid.get(x, y)
+            row = self.shown[x - top]
+            if row[y - left] != tile:
+                self.shown[x - top] = row[:y - left] + tile + row[y - left + 1:]
+                changes.append((x, y, tile))
+
+        if mode == "ansi":
+            if not changes:
+                return ""
+            return SAVE_CURSOR + "".join(
+                f"\x1b[{x - top + 1};{y - left + 1}H{tile}" for x, y, tile in changes
+            ) + RESTORE_CURSOR
+        return f"printing map changes: {json.dumps([list(change) for change in changes])}\n"
+
+    def reset_terminal(self):
+        try:
+            sys.stdout.write(RESET_SCROLL_REGION)
+            sys.stdout.flush()
+        except (OSError, ValueError):
+            pass
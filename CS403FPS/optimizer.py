@@ -0,0 +1,181 @@
+"""
+Simplifies a semantically checked tree before it's compiled or walked.
+
+check_semantics marks every expression that only uses literals as
+constant, so this pass can work them out once instead of on every run:
+
+- constant unary and binary expressions become a single LiteralNode
+- an if whose condition folded to a literal is replaced by the arm that
+  runs, or removed when there is none
+- while ( false ) loops are removed
+- x = x + c and x = x - c, c being a literal, become an increment
+
+Arms that can't be left out (the body of an if or while) are replaced
+by an empty statement instead. Constant expressions that fail to work
+out, like a division by zero, are left for the run to raise.
+
+    removed = optimize(tree)
+
+returns how many nodes the tree lost.
+"""
+from parser_components import (
+    STMT_ASSIGN,
+    STMT_BLOCK,
+    STMT_EMPTY,
+    STMT_IF,
+    STMT_INCREMENT,
+    STMT_WHILE,
+    BinaryNode,
+    LiteralNode,
+    LocNode,
+    NonTerminals,
+    StmtNode,
+    Token,
+    UnaryNode,
+    Vocab,
+)
+
+
+def size(node):
+    """Returns the number of nodes in the tree under node, node included."""
+    return 1 + sum(size(child) for child in node.children)
+
+
+def literal(node, value):
+    # LiteralNode for the value a constant expression node works out to
+    if node.ttype == 'bool':
+        ttype = Vocab.TRUE if value else Vocab.FALSE
+    elif node.ttype == 'int':
+        ttype = Vocab.NUM
+    else:
+        ttype = Vocab.REAL
+    token = node.token
+    result = LiteralNode(Token(str(value).lower(), ttype, token.line, token.column))
+    result.ttype = node.ttype
+    result.value = value
+    return result
+
+
+def empty_statement():
+    stmt = StmtNode(NonTerminals.STMT)
+    stmt.kind = STMT_EMPTY
+    return stmt
+
+
+class Optimizer:
+    def optimize(self, node):
+        return getattr(self, f"optimize_{type(node).__name__}")(node)
+
+    def optimize_ProgramNode(self, node):
+        for child in node.children:
+            self.optimize(child)
+
+    def optimize_BlockNode(self, node):
+        self.optimize(node.children[1])
+
+    def optimize_StmtsNode(self, node):
+        stmts = []
+        for stmt in node.children:
+            stmt = self.statement(stmt)
+            if stmt is not None:
+                stmts.append(stmt)
+        node.children = stmts
+
+    # Returns what takes the place of the statement, None if it can go
+    def statement(self, stmt):
+        kind = stmt.kind
+
+        #<loc> = <bool> ;
+        if kind == STMT_ASSIGN:
+            self.fold_subscripts(stmt.children[0])
+            stmt.children[2] = self.expression(stmt.children[2])
+            self.increment(stmt)
+
+        #<block>
+        elif kind == STMT_BLOCK:
+            self.optimize(stmt.children[0])
+
+        #IF ( <bool> ) <stmt> [ELSE <stmt>]
+        elif kind == STMT_IF:
+            condition = stmt.children[1] = self.expression(stmt.children[1])
+            if isinstance(condition, LiteralNode):
+                if condition.value:
+                    return self.statement(stmt.children[2])
+                if len(stmt.children) > 3:
+                    return self.statement(stmt.children[4])
+                return None
+            stmt.children[2] = self.arm(stmt.children[2])
+            if len(stmt.children) > 3:
+                stmt.children[4] = self.arm(stmt.children[4])
+
+        #WHILE ( <bool> ) <stmt>
+        elif kind == STMT_WHILE:
+            condition = stmt.children[1] = self.expression(stmt.children[1])
+            if isinstance(condition, LiteralNode) and not condition.value:
+                return None
+            stmt.children[2] = self.arm(stmt.children[2])
+
+        return stmt
+
+    def arm(self, stmt):
+        stmt = self.statement(stmt)
+        return empty_statement() if stmt is None else stmt
+
+    # Turns loc = loc + c and loc = loc - c into an increment
+    def increment(self, stmt):
+        loc, value = stmt.children[0], stmt.children[2]
+        if loc.subscripts or not isinstance(value, BinaryNode):
+            return
+        left, right = value.children
+        operator = value.token.ttype
+
+        if operator == Vocab.PLUS and isinstance(left, LiteralNode):
+            left, right = right, left
+        elif operator not in (Vocab.PLUS, Vocab.MINUS):
+            return
+        if not (
+            isinstance(left, LocNode) and not left.subscripts
+            and left.address == loc.address and isinstance(right, LiteralNode)
+        ):
+            return
+
+        # a - c is exactly a + (-c), for doubles too
+        if operator == Vocab.MINUS:
+            right = literal(right, -right.value)
+        stmt.kind = STMT_INCREMENT
+        stmt.children[2] = right
+
+    def fold_subscripts(self, loc):
+        self.fold_loccl(loc.children[1])
+        loc.subscripts = loc.children[1].subscripts
+
+    def fold_loccl(self, loccl):
+        if loccl.children:
+            loccl.children[0] = self.expression(loccl.children[0])
+            self.fold_loccl(loccl.children[1])
+            loccl.subscripts = (loccl.children[0],) + loccl.children[1].subscripts
+
+    # Returns the expression with its constant parts worked out
+    def expression(self, node):
+        if isinstance(node, LocNode):
+            self.fold_subscripts(node)
+            return node
+        if not isinstance(node, (UnaryNode, BinaryNode)):
+            return node
+
+        node.children = [self.expression(child) for child in node.children]
+        # a constant child that couldn't be worked out stays a BinaryNode
+        if not node.const or not all(isinstance(child, LiteralNode) for child in node.children):
+            return node
+        try:
+            value = node.func(*(child.value for child in node.children))
+        except ArithmeticError:
+            return node
+        return literal(node, value)
+
+
+def optimize(tree):
+    """Optimizes a checked ProgramNode in place, returns how many nodes were removed."""
+    before = size(tree)
+    Optimizer().optimize(tree)
+    return before - size(tree)
@@ -0,0 +1,117 @@
+"""
+Where a rover's output goes.
+
+Every Rover writes its messages, feature output and map frames to its
+own sink instead of print()ing them:
+
+    text   plain text, what the rovers always printed
+    json   one JSON object per line,
+           {"rover": "Rover1", "kind": "message", "text": "..."}, kind
+           being message (a line from the rover), output (feature
+           output) or map (a map frame)
+    null   nothing. quiet is True, so the rover doesn't even build its
+           messages, for benchmark runs
+
+Output is buffered and written in one go when the rover finishes a
+command, or as soon as more than FLUSH_BYTES are waiting, so rovers
+sharing a console don't interleave line by line.
+"""
+import json
+import sys
+
+# Sink used when none is given, fleet.json can pick another
+OUTPUT = "text"
+
+# Buffered output is written out once it gets this big
+FLUSH_BYTES = 1 << 16
+
+
+class TextSink:
+    quiet = False
+
+    def __init__(self, name=None, stream=None, flush_bytes=FLUSH_BYTES):
+        self.name = name
+        self.stream = stream
+        self.flush_bytes = flush_bytes
+        self.buffer = []
+        self.buffered = 0
+
+    def output(self):
+        # Looked up on every flush so redirecting sys.stdout still works
+        return self.stream if self.stream is not None else sys.stdout
+
+    def append(self, text):
+        self.buffer.append(text)
+        self.buffered += len(text)
+        if self.buffered >= self.flush_bytes:
+            self.flush()
+
+    def message(self, msg):
+        """Writes a line from the rover, labelled with its name."""
+        self.append(f"{self.name}: {msg}\n" if self.name is not None else f"{msg}\n")
+
+    def line(self, text):
+        """Writes a line, like print()."""
+        self.append(f"{text}\n")
+
+    def write(self, text, kind="output"):
+        """Writes text as is, like a stream."""
+        self.append(text)
+
+    def flush(self):
+        if not self.buffer:
+            return
+        stream = self.output()
+        stream.write("".join(self.buffer))
+        stream.flush()
+        self.buffer.clear()
+        self.buffered = 0
+
+
+class JsonLinesSink(TextSink):
+    def record(self, kind, text):
+        self.append(json.dumps({"rover": self.name, "kind": kind, "text": text}) + "\n")
+
+    def message(self, msg):
+        self.record("message", str(msg))
+
+    def line(self, text):
+        self.record("output", str(text))
+
+    def write(self, text, kind="output"):
+        if text:
+            self.record(kind, text.rstrip("\n"))
+
+
+class NullSink:
+    quiet = True
+
+    def __init__(self, name=None, stream=None, flush_bytes=FLUSH_BYTES):
+        self.name = name
+
+    def message(self, msg):
+        pass
+
+    def line(self, text):
+        pass
+
+    def write(self, text, kind="output"):
+        pass
+
+    def flush(self):
+        pass
+
+
+SINKS = {
+    "text": TextSink,
+    "json": JsonLinesSink,
+    "null": NullSink,
+}
+
+
+def make_sink(kind=None, name=None, stream=None, flush_bytes=FLUSH_BYTES):
+    """Returns a new sink of the given kind (text, json or null)."""
+    kind = OUTPUT if kind is None else kind
+    if kind not in SINKS:
+        raise ValueError(f"Unknown output {kind!r}, expected one of {sorted(SINKS)}")
+    return SINKS[kind](name, stream, flush_bytes)
@@ -1,10 +1,17 @@
 #imports
 import enum
+import operator
+import output_sink
 from stack import stack
 from Errors import (IncorrectTypeError, UndeclaredError, RedefinedError)
 
-#global variables
-SCOPE = stack()
+#everything one check or run of a program needs, so programs can be
+#checked and run on several threads at once. scope holds the names
+#while checking and the frames while running
+class Context:
+    def __init__(self, rover=None):
+        self.rover = rover
+        self.scope = stack()
 
 
 class IncorrectTypeError(Exception):
@@ -78,28 +85,18 @@ class NonTerminals(enum.Enum):
     STMTS = 7
     LOC = 8
     LOCCL = 9
-    BOOL = 10
-    BOOLCL = 11
-    JOIN = 12
-    JOINCL = 13
-    EQUALITY = 14
-    EQUALCL = 15
-    REL = 16
-    RELTAIL = 17
-    EXPR = 18
-    EXPRCL = 19
-    TERM = 20
-    TERMCL = 21
-    UNARY = 22
-    FACTOR = 23
     FEATURE = 24
 
 
 
 class Token:
-    def __init__(self, value=0, ttype=Vocab.EOS):
+    __slots__ = ("value", "ttype", "line", "column")
+
+    def __init__(self, value=0, ttype=Vocab.EOS, line=0, column=0):
         self.value = value
         self.ttype = ttype
+        self.line = line
+        self.column = column
 
     def __eq__(self, other_token):
         return self.value == other_token.value
@@ -109,6 +106,8 @@ class Token:
 
 
 class Node:
+    __slots__ = ("token", "children")
+
     def __init__(self, token):
         self.token = token
         self.children = []
@@ -161,34 +160,6 @@ class Node:
             return "loc"
         elif self.token == NonTerminals.LOCCL:
             return "loccl"
-        elif self.token == NonTerminals.BOOL:
-            return "bool"
-        elif self.token == NonTerminals.BOOLCL:
-            return "boolcl"
-        elif self.token == NonTerminals.JOIN:
-            return "join"
-        elif self.token == NonTerminals.JOINCL:
-            return "joincl"
-        elif self.token == NonTerminals.EQUALITY:
-            return "equality"
-        elif self.token == NonTerminals.EQUALCL:
-            return "equalitycl"
-        elif self.token == NonTerminals.REL:
-            return "rel"
-        elif self.token == NonTerminals.RELTAIL:
-            return "reltail"
-        elif self.token == NonTerminals.EXPR:
-            return "expr"
-        elif self.token == NonTerminals.EXPRCL:
-            return "exprcl"
-        elif self.token == NonTerminals.TERM:
-            return "term"
-        elif self.token == NonTerminals.TERMCL:
-            return "termcl"
-        elif self.token == NonTerminals.UNARY:
-            return "unary"
-        elif self.token == NonTerminals.FACTOR:
-            return "factor"
         elif self.token == NonTerminals.FEATURE:
             return "feature"
         else:
@@ -212,1034 +183,559 @@ class Node:
     #         f"but found {target}"
     #     )#
 
-    def check_semantics(self):
+    def check_semantics(self, context):
         """Checks the semantics of the tree."""
-        self.check_scopes()
-        self.check_types()
+        self.check_scopes(context)
+        self.check_types(context)
 
-    def check_types(self):
+    def check_types(self, context):
         for child in self.children:
-            child.check_types()
+            child.check_types(context)
 
-    def check_scopes(self):
+    def check_scopes(self, context):
         for child in self.children:
-            child.check_scopes()
+            child.check_scopes(context)
 
-    def run(self):
+    def run(self, context):
         for child in self.children:
-            child.run()
+            child.run(context)
+
+#what the operators do. both sides are always evaluated, the tree walker
+#and the vm (through the compiler's indices) share these tables
+def logical_and(left, right):
+    return left and right
+
+
+def logical_or(left, right):
+    return left or right
+
+
+BINARY_OPERATORS = (
+    (Vocab.PLUS, operator.add),
+    (Vocab.MINUS, operator.sub),
+    (Vocab.MUL, operator.mul),
+    (Vocab.DIV, operator.truediv),
+    (Vocab.LT, operator.lt),
+    (Vocab.LTEQ, operator.le),
+    (Vocab.GT, operator.gt),
+    (Vocab.GTEQ, operator.ge),
+    (Vocab.EQ, operator.eq),
+    (Vocab.NEQ, operator.ne),
+    (Vocab.AND, logical_and),
+    (Vocab.OR, logical_or),
+)
+
+UNARY_OPERATORS = (
+    (Vocab.MINUS, operator.neg),
+    (Vocab.NOT, operator.not_),
+)
+
+#rover method called for each feature
+FEATURE_METHODS = {
+    Vocab.PRINT_MAP: "print_map",
+    Vocab.INFO: "info",
+    Vocab.PRINT_POS: "print_pos",
+    Vocab.LOOKING: "looking",
+    Vocab.FACING: "facing",
+    Vocab.TURNLEFT: "turnLeft",
+    Vocab.TURNRIGHT: "turnRight",
+    Vocab.MOVE_TILE: "move_tile",
+    Vocab.DRILL: "drill",
+    Vocab.PRINT_INV: "print_inv",
+    Vocab.ENVSCAN: "envScan",
+    Vocab.BOMB: "bomb",
+    Vocab.WAYPOINT_SET: "waypoint_set",
+    Vocab.MOVETO_WAYPOINT: "moveto_waypoint",
+    Vocab.CACHE_MAKE: "cache_make",
+    Vocab.CACHE_DUMP: "cache_dump",
+    Vocab.CHARGE: "charge",
+}
+
+#kinds of statement, worked out once when the statement is checked
+STMT_ASSIGN = 0
+STMT_FEATURE = 1
+STMT_IF = 2
+STMT_WHILE = 3
+STMT_BLOCK = 4
+#only made by the optimizer. an increment is loc = loc + constant, its
+#children are the loc, the = and the literal added. an empty statement
+#has no children and takes the place of a removed if or while arm
+STMT_INCREMENT = 5
+STMT_EMPTY = 6
+
+
+#operator function by vocab, looked up once while checking
+BINARY_FUNCS = dict(BINARY_OPERATORS)
+UNARY_FUNCS = dict(UNARY_OPERATORS)
+
+#makes the nested lists for an array with the given dimensions
+def new_array(dims):
+    if len(dims) == 1:
+        return [None] * dims[0]
+    return [new_array(dims[1:]) for _ in range(dims[0])]
 
 #first node. starts the run
 class ProgramNode(Node):
-    def run(self, scope):
-        global SCOPE
-        SCOPE = scope
+    __slots__ = ()
+
+    #check semantics for the whole program
+    def check_semantics(self, context):
+        for child in self.children:
+            child.check_semantics(context)
+
+    #output is the sink the result goes to, a text sink on stdout by default
+    def run(self, context, output=None):
+        if output is None:
+            output = output_sink.make_sink()
 
         result = -9
         for child in self.children:
-            result = child.run()
+            result = child.run(context)
         if result in (0,):
-            print(f"Successfully ran the program, exited with: {result}")
+            output.line(f"Successfully ran the program, exited with: {result}")
         else:
-            print(f"Failed to run program, exited with: {result}")
-
-#feature node
+            output.line(f"Failed to run program, exited with: {result}")
+        output.flush()
 
+#feature node, method is the rover method it calls, map_number the
+#argument of switch_map
 class FeatureNode(Node):
-    #no semantics to check since all are terminals
-    def check_semantics(self):
-        pass
+    __slots__ = ("method", "map_number")
 
-    #determines which vocab the token is. calls that method in rover
-    def run(self, rover):
+    #no semantics to check since all are terminals, works out which
+    #rover method to call
+    def check_semantics(self, context):
         tok = self.children[0].token.ttype
-        if tok == Vocab.PRINT_MAP:
-            rover.print_map()
-        elif tok == Vocab.SWITCH_MAP:
-            rover.switch_map(int(self.children[1].token.value))
-        elif tok == Vocab.INFO:
-            rover.info()
-        elif tok == Vocab.PRINT_POS:
-            rover.print_pos()
-        elif tok == Vocab.LOOKING:
-            rover.looking()
-        elif tok == Vocab.FACING:
-            rover.facing()
-        elif tok == Vocab.TURNLEFT:
-            rover.turnLeft()
-        elif tok == Vocab.TURNRIGHT:
-            rover.turnRight()
-        elif tok == Vocab.MOVE_TILE:
-            rover.move_tile()
-        elif tok == Vocab.DRILL:
-            rover.drill()
-        elif tok == Vocab.PRINT_INV:
-            rover.print_inv()
-        elif tok == Vocab.ENVSCAN:
-            rover.envScan()
-        elif tok == Vocab.BOMB:
-            rover.bomb()
-        elif tok == Vocab.WAYPOINT_SET:
-            rover.waypoint_set()
-        elif tok == Vocab.MOVETO_WAYPOINT:
-            rover.moveto_waypoint()
-        elif tok == Vocab.CACHE_MAKE:
-            rover.cache_make()
-        elif tok == Vocab.CACHE_DUMP:
-            rover.cache_dump()
-        elif tok == Vocab.CHARGE:
-            rover.charge()
-
-#factor node
-class FactorNode(Node):
-    #check semantics for factor
-    def check_semantics(self):
-        #if first child is bool non terminal, call semantics for node
-        if isinstance(self.children[0], BoolNode):
-            return self.children[0].check_semantics()
-
-        #if first child is loc non terminal, call semantics for node
-        elif isinstance(self.children[0], LocNode):
-            type = self.children[0].check_semantics()
-
-            #if type is an array raise error
-            if type['arr']:
-                raise IncorrectTypeError('basic type', 'array')
-            return type
-
-        #if first child is NUM terminal, return info for a NUM
-        elif self.children[0].token.ttype == Vocab.NUM:
-            return {'ttype': 'int',
-                    'arr': False,
-                    'dimen': 0,
-                    'val': None}
-
-        #if first child is REAL terminal, return info for a REAL
-        elif self.children[0].token.ttype == Vocab.REAL:
-            return {'ttype': 'double',
-                    'arr': False,
-                    'dimen': 0,
-                    'val': None}
-
-        #if first child is TRUE or FALSE terminal, return info for a TRUE or FALSE
-        elif self.children[0].token.ttype == Vocab.TRUE or self.children.token.ttype == Vocab.FALSE:
-            return {'ttype': 'bool',
-                    'arr': False,
-                    'dimen': 0,
-                    'val': None}
-
-    #run the code from factor
-    def run(self, rover):
-    
-        #if first child is bool non terminal, call run method for node
-        if isinstance(self.children[0], BoolNode):
-            return self.children[0].run(rover)
-
-        #if first child is loc non terminal, call run method for node
-        elif isinstance (self.children[0], LocNode):
-            info = self.children[0].run(rover)
-
-            #if variable isnt an array, get value
-            if len(info['arr']) == 0:
-                value = info['val']
-
-            #if variable is an array, get index, get value
-            else:
-                #gets index for an array
-                arr = info['val']
-                for i in info['arr'][0:-1]:
-                    arr = arr[i]
-                value = arr[info['arr'][-1]]
-            return value
-
-        #if first child is NUM terminal, get value of token, cast as int and return
-        elif self.children[0].token.ttype == Vocab.NUM:
-            return int(self.children[0].token.value)
-
-        #if first child is REAL terminal, get value of token, cast as double, return
-        elif self.children[0].token.ttype == Vocab.REAL:
-            return float(self.children[0].token.value)
-
-        #if first child is TRUE terminal, return true
-        elif self.children[0].token.ttype == Vocab.TRUE:
-            return True
-
-        #if first child is FALSE terminal, return false
-        elif self.children[0].token.ttype == Vocab.FALSE:
-            return False
-
-#Unary node
-class UnaryNode(Node):
-    #check semantics for unary
-    def check_semantics(self):
-        #if unary only has 1 child, check semantics for it
-        if len(self.children) == 1:
-            return self.children[0].check_semantics()
-
-        #if unary has more than 1 child
-        else:
-            #check semantics
-            info = self.children[1].check_semantics()
-
-            #get operator
-            operator = self.children[0].token.value
-
-            #get type of unary node
-            type = info['ttype']
-
-            #if operator and type match, return unary node
-            #else return nothing
-            if (operator == '!' and type == 'bool') or (operator == '-' and (type == 'int' or type == 'double')):
-                return info
-
-    #run code from unary node
-    def run(self, rover):
-        #if unary only has 1 child, run child
-        if len(self.children) == 1:
-            return self.children[0].run(rover)
-
-        #if unary has more than 1 child
+        if tok == Vocab.SWITCH_MAP:
+            self.method = "switch_map"
+            self.map_number = int(self.children[1].token.value)
         else:
-            #run next unary node
-            obj = self.children[1].run(rover)
-
-            #get operator
-            operator = self.children[0].token.value
-
-            #if operator is !, return not of object
-            if operator == '!':
-                return not obj
-
-            #if operator is -, return negative of object
-            else:
-                return - obj
-
-#termcl node
-class TermclNode(Node):
-    #check semantics of termcl
-    def check_semantics(self):
-        #if termcl has no children, return nothing
-        if len(self.children) == 0:
-            return None
-
-        #if termcl has children
-        else:
-            #check semantics for non terminal children
-            unary = self.children[1].check_semantics()
-            termcl = self.children[2].check_semantics()
-
-            #if termcl child node returns None return unary
-            if termcl == None:
-                return unary
-            
-            #get node types
-            unaryType = unary['ttype']
-            termclType = termcl['ttype']
-
-            #if either nodes are bool, raise error
-            if unaryType == 'bool' or termclType == 'bool':
-                raise IncorrectTypeError('int,double','bool')
-            
-            #if both nodes are int or double, make unary double
-            if (unaryType == 'int' or unaryType == 'double') and  (termclType == 'int' or termclType == 'double'):
-                unary['ttype'] = 'double'
-
-            return unary
-
-    #run code from termcl
-    def run(self, rover, term):
-        #if termcl has no children, return term
-        if len(self.children) == 0:
-            return term
-
-        #if termcl has children
-        else:
-            #get operator
-            operator = self.children[0].token.value
-
-            #run unary node can get vlaue
-            unaryVal = self.children[1].run(rover)
-
-            #if operator is *, multiply term by value of unary
-            if operator == '*':
-                unaryVal = term * unaryVal
-
-            #if operator is /
-            else:
-                #if nominator is 0, raise error
-                if unaryVal == 0:
-                    raise ZeroDivisionError
-
-                #divide term by value of unary
-                unaryVal = term/unaryVal
-
-            #run termcl node and get value
-            termclVal = self.children[2].run(rover, unaryVal)
+            self.method = FEATURE_METHODS[tok]
+            self.map_number = None
 
-            return termclVal
-
-#term node
-class TermNode(Node):
-    #check semantics for term node
-    def check_semantics(self):
-        #check semantics for non terminal children
-        unary = self.children[0].check_semantics()
-        term = self.children[1].check_semantics()
-
-        #if term node returned nothing, return unary node
-        if term == None:
-            return unary
-            
-        #get node types
-        unaryType = unary['ttype']
-        termType = term['ttype']
-
-        #if either node is bool, raise erorr
-        if unaryType == 'bool' or termType == 'bool':
-            raise IncorrectTypeError('int,double','bool')
-            
-        #if both nodes are int or double, make unary double
-        if (unaryType == 'int' or unaryType == 'double') and  (termType == 'int' or termType == 'double'):
-            unary['ttype'] = 'double'
-
-        return unary
-
-    #run code from term node
-    def run(self, rover):
-        #run children
-        unaryObj = self.children[0].run(rover)
-        termObj = self.children[1].run(rover, unaryObj)
-
-        return termObj
-
-#exprcl node
-class ExprclNode(Node):
-    #check semantics for exprcl node
-    def check_semantics(self):
-        #if exprcl has no children, return None
-        if len(self.children) == 0:
-            return None
-
-        #if exprcl has children
+    #calls the method in rover
+    def run(self, context):
+        if self.map_number is not None:
+            context.rover.switch_map(self.map_number)
         else:
-            #check semantics for children
-            term = self.children[1].check_semantics()
-            exprcl = self.children[2].check_semantics()
-
-            #if term is None, return exprcl node
-            if exprcl == None:
-                return term
-            
-            #get node types
-            termTtype = term['ttype']
-            exprclType = exprcl['ttype']
-
-            #if either node is bool, raise error 
-            if termTtype == 'bool' or exprclType == 'bool':
-                raise IncorrectTypeError('int,double', 'bool')
-            
-            #if either node is int or double, make term double
-            if (termTtype == 'int' or termTtype == 'double') and  (exprclType == 'int' or exprclType == 'double'):
-                term['ttype'] = 'double'
+            getattr(context.rover, self.method)()
 
-            return term
+#every expression node (literal, unary, binary and loc) is annotated
+#by check_semantics with its type ('int', 'double' or 'bool'), its
+#dimensions (more than 0 for an array) and whether it's constant
 
-    #run code from exprcl node
-    def run(self, rover, expr):
-        #if exprcl has no children, return expr
-        if len(self.children) == 0:
-            return expr
+#literal node, the token is a NUM, REAL, TRUE or FALSE terminal
+class LiteralNode(Node):
+    __slots__ = ("ttype", "dimen", "const", "value")
 
-        #if exprcl has children
+    def __init__(self, token):
+        super().__init__(token)
+
+        #convert the literal once instead of on every run
+        if token.ttype == Vocab.NUM:
+            self.ttype = 'int'
+            self.value = int(token.value)
+        elif token.ttype == Vocab.REAL:
+            self.ttype = 'double'
+            self.value = float(token.value)
         else:
-            #get operator
-            operator = self.children[0].token.value
-
-            #run term node
-            term = self.children[1].run(rover)
-
-            #if oeprator is +, add expr to term
-            if operator == '+':
-                term = expr + term
-            
-            #if operator is -, subtract term from expr
-            else:
-                term = expr - term
-
-            #run exprcl node
-            exprclObj = self.children[2].run(rover, term)
-
-            return exprclObj
-
-#expr node
-class ExprNode(Node):
-    #checks semantics for expr node
-    def check_semantics(self):
-        #check semantics for children
-        term = self.children[0].check_semantics()
-        expr = self.children[1].check_semantics()
+            self.ttype = 'bool'
+            self.value = token.ttype == Vocab.TRUE
+        self.dimen = 0
+        self.const = True
 
-        #if term is Node, return expr
-        if expr == None:
-            return term
-            
-        #get node types
-        termType = term['ttype']
-        exprType = expr['ttype']
-
-        #if either nodes are bool, raise error
-        if termType == 'bool' or exprType == 'bool':
-            raise IncorrectTypeError('int,double', 'bool')
-
-        #if both types are the same, return term
-        if termType == exprType:
-            return term
-            
-        #if either nodes are int or double, make term double
-        if (termType == 'int' or termType == 'double') and  (exprType == 'int' or exprType == 'double'):
-            term['ttype'] = 'double'
-
-        return term
-
-    #run code from expr node
-    def run(self, rover):
-        #run children nodes
-        term = self.children[0].run(rover)
-        expr = self.children[1].run(rover, term)
+    #nothing to check for a literal
+    def check_semantics(self, context):
+        pass
 
-        return expr
+    #run code from literal node
+    def run(self, context):
+        return self.value
 
-#reltail Node
-class ReltailNode(Node):
-    #check semantics for reltail node
-    def check_semantics(self):
-        #if expr has no children, return None
-        if len(self.children) == 0:
-            return None
+#unary node, the token is the ! or - operator and the only child is the operand
+class UnaryNode(Node):
+    __slots__ = ("ttype", "dimen", "const", "func")
 
-        #if expr has children
-        else:
-            #check semantics of children
-            expr = self.children[1].check_semantics()
-            return expr
+    def __init__(self, token, operand):
+        super().__init__(token)
+        self.add_child(operand)
 
-    #runs code from reltail
-    def run(self, rover, expr):
-        #if expr node has no children, return expr
-        if len(self.children) == 0:
-            return expr
+    #check semantics for unary
+    def check_semantics(self, context):
+        operand = check_operand(context, self.children[0])
+        operator = self.token.ttype
 
-        #if expr has children
-        else:
-            #get operator
-            operator =  self.children[0].token.value
-
-            #run children nodes
-            exprObj = self.children[1].run(rover)
-
-            #if operator is <=, do boolean
-            if operator == '<=':
-                return expr <= exprObj
-
-            #if operator is >=, do boolean
-            elif operator == '>=':
-                return expr >= exprObj
-
-            #if operator is <, do boolean
-            elif operator == '<':
-                return expr < exprObj
-
-            #if operator is >, do boolean
-            elif operator == '>':
-                return expr > exprObj
-
-#rel node
-class RelNode(Node):
-    #check semantics for rel node
-    def check_semantics(self):
-        #semantics for children
-        expr = self.children[0].check_semantics()
-        reltail = self.children[1].check_semantics()
-
-        #if reltail is emtpy, then return expr
-        if reltail == None:
-            return expr
-
-        #if either is bool, raise error
-        if expr == 'bool' and reltail == 'bool':
-            raise IncorrectTypeError('int,double', 'bool')
-        
-        #set expr type to bool
-        expr['ttype'] = 'bool'
-        return expr
-
-    #run code from rel node
-    def run(self, rover):
-        #run children
-        expr = self.children[0].run(rover)
-        reltail = self.children[1].run(rover, expr)
-        return reltail
-
-#equalcl node
-class EqualclNode(Node):
-    #check semantics for equalcl node
-    def check_semantics(self):
-        #if equalcl node has no children, return none
-        if len(self.children) == 0:
-            return None
+        #! only works on bool, - only works on int or double
+        if operator == Vocab.NOT and operand.ttype != 'bool':
+            raise IncorrectTypeError('bool', operand.ttype)
+        if operator == Vocab.MINUS and operand.ttype not in ('int', 'double'):
+            raise IncorrectTypeError('int,double', operand.ttype)
 
-        #if equalcl node has children
-        else:
-            #check semantics for children
-            rel = self.children[1].check_semantics()
-            equalcl = self.children[2].check_semantics()
+        self.ttype = operand.ttype
+        self.dimen = 0
+        self.const = operand.const
+        self.func = UNARY_FUNCS[operator]
 
-            #if equalcl is none, return none
-            if equalcl == None:
-                return rel
+    #run code from unary node
+    def run(self, context):
+        return self.func(self.children[0].run(context))
+
+#binary node, the token is the operator and the children are the left and right operands
+class BinaryNode(Node):
+    __slots__ = ("ttype", "dimen", "const", "func")
+
+    def __init__(self, token, left, right):
+        super().__init__(token)
+        self.add_child(left)
+        self.add_child(right)
+
+    #check semantics for binary node
+    def check_semantics(self, context):
+        left = check_operand(context, self.children[0])
+        right = check_operand(context, self.children[1])
+        operator = self.token.ttype
+        leftType = left.ttype
+        rightType = right.ttype
+        self.dimen = 0
+        self.const = left.const and right.const
+        self.func = BINARY_FUNCS[operator]
+
+        #|| and && only work on bools
+        if operator in (Vocab.OR, Vocab.AND):
+            if not (leftType == 'bool' and rightType == 'bool'):
+                raise IncorrectTypeError('bool', 'int,double')
+            self.ttype = 'bool'
 
-            #rel and equalcl types are the same or either are int and double, raise error
+        #== and != work on the same types, or on a mix of int and double
+        elif operator in (Vocab.EQ, Vocab.NEQ):
             if not (
-                rel['ttype'] == equalcl['ttype'] or
-                (rel['ttype'] in ['int','double'] and equalcl['ttype'] in ['int','double'])
+                leftType == rightType or
+                (leftType in ['int', 'double'] and rightType in ['int', 'double'])
             ):
-                raise IncorrectTypeError(rel['ttype'], equalcl['ttype'])
-
-            #set rel type to bool
-            rel['ttype'] = 'bool'
-            return rel
-
-    #run code from equalcl
-    def run(self, rover, rel):
-        #if equalcl node has no children, return rel
-        if len(self.children) == 0:
-            return rel
+                raise IncorrectTypeError(leftType, rightType)
+            self.ttype = 'bool'
 
-        #if equalcl node has children
-        else:
-            #get operator
-            operator = self.children[0].token.value
-
-            #run rel child node
-            relObj = self.children[1].run(rover)
-
-            #if operator is ==, do boolean
-            if operator == '==':
-                relObj = rel == relObj
-
-            #if operator is !=, do boolean
-            elif operator == '!=':
-                relObj = rel != relObj
-
-            #run equalcl child node
-            equalcl = self.children[2].run(rover, relObj)
-            return equalcl
-
-#equality node
-class EqualityNode(Node):
-    #check semantics for equality node
-    def check_semantics(self):
-        #semantics for children nodes
-        rel = self.children[0].check_semantics()
-        equalcl = self.children[1].check_semantics()
-
-        #if equalcl is None, return rel
-        if equalcl == None:
-            return rel
-
-        #rel and equalcl types are the same or either are int and double, raise error
-        if not (
-                rel['ttype'] == equalcl['ttype'] or
-                (rel['ttype'] in ['int', 'double'] and equalcl['ttype'] in ['int', 'double'])
-        ):
-            raise IncorrectTypeError(rel['ttype'], equalcl['ttype'])
-
-        #set type of rel child as bool
-        rel['ttype'] = 'bool'
-        return rel
-    
-    #run code from equality node
-    def run(self, rover):
-        #run children nodes
-        relObj = self.children[0].run(rover)
-        equalclObj = self.children[1].run(rover, relObj)
-        return equalclObj
-
-#joincl node
-class JoinclNode(Node):
-    #check semantics for joincl node
-    def check_semantics(self):
-        #if joincl node has no children, return None
-        if len(self.children) == 0:
-            return None
-        
-        #if joincl node has children
-        else:
-            #check semantics for children nodes
-            equality = self.children[1].check_semantics()
-            joincl = self.children[2].check_semantics()
-
-            #if joincl is None, return equality
-            if joincl == None:
-                return equality
-
-            #if either child node is bool, raise error
-            if not (equality['ttype'] == 'bool' and joincl['ttype'] == 'bool'):
-                raise IncorrectTypeError('bool', 'int,double')
+        #everything else is arithmetic or a comparison, bools aren't allowed
+        elif leftType == 'bool' or rightType == 'bool':
+            raise IncorrectTypeError('int,double', 'bool')
 
-            return equality
+        #comparisons make a bool
+        elif operator in (Vocab.LT, Vocab.LTEQ, Vocab.GT, Vocab.GTEQ):
+            self.ttype = 'bool'
 
-    #run code from joincl node
-    def run(self, rover, join):
-        #if joincl node has no children, return join
-        if len(self.children) == 0:
-            return join
-        
-        #if joincl node has children
-        else:
-            #run equality child node
-            equalityObj = self.children[1].run(rover)
-
-            #do boolean
-            equalityObj = join and equalityObj
-
-            #run joincl child node
-            joinclObj = self.children[2].run(rover, equalityObj)
-            return joinclObj
-
-#join node
-class JoinNode(Node):
-    #check semantics for join node
-    def check_semantics(self):
-        #check semantics for children nodes
-        equality = self.children[0].check_semantics()
-        joincl = self.children[1].check_semantics()
-        
-        #if joincl is None, return equality
-        if joincl == None:
-            return equality
-
-        #if either is type bool, raise error
-        if not (equality['ttype'] == 'bool' and joincl['ttype'] == 'bool'):
-            raise IncorrectTypeError('bool', 'int,double')
-
-        return joincl
-
-    #run code from join node
-    def run(self, rover):
-        #run children nodes
-        equalityObj = self.children[0].run(rover)
-        joinclObj = self.children[1].run(rover, equalityObj)
-        return joinclObj
-
-#boolcl node
-class BoolclNode(Node):
-    #check semantics for boolcl node
-    def check_semantics(self):
-        #if boolcl node has no children, return None
-        if len(self.children) == 0:
-            return None
+        #division always makes a double, so does mixing int and double
+        elif operator == Vocab.DIV or leftType != rightType:
+            self.ttype = 'double'
 
-        #if boolcl has children
         else:
-            #check semantics for children nodes
-            join = self.children[1].check_semantics()
-            boolcl = self.children[2].check_semantics()
-
-            #if boolcl is None, return join
-            if boolcl == None:
-                return join
+            self.ttype = leftType
 
-            #if either child node is bool, raise error
-            if not (join['ttype'] == 'bool' and boolcl['ttype'] == 'bool'):
-                raise IncorrectTypeError('bool', 'int,double')
-
-            return join
+    #run code from binary node, both sides are always evaluated
+    def run(self, context):
+        return self.func(self.children[0].run(context), self.children[1].run(context))
 
-    #run code from boolcl node
-    def run(self, rover, boolcl):
-        #if boolcl node has no children, return boolcl input
-        if len(self.children) == 0:
-            return boolcl
+#checks an operand of a unary or binary node, locations can't be arrays
+def check_operand(context, node):
+    node.check_semantics(context)
+    if node.dimen > 0:
+        raise IncorrectTypeError('basic type', 'array')
+    return node
 
-        #if boolclnode has children
-        else:
-            #run join child node
-            joinObj = self.children[1].run(rover)
-
-            #do boolean
-            joinObj = boolcl or joinObj
-
-            #run boolcl child node
-            boolclObj = self.children[2].run(rover, joinObj)
-            return boolclObj
-
-#bool node
-class BoolNode(Node):
-    #check semantics for bool node
-    def check_semantics(self):
-        #check semantics for children nodes
-        join = self.children[0].check_semantics()
-        boolcl = self.children[1].check_semantics()
-
-        #if boolcl is None, return join
-        if boolcl == None:
-            return join
-
-        #if either child is type bool, raise error
-        if not (join['ttype'] == 'bool' and boolcl['ttype'] == 'bool'):
-            raise IncorrectTypeError('bool', 'int,double')
-
-        return boolcl
-
-    #run code from bool node
-    def run(self, rover):
-        #run child nodes
-        joinObj = self.children[0].run(rover)
-        boolclObj = self.children[1].run(rover, joinObj)
-        return boolclObj
-
-#loccl node
+#loccl node, subscripts are the index expressions of it and the
+#loccl nodes after it
 class LocclNode(Node):
+    __slots__ = ("subscripts",)
+
     #check semantics for loccl node
-    def check_semantics(self):
-        #if loccl node has no children, return info for ID var
+    def check_semantics(self, context):
+        #if loccl node has no children, there are no subscripts
         if len(self.children) == 0:
-            return {'ttype': None,
-                    'arr': False,
-                    'dimen': 0,
-                    'val': None}
+            self.subscripts = ()
 
         #if loccl node has children
         else:
-            #check semantics for child node
-            index = self.children[0].check_semantcis()
-           
-           #if first child node is not int, raise error
-            if index['ttype'] != 'int':
-                raise IncorrectTypeError('int', index['ttype'])
+            #if first child node is not int, raise error
+            index = check_operand(context, self.children[0])
+            if index.ttype != 'int':
+                raise IncorrectTypeError('int', index.ttype)
 
             #check semantics for child node
-            locclInfo = self.children[1].check_semantics()
-
-            #get info from loccl child node
-            locclInfo['dimen'] = locclInfo['dimen'] + 1
-            locclInfo['arr'] = True
-            return locclInfo
-
-    #run node from loccl node
-    def run(self, rover):
-        #if loccl node has no children, return Nonde
-        if len(self.children) == 0:
-            return None
-
-        #if loccl node has children
-        else:
-            #run child nodes
-            boolObj = self.children[0].run(rover)
-            locclObj = self.children[1].run(rover)
-
-            #if loccl child node is None, return bool child node
-            if locclObj == None:
-                return [boolObj]
-
-            #if loccl child node is not None, return bool child node and loccl child node
-            else:
-                return [boolObj] + locclObj
+            self.children[1].check_semantics(context)
+            self.subscripts = (index,) + self.children[1].subscripts
 
 #loc node
 class LocNode(Node):
-    #check semantics for loc node
-    def check_semantics(self):
+    __slots__ = ("ttype", "dimen", "const", "address", "subscripts")
+
+    #check semantics for loc node, also resolves the variable to the
+    #(depth, slot) address of its declaration
+    def check_semantics(self, context):
         #get variables
-        global SCOPE
         id = self.children[0].token.value
 
-        #check if ID is in stack
-        SCOPE.checkScopes(id)
-
         #if ID not in stack, raise error
-        if not SCOPE.checkScopes(id):
+        if not context.scope.checkScopes(id):
             raise UndeclaredError(id)
 
-        symbol = SCOPE.getId(id)
+        decl = context.scope.getId(id)[id]
+        self.address = decl.address
+        self.ttype = decl.ttype
+        self.const = False
 
-        #check semantics for type child node and get info
-        type = self.children[1].check_semantics()
-        typeDimen = symbol[id]['dimen'] - type['dimen']
+        #check semantics for the subscripts
+        self.children[1].check_semantics(context)
+        self.subscripts = self.children[1].subscripts
+        self.dimen = decl.dimen - len(self.subscripts)
 
         #if dimen is less than 0, raise error
-        if typeDimen < 0:
+        if self.dimen < 0:
             raise IncorrectTypeError('valid subscript','invalid subscript')
 
-        #if dimen is greater than 0, set arr to true, else arr to false
-        if typeDimen > 0: 
-            arr = True
-        else:
-            arr = False
-
-        #return info for ID
-        return {'ttype': symbol[id]['ttype'],
-                'arr': arr,
-                'dimen': typeDimen,
-                'val': None}
+    #run code from loc when it's read in an expression, returns the value
+    def run(self, context):
+        val = context.scope.load(self.address)
+        for index in self.subscripts:
+            val = val[index.run(context)]
+        return val
 
-    #run code from lock
-    def run(self, rover):
-        #get variables
-        global SCOPE
-        id = self.children[0].token.value
-        obj = SCOPE.getId(id)
-
-        #run child node
-        arr = self.children[1].run(rover)
-
-        #if ID is not arr, return info for array
-        if arr == None:
-            return {'id': id,
-                    'val': obj[id]['val'],
-                    'ttype': obj[id]['ttype'],
-                    'arr': []}
-
-        #if ID is arr, return info for basic var
-        else:
-            return {'id': id,
-                    'val': obj[id]['val'],
-                    'ttype': obj[id]['ttype'],
-                    'arr': arr}
-
-#stmt node
+#stmt node, kind is one of the STMT_ kinds
 class StmtNode(Node):
+    __slots__ = ("kind",)
+
     #check semantics for stmt node
-    def check_semantics(self):
+    def check_semantics(self, context):
         #if node is loc
         if isinstance(self.children[0], LocNode):
+            self.kind = STMT_ASSIGN
+
             #check semantics for children nodes
-            symbol = self.children[0].check_semantics()
-            type = self.children[2].check_semantics()
+            loc = self.children[0]
+            loc.check_semantics(context)
+            value = check_operand(context, self.children[2])
 
-            #if not symbol and type are same type/symbol & type are double and int/symbol is arr, raise error
+            #if not loc and value are same type/loc & value are double and int/loc is arr, raise error
             if (not
-            (symbol['ttype'] == type['ttype'] or (symbol['ttype'] == 'double' and type['ttype'] == 'int'))
-            or symbol['arr']
+            (loc.ttype == value.ttype or (loc.ttype == 'double' and value.ttype == 'int'))
+            or loc.dimen > 0
             ):
-                raise IncorrectTypeError(symbol['ttype'],type['ttype'])
+                raise IncorrectTypeError(loc.ttype, value.ttype)
 
         #if node is block, check semantics
         elif isinstance(self.children[0], BlockNode):
-            self.children[0].check_semantics()
+            self.kind = STMT_BLOCK
+            self.children[0].check_semantics(context)
 
         #if node is rover, check semantics for next node
-        elif self.children[0].token.value == Vocab.ROVER:
-            self.children[1].check_semantics()
+        elif self.children[0].token.ttype == Vocab.ROVER:
+            self.kind = STMT_FEATURE
+            self.children[1].check_semantics(context)
 
         #if node is IF or WHILE
-        elif self.children[0].token.value == Vocab.IF or self.children[0].token.value == Vocab.WHILE:
+        elif self.children[0].token.ttype in (Vocab.IF, Vocab.WHILE):
+            if self.children[0].token.ttype == Vocab.IF:
+                self.kind = STMT_IF
+            else:
+                self.kind = STMT_WHILE
+
             #check semantics for condition
-            condition = self.children[1].check_semantics()
+            condition = self.children[1]
+            condition.check_semantics(context)
 
             #if condition isnt bool, raise error
-            if condition['ttype'] != 'bool':
-                raise IncorrectTypeError('bool',condition['ttype'])
+            if condition.ttype != 'bool':
+                raise IncorrectTypeError('bool',condition.ttype)
             
             #check semantics for next node
-            self.children[2].check_semantics()
+            self.children[2].check_semantics(context)
 
             #if there are more than 3 nodes (ELSE), check semantics for else statement
             if len(self.children) > 3:
-                self.children[4].check_semantics()
+                self.children[4].check_semantics(context)
 
     #run code from stmt node
-    def run(self, rover):
-        global SCOPE
+    def run(self, context):
+        kind = self.kind
+
         #if node is loc
-        if isinstance(self.children[0], LocNode):
+        if kind == STMT_ASSIGN:
             #get variables
-            id = self.children[0].run(rover)
-            val = self.children[2].run(rover)
+            loc = self.children[0]
 
             #assign value to variable
-            SCOPE.assign(id, val)
+            if not loc.subscripts:
+                val = self.children[2].run(context)
+                if loc.ttype == 'int':
+                    val = int(val)
+                context.scope.store(loc.address, val)
 
-        #if node is block, run node
-        elif isinstance(self.children[0], BlockNode):
-            self.children[0].run(rover)
+            #assign value to the element of the array
+            else:
+                indices = [index.run(context) for index in loc.subscripts]
+                val = self.children[2].run(context)
+                if loc.ttype == 'int':
+                    val = int(val)
+                arr = context.scope.load(loc.address)
+                for i in indices[0:-1]:
+                    arr = arr[i]
+                arr[indices[-1]] = val
 
         #if node is rover, run next node
-        elif self.children[0].token.ttype == Vocab.ROVER:
-            self.children[1].run(rover)
+        elif kind == STMT_FEATURE:
+            self.children[1].run(context)
+
+        #if node is WHILE
+        elif kind == STMT_WHILE:
+            while True:
+                #run condition node; is false, break
+                if not (self.children[1].run(context)):
+                    break
+
+                #else, run statements
+                self.children[2].run(context)
 
         #if node is IF
-        elif self.children[0].token.ttype == Vocab.IF:
+        elif kind == STMT_IF:
             #run condition
-            boolObj = self.children[1].run(rover)
+            boolObj = self.children[1].run(context)
 
             #if condition is true, run next node
             if boolObj:
-                self.children[2].run(rover)
+                self.children[2].run(context)
 
             #if condition is false and stmt has more than 3 nodes, run else statment
-            elif len(self.children) > 3 and not boolObj:
-                self.children[4].run(rover)
+            elif len(self.children) > 3:
+                self.children[4].run(context)
 
-        #if node is WHILE
-        elif self.children[0].token.ttype == Vocab.WHILE:
-            while True:
-                #run condition node; is false, break
-                if not (self.children[1].run(rover)):
-                    break
+        #if node is an increment, add the literal to the variable
+        elif kind == STMT_INCREMENT:
+            address = self.children[0].address
+            context.scope.store(address, context.scope.load(address) + self.children[2].value)
 
-                #else, run statements
-                self.children[2].run(rover)
+        #if node is block, run node
+        elif kind == STMT_BLOCK:
+            self.children[0].run(context)
 
-#stmts node
+#stmts node, children are the flat list of stmt nodes
 class StmtsNode(Node):
+    __slots__ = ()
+
     #check semantics for stmts node
-    def check_semantics(self):
-        #if stmts node has children,check semantics
-        if len(self.children) > 0:
-            self.children[0].check_semantics()
-            self.children[1].check_semantics()
+    def check_semantics(self, context):
+        #check semantics for every statement in order
+        for stmt in self.children:
+            stmt.check_semantics(context)
 
     #run code from stmts node
-    def run(self, rover):
-        #if stmts node has children, run children nodes
-        if len(self.children) > 0:
-            self.children[0].run(rover)
-            self.children[1].run(rover)
+    def run(self, context):
+        #run every statement in order
+        for stmt in self.children:
+            stmt.run(context)
 
-#typecl node
+#typecl node, dims are the array sizes of it and the typecl nodes after it
 class TypeclNode(Node):
+    __slots__ = ("dims",)
+
     #check semantics for typecl Node
-    def check_semantics(self):
-        #if typecl node has no children, return info for basic var
+    def check_semantics(self, context):
+        #if typecl node has no children, it's a basic var
         if len(self.children) == 0:
-            return {'ttype': None,
-                    'arr': False,
-                    'dimen': 0,
-                    'val': None}
+            self.dims = ()
 
-        #if typecl node has children, return info for arr
-        else:
-            type = self.children[1].check_semantics()
-            type['dimen'] = type['dimen'] + 1
-            type['arr'] = True
-            return type
-
-    #run code from typecl node
-    def run(self, rover):
-        #if typecl node has no children, return None
-        if len(self.children) == 0:
-            return None
-        
-        #if typecl node has children
+        #if typecl node has children, add the size of this dimension
         else:
-            #get variables
-            length = int(self.children[0].token.value)
-            val = self.children[1].run(rover)
-            newArr = []
-
-            #set new arr with values found length times
-            for i in range(0, length):
-                newArr.append(val)
-
-            return newArr
+            self.children[1].check_semantics(context)
+            self.dims = (int(self.children[0].token.value),) + self.children[1].dims
 
 #type node
 class TypeNode(Node):
+    __slots__ = ("ttype", "dims")
+
     #check semantics for type node
-    def check_semantics(self):
+    def check_semantics(self, context):
         #check semantics for child node
-        typecl = self.children[1].check_semantics()
+        self.children[1].check_semantics(context)
+        self.dims = self.children[1].dims
 
         #set type to value of first child node
-        typecl['ttype'] = self.children[0].token.value
-
-        return typecl
-
-    #run code from type node
-    def run(self, rover):
-        #get value of first child node
-        ttype = self.children[0].token.value
+        self.ttype = self.children[0].token.value
 
-        #run second child node
-        arr = self.children[1].run(rover)
-
-        #if arr is None, return info
-        if arr == None:
-            return {'ttype': ttype, 'val': arr}
-
-#decl node
+#decl node, the scope maps the name to the decl node while checking
 class DeclNode(Node):
-    #check semantics for decl node
-    def check_semantics(self):
-        global SCOPE
+    __slots__ = ("ttype", "dimen", "dims", "address")
 
+    #check semantics for decl node
+    def check_semantics(self, context):
         #check semantics of child node
-        type = self.children[0].check_semantics()
+        type = self.children[0]
+        type.check_semantics(context)
 
         #get value of child node
         id = self.children[1].token.value
 
-        if id in SCOPE.top():
+        if id in context.scope.top():
             raise RedefinedError(id)
 
-        #set type
-        SCOPE.top()[id] = type
+        self.ttype = type.ttype
+        self.dims = type.dims
+        self.dimen = len(type.dims)
 
-    #run code from decl node
-    def run(self, rover):
-        global SCOPE
+        #the variable lives in the frame of the block it's declared in,
+        #at the next free slot
+        self.address = (len(context.scope.stack) - 1, len(context.scope.top()))
 
-        #run child node
-        typeObj = self.children[0].run(rover)
-
-        #get value of child node
-        id = self.children[1].token.value
+        #set type
+        context.scope.top()[id] = self
 
-        #st type
-        SCOPE.top()[id] = typeObj
+    #run code from decl node
+    def run(self, context):
+        #set the initial value, None for basic types
+        if self.dims:
+            context.scope.store(self.address, new_array(self.dims))
+        else:
+            context.scope.store(self.address, None)
 
-#decls node
+#decls node, children are the flat list of decl nodes
 class DeclsNode(Node):
+    __slots__ = ()
+
     #check semantics for decls node
-    def check_semantics(self):
-        #if decls node has children, check semantics
-        if len(self.children) > 0:
-            self.children[0].check_semantics()
-            self.children[1].check_semantics()
+    def check_semantics(self, context):
+        #check semantics for every declaration in order
+        for decl in self.children:
+            decl.check_semantics(context)
 
     #run code from decls node
-    def run(self, rover):
-        #if decls node has children, run nodes
-        if len(self.children) > 0:
-            self.children[0].run(rover)
-            self.children[1].run(rover)
+    def run(self, context):
+        #run every declaration in order
+        for decl in self.children:
+            decl.run(context)
 
 #block node
 class BlockNode(Node):
+    __slots__ = ("depth", "nslots")
+
     #check semantics for block node
-    def check_semantics(self):
-        global SCOPE
+    def check_semantics(self, context):
         #push new dict
-        SCOPE.push({})
+        context.scope.push({})
+        self.depth = len(context.scope.stack) - 1
 
-        #check semantics for children nodes
-        self.children[0].check_semantics()
-        self.children[1].check_semantics()
+        #check semantics for children nodes, the frame gets a slot for
+        #every variable declared in the block
+        try:
+            self.children[0].check_semantics(context)
+            self.children[1].check_semantics(context)
+            self.nslots = len(context.scope.top())
 
         #pop dict when done
-        SCOPE.pop()
+        finally:
+            context.scope.pop()
 
     #run code from block node
-    def run(self, rover):
-        global SCOPE
-        #push new dict
-        SCOPE.push({})
+    def run(self, context):
+        #reuse the frame for this depth
+        context.scope.enter(self.depth, self.nslots)
 
         #run children nodes
-        self.children[0].run(rover)
-        self.children[1].run(rover)
-
-        #pop dict when done
-        SCOPE.pop()
\ No newline at end of file
+        self.children[0].run(context)
+        self.children[1].run(context)
@@ -0,0 +1,84 @@
+"""
+LRU cache of compiled rover programs.
+
+Programs are keyed by a hash of their source, so resending the same
+mission script skips lexing, parsing, semantic checks and compiling.
+Only programs that compiled successfully are cached. When a directory
+is given, misses fall back to the precompiled .rvc files in it before
+compiling, and newly compiled programs are written there.
+"""
+import collections
+
+import compiler
+import program_file
+from program_file import source_hash
+
+
+class ProgramCache:
+    def __init__(self, max_size, directory=None):
+        self.max_size = max_size
+        self.directory = directory
+        self.programs = collections.OrderedDict()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.programs)
+
+    def get(self, source):
+        """Returns the CodeObject for the source, compiling it on a miss."""
+        key = source_hash(source)
+        program = self.programs.get(key)
+        if program is not None:
+            self.hits += 1
+            self.programs.move_to_end(key)
+            return program
+
+        program = self.load_from_disk(source)
+        if program is None:
+            self.misses += 1
+            program = compiler.compile_source(source)
+            self.write_to_disk(program, source)
+        else:
+            self.disk_hits += 1
+
+        if self.max_size > 0:
+            self.programs[key] = program
+            if len(self.programs) > self.max_size:
+                self.programs.popitem(last=False)
+        return program
+
+    def load_from_disk(self, source):
+        if self.directory is None:
+            return None
+        return program_file.load(program_file.cache_path(self.directory, source), source)
+
+    def write_to_disk(self, program, source):
+        if self.directory is None:
+            return
+        # Like a .pyc, failing to write the file only costs a recompile later
+        try:
+            program_file.write(
+                program_file.cache_path(self.directory, source), program, source
+            )
+        except OSError:
+            pass
+
+    def clear(self):
+        self.programs.clear()
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "size": len(self.programs),
+            "max_size": self.max_size,
+        }
+
+    def __str__(self):
+        return (
+            f"{self.hits} hits, {self.disk_hits} disk hits, {self.misses} misses, "
+            f"{len(self.programs)}/{self.max_size} programs cached"
+        )
@@ -0,0 +1,87 @@
+"""
+Reads and writes precompiled rover programs (.rvc files).
+
+A .rvc file is to a rover script what a .pyc file is to a Python module.
+It holds the compiled bytecode, so loading one skips the parser and the
+semantic checks completely. The file layout is:
+
+    magic             4 bytes   b"RVRC"
+    grammar version   uint16    parser1.GRAMMAR_VERSION
+    bytecode version  uint16    compiler.BYTECODE_VERSION
+    source hash       32 bytes  SHA-256 of the source text
+    body              marshal of (code, nslots, features)
+
+A file is only used when both versions and the source hash match,
+anything else is treated as a cache miss.
+"""
+import hashlib
+import marshal
+import os
+import pathlib
+import struct
+
+import compiler
+import parser1 as parser
+
+MAGIC = b"RVRC"
+HEADER = struct.Struct("<4sHH32s")
+SUFFIX = ".rvc"
+
+
+def source_hash(source):
+    return hashlib.sha256(source.encode("utf-8")).hexdigest()
+
+
+def cache_path(directory, source):
+    """Returns where the .rvc file for the given source lives."""
+    return pathlib.Path(directory, source_hash(source) + SUFFIX)
+
+
+def dumps(program, source):
+    header = HEADER.pack(
+        MAGIC,
+        parser.GRAMMAR_VERSION,
+        compiler.BYTECODE_VERSION,
+        bytes.fromhex(source_hash(source)),
+    )
+    return header + marshal.dumps(
+        (program.code, program.nslots, program.features)
+    )
+
+
+def loads(data, source):
+    """Returns the CodeObject in data, or None if it's stale or invalid."""
+    if len(data) < HEADER.size:
+        return None
+    magic, grammar_version, bytecode_version, digest = HEADER.unpack_from(data)
+    if (
+        magic != MAGIC
+        or grammar_version != parser.GRAMMAR_VERSION
+        or bytecode_version != compiler.BYTECODE_VERSION
+        or digest.hex() != source_hash(source)
+    ):
+        return None
+    try:
+        code, nslots, features = marshal.loads(data[HEADER.size:])
+    except (EOFError, ValueError, TypeError):
+        return None
+    return compiler.CodeObject(code, nslots, features)
+
+
+def write(path, program, source):
+    """Writes the program to path atomically, readers never see half a file."""
+    path = pathlib.Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with tmp.open("wb") as f:
+        f.write(dumps(program, source))
+    os.replace(tmp, path)
+
+
+def load(path, source):
+    """Returns the CodeObject stored at path, or None if it can't be used."""
+    try:
+        data = pathlib.Path(path).read_bytes()
+    except OSError:
+        return None
+    return loads(data, source)
@@ -1,9 +1,22 @@
+import contextlib
 import multiprocessing
+import os
 import pathlib
+import threading
 import time
 import traceback
 import random
-import parser1 as parser
+import file_watch
+import fleet_config
+import output_sink
+import vm
+from chunked_map import ChunkedMap, check_writers
+from command_queue import CommandQueue
+from map_registry import MapRegistry
+from map_render import MapRenderer
+from program_cache import ProgramCache
+from shared_map import SharedMap
+from transport import CommandListener
 
 
 class RunTimeError(Exception):
@@ -16,6 +29,40 @@ class RunTimeError(Exception):
 # The maximum amount of time that the rover can run in seconds
 MAX_RUNTIME = 36000
 
+# How commands reach the rovers. "socket" listens on the rover's socket
+# (named pipe on Windows) and still watches the command file as a
+# fallback, "file" only watches the command file.
+ROVER_TRANSPORT = "socket"
+
+# How many commands can wait to run on a rover. Senders block while
+# the queue is full, nothing is dropped.
+COMMAND_QUEUE_SIZE = 16
+
+# How long main.py waits for a rover to pick up the previous command
+# written to its command file before giving up
+COMMAND_SEND_TIMEOUT = 60
+
+# How many compiled programs each rover keeps around, 0 turns the cache off
+PROGRAM_CACHE_SIZE = 32
+
+# Where precompiled programs (.rvc files) are read from and written to
+PROGRAM_CACHE_DIR = pathlib.Path(pathlib.Path(__file__).parent.resolve(), "__rovercache__")
+
+# Map the rovers start on
+MAP_FILE = 'map.txt'
+
+# Maps switch_map can switch to, by id (map.txt is 1, mapN.txt is N)
+MAPS = MapRegistry()
+MAPS.discover()
+
+# Maps with more tiles than this are too big to count every empty tile
+# or print in full. Rovers spawn on a randomly probed tile instead
+# (giving up after SPAWN_PROBES tries), and print_map only shows the
+# PRINT_MAP_VIEW rows and columns around the rover
+LARGE_MAP_TILES = 1 << 20
+SPAWN_PROBES = 1000
+PRINT_MAP_VIEW = (21, 61)
+
 #variables needed for certain features
 cache = []
 minerals = ["Iron", "Gold", "Diamond", "Nickel"]
@@ -24,21 +71,16 @@ minerals = ["Iron", "Gold", "Diamond", "Nickel"]
 ROVER_1 = "Rover1"
 ROVER_2 = "Rover2"
 
-# Array of rovers
-ROVERS = [
-    ROVER_1,
-    ROVER_2,
-]
+# Array of rovers, registered in fleet.json (defaults to the two above)
+ROVERS = fleet_config.rover_names(fleet_config.load())
 
-# Command file is stored within the rover directory. Here we're building one file
-# for each of the rovers defined above
+# Command file is stored within the rover directory. Here we're building one path
+# for each of the rovers defined above, the file is created when the rover
+# starts watching it
 ROVER_COMMAND_FILES = {
     rover_name: pathlib.Path(pathlib.Path(__file__).parent.resolve(), f"{rover_name}.txt")
     for rover_name in ROVERS
 }
-for _, file in ROVER_COMMAND_FILES.items():
-    with file.open("w") as f:
-        pass
 
 # Constant used to store the rover command for parsing
 ROVER_COMMAND = {
@@ -46,118 +88,320 @@ ROVER_COMMAND = {
     for rover_name in ROVERS
 }
 
+def clear_command_files():
+    """Empties every command file so old commands aren't run on start up."""
+    for _, file in ROVER_COMMAND_FILES.items():
+        if file.exists():
+            with file.open("w") as f:
+                pass
+
+def write_command(rover_name, command, timeout=COMMAND_SEND_TIMEOUT):
+    """Writes a command to a rovers command file.
+
+    The command is written to a temporary file which is then renamed
+    over the command file, so the rover never sees half a command.
+    If the rover hasn't picked up the previous command yet this waits
+    for it, rather than overwriting it.
+    """
+    path = ROVER_COMMAND_FILES[rover_name]
+    deadline = time.monotonic() + timeout
+    while path.exists() and path.stat().st_size > 0:
+        if time.monotonic() >= deadline:
+            raise TimeoutError(
+                f"{rover_name} didn't pick up its last command within {timeout}s"
+            )
+        time.sleep(0.01)
+
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with tmp.open("w") as f:
+        f.write(command)
+    os.replace(tmp, path)
+
 def get_command(rover_name):
     """Checks, and gets a command from a rovers command file.
 
     It returns True when something was found, and False
-    when nothing was found. It also truncates the contents
-    of the file if it found something so that it doesn't
-    run the same command again (unless it was re-run from
-    the controller/main program).
+    when nothing was found. The file is claimed by renaming
+    it before reading, so a command written by the controller
+    while we read is never truncated away, it just lands in a
+    new command file.
     """
-    fcontent = None
-    with ROVER_COMMAND_FILES[rover_name].open() as f:
-        fcontent = f.read()
-    if fcontent is not None and fcontent:
-        ROVER_COMMAND[rover_name] = fcontent
-        with ROVER_COMMAND_FILES[rover_name].open("w+") as f:
+    path = ROVER_COMMAND_FILES[rover_name]
+    try:
+        if path.stat().st_size == 0:
+            return False
+        claimed = path.with_name(f"{path.name}.claimed")
+        os.replace(path, claimed)
+    except FileNotFoundError:
+        return False
+
+    fcontent = claimed.read_text()
+    claimed.unlink()
+    try:
+        # Put an empty command file back, unless a new command already
+        # took its place
+        with path.open("x"):
             pass
+    except FileExistsError:
+        pass
+
+    if fcontent:
+        ROVER_COMMAND[rover_name] = fcontent
         return True
     return False
 
+# True if position is at least 2 tiles inside the window from start
+# with size tiles, edges of the map count as inside
+def in_window(position, start, size, limit):
+    return (start == 0 or position >= start + 2) and (
+        start + size == limit or position < start + size - 2
+    )
+
 # Main Rover Class
 class Rover():
-    def __init__(self, name):
+    def __init__(self, name, program_cache_size=PROGRAM_CACHE_SIZE, programs=None, shared_map=None, output=None, mapfile=MAP_FILE, rng=None):
         self.name = name
-        self.mapfile = 'map.txt'  # used to change map and then reload it
+        # A random.Random that picks the spawn tile, direction and drilled
+        # minerals, None uses the random module. The module itself isn't
+        # stored, it would stop the rover being pickled for a spawned process
+        self.rng = rng
+        # Everything the rover prints goes through its output sink, see
+        # output_sink.py for the kinds
+        self.output = output_sink.make_sink(output, name)
+        # A SharedMap the rover shares with the rest of the fleet, or
+        # None for a private copy of the map file
+        self.shared_map = shared_map
+        # Rovers sharing a process can share one ProgramCache
+        if programs is None:
+            programs = ProgramCache(program_cache_size, PROGRAM_CACHE_DIR)
+        self.programs = programs
+        self.mapfile = mapfile  # used to change map and then reload it
         self.direction = 0
         self.pos_x = 0
         self.pos_y = 0
-        self.map = []
+        self.map = None
+        self.renderer = MapRenderer()
         self.front = ''
         self.inventory = []
         self.waypoint = False
         self.initialize()
+        # Before the rover is handed to another process
+        self.output.flush()
 
     def print(self, msg):
-        print(f"{self.name}: {msg}")
+        self.output.message(msg)
 
     def parse_and_execute_cmd(self, command):
         self.print(f"Running command: \n{command}")
-        tree = parser.get_parse_tree(command)
-
-        for i in tree.children:
-            i.check_semantics()
-
-        for i in tree.children:
-            try:
-                i.run(self)
-            except TypeError as te:
-                raise RunTimeError(te.args)
+        program = self.programs.get(command)
+        if not self.output.quiet:
+            self.print(f"Program cache: {self.programs}")
+        try:
+            vm.run(program, self)
+        except TypeError as te:
+            raise RunTimeError(te.args)
+        finally:
+            self.output.flush()
+
+    async def parse_and_execute_cmd_async(self, command):
+        self.print(f"Running command: \n{command}")
+        program = self.programs.get(command)
+        if not self.output.quiet:
+            self.print(f"Program cache: {self.programs}")
+        try:
+            await vm.run_async(program, self)
+        except TypeError as te:
+            raise RunTimeError(te.args)
+        finally:
+            self.output.flush()
+
+    def run_command(self, command):
+        """Runs a command, returns (ok, error) so it can be reported back."""
+        try:
+            self.parse_and_execute_cmd(command)
+        except Exception as e:
+            error = traceback.format_exc()
+            self.print(f"Failed to run command: {command}")
+            self.print(error)
+            return False, error
+        finally:
+            self.finish_command()
+        return True, None
+
+    def finish_command(self):
+        # Changed chunks of a chunked map are written back between commands
+        self.map.flush()
+        if isinstance(self.map, ChunkedMap):
+            self.print(f"Map chunks: {self.map}")
+        self.print("Finished running command.\n\n")
+        self.output.flush()
+
+    async def run_command_async(self, command):
+        """Like run_command, but gives other rovers a turn after every feature."""
+        try:
+            await self.parse_and_execute_cmd_async(command)
+        except Exception as e:
+            error = traceback.format_exc()
+            self.print(f"Failed to run command: {command}")
+            self.print(error)
+            return False, error
+        finally:
+            self.finish_command()
+        return True, None
+
+    def watch_command_file(self, on_command):
+        # Blocks on change notifications for the command file and hands
+        # every command found in it to on_command
+        path = ROVER_COMMAND_FILES[self.name]
+        path.touch(exist_ok=True)
+        watcher = file_watch.watch(path)
+        while True:
+            if get_command(self.name):
+                on_command(ROVER_COMMAND[self.name], None)
+            watcher.wait()
+
+    def wait_for_command(self, transport=ROVER_TRANSPORT):
+        # Commands from the socket and the command file are queued here
+        # and run back to back, socket commands along with the function
+        # used to send their completion status back
+        commands = CommandQueue(COMMAND_QUEUE_SIZE)
+
+        listener = None
+        if transport == "socket":
+            listener = CommandListener(self.name, commands.put)
+            listener.start()
+        threading.Thread(
+            target=self.watch_command_file,
+            args=(commands.put,),
+            name=f"{self.name}-file-watcher",
+            daemon=True,
+        ).start()
 
-    def wait_for_command(self):
         start = time.time()
-        while (time.time() - start) < MAX_RUNTIME:
-            # Sleep 5 seconds before trying to check for
-            # content again
-            self.print("Waiting for command...")
-            time.sleep(5)
-            if get_command(self.name):
-                self.print("Found a command...")
-                try:
-                    self.parse_and_execute_cmd(ROVER_COMMAND[self.name])
-                except Exception as e:
-                    self.print(f"Failed to run command: {ROVER_COMMAND[self.name]}")
-                    self.print(traceback.format_exc())
-                finally:
-                    self.print("Finished running command.\n\n")
+        try:
+            while True:
+                remaining = MAX_RUNTIME - (time.time() - start)
+                if remaining <= 0:
+                    break
+                if len(commands) == 0:
+                    self.print("Waiting for command...")
+                    self.output.flush()
+                item = commands.get(timeout=remaining)
+                if item is None:
+                    break
+
+                self.print(
+                    f"Found command #{item.seq} "
+                    f"(waited {item.wait_time:.3f}s, {len(commands)} more queued)"
+                )
+                ok, error = self.run_command(item.command)
+                if item.reply is not None:
+                    item.reply(ok, error)
+        finally:
+            if listener is not None:
+                listener.close()
+            stats = commands.stats()
+            self.print(
+                f"Ran {stats['run']} commands, max queue depth {stats['max_depth']}, "
+                f"average wait {stats['average_wait']:.3f}s"
+            )
+            self.output.flush()
+
+    async def wait_for_command_async(self, commands):
+        # The asyncio version of wait_for_command used by async_fleet.py,
+        # commands is an asyncio.Queue of QueuedCommands for this rover
+        while True:
+            if commands.empty():
+                self.print("Waiting for command...")
+                self.output.flush()
+            item = await commands.get()
+            self.print(
+                f"Found command #{item.seq} "
+                f"(waited {item.wait_time:.3f}s, {commands.qsize()} more queued)"
+            )
+            ok, error = await self.run_command_async(item.command)
+            if item.reply is not None:
+                item.reply(ok, error)
 
 # Takes the map file, puts it into a 2D array and initializes the rover on a random tile with a random direction
     def initialize(self):
-        self.map = []
-        with open(self.mapfile, 'r') as m:
-            for row in m.readlines():
-                row.split('\n')
-                newRow = []
-                for c in row:
-                    if c != '\n':
-                        newRow.append(c)
-                    elif c == '\n':
-                        self.map.append(newRow)
-            self.map.append(newRow)  #appends final row
+        if self.shared_map is not None:
+            self.map = self.shared_map
+        else:
+            # A copy of the map's template, large maps are memory mapped
+            self.map = MAPS.load(self.mapfile)
 # Place rover on map
-        spawnable = 0
-        self.direction = random.randint(0,3)
-        xcoords =[]
-        ycoords =[]
-        for x in range(len(self.map)):
-            for y in range(len(self.map[x])):
-                if self.map[x][y] == ' ':
-                    spawnable += 1
-                    xcoords.append(x)
-                    ycoords.append(y)
-        spawn_tile = random.randint(0,spawnable-1)
-        self.map[xcoords[spawn_tile]][ycoords[spawn_tile]] = self.roverchar()
-        self.pos_x = xcoords[spawn_tile]
-        self.pos_y = ycoords[spawn_tile]
+        self.direction = (self.rng or random).randint(0,3)
+        while True:
+            x, y = self.pick_spawn_tile()
+            with self.map_lock(x):
+                # Another rover on a shared map may have taken the tile
+                if self.map.get(x, y) == ' ':
+                    self.map.set(x, y, self.roverchar())
+                    break
+        self.pos_x = x
+        self.pos_y = y
+        self.record_position()
         self.print_map()
 
-# Shows current state of map
+# Tells a shared map where the rover is, so the fleet can clear its tile if its worker dies
+    def record_position(self):
+        if self.shared_map is not None:
+            self.shared_map.place(self.name, self.pos_x, self.pos_y)
+
+# Picks a random empty tile, without reading the whole map when it's large
+    def pick_spawn_tile(self):
+        if self.map.width * self.map.height > LARGE_MAP_TILES:
+            for _ in range(SPAWN_PROBES):
+                x = (self.rng or random).randrange(self.map.height)
+                y = (self.rng or random).randrange(self.map.width)
+                if self.map.get(x, y) == ' ':
+                    return x, y
+        spawnable = self.map.count(' ')
+        if spawnable == 0:
+            raise RunTimeError("No empty tile left to place the rover on")
+        return self.map.nth(' ', (self.rng or random).randint(0,spawnable-1))
+
+# Keeps rovers sharing the map out of the given rows while a tile is
+# looked at and changed, does nothing on a private map
+    def map_lock(self, *rows):
+        if self.shared_map is None:
+            return contextlib.nullcontext()
+        return self.shared_map.locked(*rows)
+
+# Locks the rows around the rover, covers every tile next to it
+    def surroundings_lock(self):
+        return self.map_lock(self.pos_x - 1, self.pos_x, self.pos_x + 1)
+
+# Shows current state of map, only what changed after the first time
     def print_map(self):
-        print("printing map")
-        for row in self.map:
-            print(*row,sep="")
+        if self.output.quiet:
+            return
+        view = None
+        if self.map.width * self.map.height > LARGE_MAP_TILES:
+            rows, columns = PRINT_MAP_VIEW
+            view = self.renderer.view
+            # Keep the window where it is while the rover is well inside
+            # it (or the window is against the map's edge), moving it
+            # means drawing the whole window again
+            if self.renderer.grid is not self.map or not (
+                in_window(self.pos_x, view[0], view[2], self.map.height)
+                and in_window(self.pos_y, view[1], view[3], self.map.width)
+            ):
+                view = (max(0, self.pos_x - rows // 2), max(0, self.pos_y - columns // 2), rows, columns)
+        self.output.write(self.renderer.frame(self.map, view), "map")
 
 # changes the map and initializes rover on new map
     def switch_map(self,mnum):
-        if mnum == 1:
-            self.mapfile = 'map.txt'
-        elif mnum == 2:
-            self.mapfile = 'map2.txt'
-        elif mnum == 3:
-            self.mapfile = 'map3.txt'
-        elif mnum == 4:
-            self.mapfile = 'map4.txt'
+        if self.shared_map is not None:
+            raise RunTimeError("switch_map can't be used while the fleet shares one map")
+        try:
+            self.mapfile = MAPS.path(mnum)
+        except KeyError:
+            raise RunTimeError(f"Unknown map {mnum}, the registered maps are {MAPS.ids()}")
+        # A chunked map keeps changed chunks in memory and its file open
+        if isinstance(self.map, ChunkedMap):
+            self.map.close()
         self.initialize()
 
 # Helper function that changes the character of the rover to indicate direction
@@ -177,11 +421,14 @@ class Rover():
     def info(self):
         self.print_pos()
         self.looking()
-        self.print(f"Looking at: {self.front}")
+        if not self.output.quiet:
+            self.print(f"Looking at: {self.front}")
         self.facing()
 
 # shows the rover's position
     def print_pos(self):
+        if self.output.quiet:
+            return
         position = [self.pos_x, self.pos_y]
         self.print(f"Position: {position}")
 
@@ -189,108 +436,113 @@ class Rover():
     def looking(self):
         looking_at = []
         if self.direction == 0:
-            self.front = self.map[self.pos_x - 1][self.pos_y]
+            self.front = self.map.get(self.pos_x - 1, self.pos_y)
             looking_at.append(self.pos_x - 1)
             looking_at.append(self.pos_y)
         elif self.direction == 1:
-            self.front = self.map[self.pos_x][self.pos_y + 1]
+            self.front = self.map.get(self.pos_x, self.pos_y + 1)
             looking_at.append(self.pos_x)
             looking_at.append(self.pos_y + 1)
         elif self.direction == 2:
-            self.front = self.map[self.pos_x + 1][self.pos_y]
+            self.front = self.map.get(self.pos_x + 1, self.pos_y)
             looking_at.append(self.pos_x + 1)
             looking_at.append(self.pos_y)
         elif self.direction == 3:
-            self.front = self.map[self.pos_x][self.pos_y - 1]
+            self.front = self.map.get(self.pos_x, self.pos_y - 1)
             looking_at.append(self.pos_x)
             looking_at.append(self.pos_y - 1)
         return looking_at
 
 # Prints the direction that the rover is facing
     def facing(self):
-        print("Rover is facing: ")
+        self.output.line("Rover is facing: ")
         if self.direction == 0:
-            print("Direction - North (0)")
+            self.output.line("Direction - North (0)")
         elif self.direction == 1:
-            print("Direction - East (1)")
+            self.output.line("Direction - East (1)")
         elif self.direction == 2:
-            print("Direction - South (2)")
+            self.output.line("Direction - South (2)")
         elif self.direction == 3:
-            print("Direction - West (3)")
+            self.output.line("Direction - West (3)")
 
 # Self-explanatory, rotates the rover and calls roverchar to change how it looks on the map
     def turnLeft(self):
         if self.direction == 0:  #North
             self.direction = 3
-            self.map[self.pos_x][self.pos_y] = self.roverchar()
+            self.map.set(self.pos_x, self.pos_y, self.roverchar())
         else:
             self.direction -= 1
-            self.map[self.pos_x][self.pos_y] = self.roverchar()
+            self.map.set(self.pos_x, self.pos_y, self.roverchar())
 
 # Self-explanatory, rotates the rover and calls roverchar to change how it looks on the map
     def turnRight(self):
         if self.direction == 3: #West
             self.direction = 0
-            self.map[self.pos_x][self.pos_y] = self.roverchar()
+            self.map.set(self.pos_x, self.pos_y, self.roverchar())
         else:
             self.direction += 1
-            self.map[self.pos_x][self.pos_y] = self.roverchar()
+            self.map.set(self.pos_x, self.pos_y, self.roverchar())
 
 # Moves the rover to a new space, has some helper code for the Waypoint function
     def move_tile(self):
-        self.looking()
-        if self.front == ' ':
-            if self.direction == 0:
-                self.pos_x -= 1
-                self.map[self.pos_x][self.pos_y] = self.roverchar()
-                if self.waypoint == True:
-                    self.map[self.pos_x+1][self.pos_y] = 'W'
-                    self.waypoint = False
-                else:
-                    self.map[self.pos_x+1][self.pos_y] = ' '
-
-            elif self.direction == 1:
-                self.pos_y += 1
-                self.map[self.pos_x][self.pos_y] = self.roverchar()
-                if self.waypoint == True:
-                    self.map[self.pos_x][self.pos_y-1] = 'W'
-                    self.waypoint = False
-                else:
-                    self.map[self.pos_x][self.pos_y-1] = ' '
-
-            elif self.direction == 2:
-                self.pos_x += 1
-                self.map[self.pos_x][self.pos_y] = self.roverchar()
-                if self.waypoint == True:
-                    self.map[self.pos_x-1][self.pos_y] = 'W'
-                    self.waypoint = False
-                else:
-                    self.map[self.pos_x-1][self.pos_y] = ' '
-
-            elif self.direction == 3:
-                self.pos_y -= 1
-                self.map[self.pos_x][self.pos_y] = self.roverchar()
-                if self.waypoint == True:
-                    self.map[self.pos_x][self.pos_y+1] = 'W'
-                    self.waypoint = False
-                else:
-                    self.map[self.pos_x][self.pos_y+1] = ' '
-        else:
-            self.print("Cannot move here, occupied tile")
+        with self.surroundings_lock():
+            self.looking()
+            if self.front == ' ':
+                if self.direction == 0:
+                    self.pos_x -= 1
+                    self.map.set(self.pos_x, self.pos_y, self.roverchar())
+                    if self.waypoint == True:
+                        self.map.set(self.pos_x+1, self.pos_y, 'W')
+                        self.waypoint = False
+                    else:
+                        self.map.set(self.pos_x+1, self.pos_y, ' ')
+
+                elif self.direction == 1:
+                    self.pos_y += 1
+                    self.map.set(self.pos_x, self.pos_y, self.roverchar())
+                    if self.waypoint == True:
+                        self.map.set(self.pos_x, self.pos_y-1, 'W')
+                        self.waypoint = False
+                    else:
+                        self.map.set(self.pos_x, self.pos_y-1, ' ')
+
+                elif self.direction == 2:
+                    self.pos_x += 1
+                    self.map.set(self.pos_x, self.pos_y, self.roverchar())
+                    if self.waypoint == True:
+                        self.map.set(self.pos_x-1, self.pos_y, 'W')
+                        self.waypoint = False
+                    else:
+                        self.map.set(self.pos_x-1, self.pos_y, ' ')
+
+                elif self.direction == 3:
+                    self.pos_y -= 1
+                    self.map.set(self.pos_x, self.pos_y, self.roverchar())
+                    if self.waypoint == True:
+                        self.map.set(self.pos_x, self.pos_y+1, 'W')
+                        self.waypoint = False
+                    else:
+                        self.map.set(self.pos_x, self.pos_y+1, ' ')
+                self.record_position()
+            else:
+                self.print("Cannot move here, occupied tile")
 
 # Drilling function, turns a depleted D space into an X
     def drill(self):
-        space = self.looking()
-        if self.front != 'D':
-            self.print("Cannot Drill - Not a mining node (D space)")
-        elif self.front == 'D':
-            mineral = random.randint(0,3)
-            self.inventory.append(minerals[mineral])
-            self.map[space[0]][space[1]] = 'X'
+        with self.surroundings_lock():
+            space = self.looking()
+            if self.front != 'D':
+                self.print("Cannot Drill - Not a mining node (D space)")
+            elif self.front == 'D':
+                mineral = (self.rng or random).randint(0,3)
+                self.inventory.append(minerals[mineral])
+                self.map.set(space[0], space[1], 'X')
 
 # Shows what the rover has in its inventory
     def print_inv(self):
-        print("INVENTORY:")
+        if self.output.quiet:
+            return
+        self.output.line("INVENTORY:")
         iron_count,gold_count,dia_count,nick_count = 0,0,0,0
         for i in self.inventory:
             if i == 'Iron':
@@ -301,63 +553,60 @@ class Rover():
                 dia_count += 1
             if i == 'Nickel':
                 nick_count += 1
-        print(f"IRON x {iron_count}")
-        print(f"GOLD x {gold_count}")
-        print(f"DIAMOND x {dia_count}")
-        print(f"NICKEL x {nick_count}")
+        self.output.line(f"IRON x {iron_count}")
+        self.output.line(f"GOLD x {gold_count}")
+        self.output.line(f"DIAMOND x {dia_count}")
+        self.output.line(f"NICKEL x {nick_count}")
 
 # Lets the user know how many D spaces are remaining and their coordinates
     def envScan(self):
-        total_nodes = 0
-        locations = []
-        for x in range(len(self.map)):
-            for y in range(len(self.map[x])):
-                if self.map[x][y] == 'D':
-                    total_nodes += 1
-                    locations.append([x,y])
-        str(total_nodes)
+        if self.output.quiet:
+            return
+        locations = self.map.find('D')
+        total_nodes = len(locations)
         self.print(f"The total number of remaining nodes = {total_nodes}")
         if total_nodes != 0:
             self.print("They can be found at the following coordinates:")
-        for i in locations:
-            print(i)
+        for x, y in locations:
+            self.output.line([x, y])
 
 # Destroys a wall right in front of the rover, can also be used to remove caches and waypoints
 # Used also to prevent rover from getting stuck,
     def bomb(self):
-        target = self.looking()
-        if self.front == 'X' or self.front == 'C' or self.front == 'W': #destroy caches and waypoints
-            self.print("BOOM! Target destroyed!")
-            self.map[target[0]][target[1]] = ' '
-        elif self.front == 'D' or self.front == ' ':
-            self.print("Cannot detonate")
+        with self.surroundings_lock():
+            target = self.looking()
+            if self.front == 'X' or self.front == 'C' or self.front == 'W': #destroy caches and waypoints
+                self.print("BOOM! Target destroyed!")
+                self.map.set(target[0], target[1], ' ')
+            elif self.front == 'D' or self.front == ' ':
+                self.print("Cannot detonate")
 
 # Places a W after a movement to indicate a waypoint
     def waypoint_set(self):
-        self.waypoint = True
-        for x in range(len(self.map)):
-            for y in range(len(self.map[x])):
-                if self.map[x][y] == 'W':
-                    self.waypoint = False
+        # Only one waypoint can be on the map at a time
+        self.waypoint = self.map.count('W') == 0
         self.print("After my next movement, the space immediately behind me will become a waypoint")
 
 # Automatically jump to a waypoint previously set
     def moveto_waypoint(self):
-        for x in range(len(self.map)):
-            for y in range(len(self.map[x])):
-                if self.map[x][y] == 'W':
-                    self.map[self.pos_x][self.pos_y] = ' '
-                    self.pos_x = x
-                    self.pos_y = y
-                    self.map[x][y] = self.roverchar()
+        with self.map_lock(*range(self.map.height)):
+            waypoints = self.map.find('W')
+            if waypoints:
+                x, y = waypoints[0]
+                self.map.set(self.pos_x, self.pos_y, ' ')
+                self.pos_x = x
+                self.pos_y = y
+                self.map.set(x, y, self.roverchar())
+                self.record_position()
 
 # Places a C space into which your items can be dumped
     def cache_make(self):
-        spot = self.looking()
-        if self.front == ' ':
-            self.map[spot[0]][spot[1]] = 'C'
-        else:
-            self.print("Invalid Tile, can only place cache on empty tiles")
+        with self.surroundings_lock():
+            spot = self.looking()
+            if self.front == ' ':
+                self.map.set(spot[0], spot[1], 'C')
+            else:
+                self.print("Invalid Tile, can only place cache on empty tiles")
 
 # Dumps items into aforementioned cache
     def cache_dump(self):
@@ -370,22 +619,35 @@ class Rover():
 
 # Prints 'S' to the left and right of the rover's position (Solar Panels)
     def charge(self):
-        if self.map[self.pos_x][self.pos_y+1] != ' ' or self.map[self.pos_x][self.pos_y-1] != ' ':
-            self.print("Not enough room to charge")
-        elif self.map[self.pos_x][self.pos_y+1] == ' ' and self.map[self.pos_x][self.pos_y-1] == ' ':
-            self.map[self.pos_x][self.pos_y+1] = 'S'
-            self.map[self.pos_x][self.pos_y-1] = 'S'
-            self.print("Solar Panels Deployed, Rover Charging")
-            self.print_map()
-            self.map[self.pos_x][self.pos_y+1] = ' '
-            self.map[self.pos_x][self.pos_y-1] = ' '
-            self.print("Charging Complete. Retracting Solar Panels")
+        with self.surroundings_lock():
+            if self.map.get(self.pos_x, self.pos_y+1) != ' ' or self.map.get(self.pos_x, self.pos_y-1) != ' ':
+                self.print("Not enough room to charge")
+            elif self.map.get(self.pos_x, self.pos_y+1) == ' ' and self.map.get(self.pos_x, self.pos_y-1) == ' ':
+                self.map.set(self.pos_x, self.pos_y+1, 'S')
+                self.map.set(self.pos_x, self.pos_y-1, 'S')
+                self.print("Solar Panels Deployed, Rover Charging")
+                self.print_map()
+                self.map.set(self.pos_x, self.pos_y+1, ' ')
+                self.map.set(self.pos_x, self.pos_y-1, ' ')
+                self.print("Charging Complete. Retracting Solar Panels")
 
 def main():
-    # Initialize the rovers
-    rover1 = Rover(ROVER_1)
-    rover2 = Rover(ROVER_2)
-    my_rovers = [rover1,rover2]
+    clear_command_files()
+
+    # The rovers share one map in shared memory when fleet.json
+    # turns it on
+    config = fleet_config.load()
+    check_writers(MAP_FILE, len(ROVERS), fleet_config.shared_map(config))
+    shared_map = None
+    if fleet_config.shared_map(config):
+        shared_map = SharedMap.from_file(MAP_FILE)
+
+    # Initialize the rovers, one process each. Use fleet.py to run a
+    # large fleet on a pool of worker processes instead
+    my_rovers = [
+        Rover(rover_name, shared_map=shared_map, output=fleet_config.output(config))
+        for rover_name in ROVERS
+    ]
 
     # Run the rovers in parallel
     procs = []
@@ -395,8 +657,12 @@ def main():
         procs.append(p)
 
     # Wait for the rovers to stop running (after MAX_RUNTIME)
-    for p in procs:
-        p.join()
+    try:
+        for p in procs:
+            p.join()
+    finally:
+        if shared_map is not None:
+            shared_map.close()
 
 
 if __name__=="__main__":
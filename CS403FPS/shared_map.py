@@ -0,0 +1,162 @@
+"""
+Map grid shared by every rover process through multiprocessing.shared_memory.
+
+The shared memory block holds a small header followed by the tiles:
+
+    width     uint32
+    height    uint32
+    version   uint32    bumped on every write
+    rovers    uint32    number of rover positions after the tiles
+    tiles     width * height bytes, one character per tile, row by row
+    positions rovers * (int32 x, int32 y), -1 when the rover isn't on the map
+
+Every process maps the same block, so a tile drilled, bombed or moved
+onto by one rover is seen by all of them without copying anything.
+SharedMap is a Grid over the tiles in the block. Writes take the lock of
+the row they change. Rows share a fixed number of locks
+(ROW_LOCK_STRIPES), and locked() holds the locks of several rows at
+once so a rover can look at a tile and change it without another rover
+getting in between.
+
+Rovers record where they are with place(), so the fleet supervisor can
+take the marker of a rover whose worker died off the map with
+remove_rover() before it spawns a fresh one.
+"""
+import contextlib
+import multiprocessing
+import os
+import struct
+from multiprocessing import shared_memory
+
+import chunked_map
+from grid import Grid, load
+
+HEADER = struct.Struct("<IIII")
+VERSION = struct.Struct("<I")
+VERSION_OFFSET = 8
+POSITION = struct.Struct("<ii")
+
+# Tiles showing a rover, see Rover.roverchar
+ROVER_TILES = "^>v<"
+
+# How many locks the rows are spread over
+ROW_LOCK_STRIPES = 16
+
+
+class SharedMap(Grid):
+    def __init__(self, shm, locks, version_lock, rover_names=(), owner=False):
+        self.shm = shm
+        self.locks = locks
+        self.version_lock = version_lock
+        self.rover_names = tuple(rover_names)
+        # Only the process that created the block removes it, forked
+        # children get a copy of this object too
+        self.owner_pid = os.getpid() if owner else None
+        width, height, _, _ = HEADER.unpack_from(shm.buf)
+        self.rover_offsets = {
+            rover_name: HEADER.size + width * height + i * POSITION.size
+            for i, rover_name in enumerate(self.rover_names)
+        }
+        # No tile index, it would miss the writes of other processes
+        super().__init__(
+            width, height, shm.buf[HEADER.size:HEADER.size + width * height], indexed=""
+        )
+
+    @classmethod
+    def create(cls, grid, rover_names=()):
+        """Returns a SharedMap holding a copy of the grid, with room for
+        the positions of the named rovers."""
+        size = grid.width * grid.height
+        shm = shared_memory.SharedMemory(
+            create=True, size=HEADER.size + size + len(rover_names) * POSITION.size
+        )
+        HEADER.pack_into(shm.buf, 0, grid.width, grid.height, 0, len(rover_names))
+        for i in range(len(rover_names)):
+            POSITION.pack_into(shm.buf, HEADER.size + size + i * POSITION.size, -1, -1)
+        if isinstance(grid, Grid) and grid.stride == grid.width:
+            shm.buf[HEADER.size:HEADER.size + size] = grid.tiles
+        else:
+            for x in range(grid.height):
+                start = HEADER.size + x * grid.width
+                shm.buf[start:start + grid.width] = grid.row(x).encode("ascii")
+        locks = [multiprocessing.RLock() for _ in range(ROW_LOCK_STRIPES)]
+        return cls(shm, locks, multiprocessing.Lock(), rover_names, owner=True)
+
+    @classmethod
+    def from_file(cls, path, rover_names=()):
+        # Would copy the whole chunk file into memory, then write nowhere
+        chunked_map.check_writers(path, len(rover_names), shared_map=True)
+        return cls.create(load(path), rover_names)
+
+    # Rovers holding the map are pickled when processes are spawned
+    # instead of forked, the child attaches to the same block
+    def __getstate__(self):
+        return self.shm.name, self.locks, self.version_lock, self.rover_names
+
+    def __setstate__(self, state):
+        name, locks, version_lock, rover_names = state
+        self.__init__(shared_memory.SharedMemory(name), locks, version_lock, rover_names)
+
+    @property
+    def version(self):
+        return VERSION.unpack_from(self.shm.buf, VERSION_OFFSET)[0]
+
+    def set(self, x, y, tile):
+        i = self.index(x, y)
+        with self.row_lock(x):
+            self.tiles[i] = ord(tile)
+            with self.version_lock:
+                version = VERSION.unpack_from(self.shm.buf, VERSION_OFFSET)[0]
+                VERSION.pack_into(self.shm.buf, VERSION_OFFSET, (version + 1) & 0xFFFFFFFF)
+
+    def place(self, rover_name, x, y):
+        """Records where a rover is, rovers without a position slot are ignored."""
+        offset = self.rover_offsets.get(rover_name)
+        if offset is not None:
+            POSITION.pack_into(self.shm.buf, offset, x, y)
+
+    def position(self, rover_name):
+        """Returns where the rover was last placed, None if it isn't on the map."""
+        offset = self.rover_offsets.get(rover_name)
+        if offset is None:
+            return None
+        x, y = POSITION.unpack_from(self.shm.buf, offset)
+        return None if x < 0 else (x, y)
+
+    def remove_rover(self, rover_name):
+        """Clears the tile of a rover that is gone, if its marker is still there."""
+        position = self.position(rover_name)
+        if position is None:
+            return
+        x, y = position
+        with self.row_lock(x):
+            if self.get(x, y) in ROVER_TILES:
+                self.set(x, y, ' ')
+        self.place(rover_name, -1, -1)
+
+    def track_changes(self):
+        # Other processes write to the map without going through set()
+        return False
+
+    def row_lock(self, x):
+        # Negative rows wrap around like they do in index()
+        return self.locks[x % self.height % len(self.locks)]
+
+    @contextlib.contextmanager
+    def locked(self, *rows):
+        """Holds the locks of the given rows, always taken in the same order."""
+        stripes = sorted({x % self.height % len(self.locks) for x in rows})
+        locks = [self.locks[i] for i in stripes]
+        for lock in locks:
+            lock.acquire()
+        try:
+            yield
+        finally:
+            for lock in reversed(locks):
+                lock.release()
+
+    def close(self):
+        self.tiles.release()
+        self.shm.close()
+        if self.owner_pid == os.getpid():
+            self.shm.unlink()
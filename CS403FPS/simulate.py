@@ -0,0 +1,163 @@
+"""
+Headless simulation, runs one program from many random spawns.
+
+For mission planning the same program is run once per seed. Each run
+puts a new rover on its own copy of the map with its own
+random.Random(seed), which picks the spawn tile, the direction and the
+drilled minerals, and runs the program straight through on the VM. The
+caller's random module is left alone. The rover writes to a
+null output sink, so nothing is formatted or printed, and there are no
+command files or queues to wait on.
+
+The program is compiled once per batch of seeds and the map parsed once
+per process (see map_registry.py). Batches are spread over one worker
+process per CPU.
+
+    from simulate import simulate
+    summaries = simulate(source, seeds=1000)
+
+or from the command line:
+    python simulate.py parsing-tests/test.txt 1000 [map file]
+
+Every run gives a summary dict:
+
+    seed        the seed it ran with
+    ok          False if the program failed or was stopped, after
+                MAX_FEATURES features or MAX_ITERATIONS loop iterations
+    error       why it failed, None if it didn't
+    features    how many rover features the program ran
+    position    the rover's final [x, y]
+    direction   the rover's final direction
+    inventory   {"Iron": 2, ...} of what it drilled
+    nodes_left  D tiles left on its map
+"""
+import collections
+import multiprocessing
+import os
+import pathlib
+import random
+import sys
+import time
+
+import chunked_map
+import compiler
+import vm
+from rover import MAP_FILE, Rover
+
+# A run is stopped after this many rover features, or this many loop
+# iterations for loops that don't run any, so a program that never ends
+# doesn't hold up the rest
+MAX_FEATURES = 100000
+MAX_ITERATIONS = 1000000
+
+# Fewer seeds than this run in this process, starting the workers would
+# take longer than the runs
+PARALLEL_MIN_SEEDS = 64
+
+
+def run_seed(program, mapfile, seed, max_features=MAX_FEATURES):
+    """Runs a CodeObject on a new rover spawned with the seed, returns its summary."""
+    features = 0
+    error = None
+    try:
+        rover = Rover(f"Sim{seed}", output="null", mapfile=mapfile, rng=random.Random(seed))
+    except Exception as e:
+        return {
+            "seed": seed,
+            "ok": False,
+            "error": f"{type(e).__name__}: {e}",
+            "features": 0,
+            "position": None,
+            "direction": None,
+            "inventory": {},
+            "nodes_left": None,
+        }
+
+    try:
+        for _ in vm.steps(program, rover, MAX_ITERATIONS):
+            features += 1
+            if features >= max_features:
+                error = f"Stopped after {max_features} features"
+                break
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+
+    return {
+        "seed": seed,
+        "ok": error is None,
+        "error": error,
+        "features": features,
+        "position": [rover.pos_x, rover.pos_y],
+        "direction": rover.direction,
+        "inventory": dict(collections.Counter(rover.inventory)),
+        "nodes_left": rover.map.count("D"),
+    }
+
+
+def run_seeds(source, mapfile, seeds, max_features=MAX_FEATURES):
+    program = compiler.compile_source(source)
+    return [run_seed(program, mapfile, seed, max_features) for seed in seeds]
+
+
+def simulate(source, seeds=100, mapfile=MAP_FILE, workers=None, max_features=MAX_FEATURES):
+    """Runs the program once per seed, returns the summaries in seed order.
+
+    seeds is a number of seeds (0 to seeds - 1) or the seeds themselves.
+    """
+    seeds = list(range(seeds) if isinstance(seeds, int) else seeds)
+    # Every run would write its changes back to a chunk file
+    chunked_map.check_writers(mapfile, len(seeds))
+    # Programs that don't compile fail here instead of in every worker
+    compiler.compile_source(source)
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(seeds) < PARALLEL_MIN_SEEDS:
+        return run_seeds(source, mapfile, seeds, max_features)
+
+    # A few batches per worker so they finish around the same time
+    size = -(-len(seeds) // (workers * 4))
+    batches = [seeds[i:i + size] for i in range(0, len(seeds), size)]
+    with multiprocessing.Pool(min(workers, len(batches))) as pool:
+        results = pool.starmap(
+            run_seeds, [(source, mapfile, batch, max_features) for batch in batches]
+        )
+    return [summary for batch in results for summary in batch]
+
+
+def report(summaries):
+    """Returns a few lines summing up a simulation."""
+    ok = sum(summary["ok"] for summary in summaries)
+    lines = [f"{len(summaries)} runs, {ok} finished, {len(summaries) - ok} failed"]
+
+    nodes_left = [s["nodes_left"] for s in summaries if s["nodes_left"] is not None]
+    if nodes_left:
+        lines.append(
+            f"D nodes left: min {min(nodes_left)}, "
+            f"mean {sum(nodes_left) / len(nodes_left):.2f}, max {max(nodes_left)}"
+        )
+    minerals = collections.Counter()
+    for summary in summaries:
+        minerals.update(summary["inventory"])
+    if minerals:
+        lines.append("Minerals per run: " + ", ".join(
+            f"{mineral} {count / len(summaries):.2f}"
+            for mineral, count in sorted(minerals.items())
+        ))
+    errors = collections.Counter(s["error"] for s in summaries if s["error"] is not None)
+    for error, count in errors.most_common(5):
+        lines.append(f"{count} x {error}")
+    return lines
+
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (2, 3, 4):
+        raise Exception("Usage: python simulate.py <program file> [seeds] [map file]")
+    source = pathlib.Path(sys.argv[1]).read_text()
+    seeds = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    mapfile = sys.argv[3] if len(sys.argv) > 3 else MAP_FILE
+
+    start = time.time()
+    summaries = simulate(source, seeds, mapfile)
+    for line in report(summaries):
+        print(line)
+    print(f"Took {time.time() - start:.2f}s")
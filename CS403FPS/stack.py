@@ -3,6 +3,9 @@ from Errors import UndefinedError
 class stack:
     def __init__(self):
         self.stack = []
+        # frames of the running program by block depth, a list with a
+        # slot for each variable
+        self.frames = []
 
     def push(self, val):
         self.stack.append(val)
@@ -33,29 +36,22 @@ class stack:
 
         raise UndefinedError(id)
 
-
-    def assign(self, obj, val):
-        id = obj['id']
-        ttype = obj['ttype']
-        if ttype == 'int':
-            val = int(val)
-
-        if len(obj['arr']) == 0:
-            i = len(self.stack)-1
-            while i >= 0:
-                if id in self.stack[i]:
-                    self.stack[i][id]['val'] = val
-                i -= 1
-
-        else:
-            item = []
-            i = len(self.stack)-1
-            while i >= 0:
-                if id in self.stack[i]:
-                    self.stack[i][id]['val'] = val
-                i -= 1
-
-            for i in obj['arr'][0:-1]:
-                item = item[i]
-
-            item[obj['arr'][-1]] = val
\ No newline at end of file
+# while running, variables are found by the (depth, slot) address
+# check_semantics gave their declaration. every block at the same depth
+# uses the same frame, it's made once and reused on every block entry
+# (and every loop iteration), the declarations set the slots before
+# they're used
+    def enter(self, depth, nslots):
+        frames = self.frames
+        if depth == len(frames):
+            frames.append([None] * nslots)
+        elif len(frames[depth]) < nslots:
+            frames[depth].extend([None] * (nslots - len(frames[depth])))
+
+    def load(self, address):
+        depth, slot = address
+        return self.frames[depth][slot]
+
+    def store(self, address, val):
+        depth, slot = address
+        self.frames[depth][slot] = val
@@ -0,0 +1,60 @@
+import os
+import sys
+
+import pytest
+
+PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# the modules import each other by plain name, like when run from CS403FPS
+sys.path.insert(0, PACKAGE_DIR)
+
+import compiler
+import optimizer
+import vm
+from parser1 import get_parse_tree
+from parser_components import FEATURE_METHODS, Context
+
+
+@pytest.fixture
+def package_dir(monkeypatch):
+    """Runs the test from CS403FPS, where the maps and fleet.json are."""
+    monkeypatch.chdir(PACKAGE_DIR)
+    return PACKAGE_DIR
+
+
+class Recorder:
+    """Stands in for a rover, remembers which features ran."""
+
+    def __init__(self):
+        self.calls = []
+
+    def __getattr__(self, name):
+        if name not in FEATURE_METHODS.values():
+            raise AttributeError(name)
+        return lambda: self.calls.append(name)
+
+    def switch_map(self, number):
+        self.calls.append(f"switch_map {number}")
+
+
+def run_vm(source):
+    rover = Recorder()
+    vm.run(compiler.compile_source(source), rover)
+    return rover.calls
+
+
+def run_tree(source, optimize=True):
+    """Runs the source on the tree walker, optimized like the VM's by default."""
+    rover = Recorder()
+    tree = get_parse_tree(source)
+    context = Context(rover)
+    tree.check_semantics(context)
+    if optimize:
+        optimizer.optimize(tree)
+    for child in tree.children:
+        child.run(context)
+    return rover.calls
+
+
+def repeat(count, feature="turnLeft"):
+    return [feature] * count
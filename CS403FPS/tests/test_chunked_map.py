@@ -0,0 +1,108 @@
+import pytest
+
+import chunked_map
+import grid
+import map_registry
+import simulate
+from chunked_map import ChunkedMap, check_writers, convert
+from map_registry import MapRegistry
+from shared_map import SharedMap
+
+ROWS = [
+    "XXXXXXXXXX",
+    "X D    C X",
+    "X   XX   X",
+    "X W    D X",
+    "XXXXXXXXXX",
+]
+
+
+@pytest.fixture
+def map_path(tmp_path):
+    path = tmp_path / "map.txt"
+    path.write_text("\n".join(ROWS) + "\n")
+    return path
+
+
+@pytest.fixture
+def chunk_path(map_path, tmp_path):
+    path = tmp_path / "world.chunks"
+    convert(map_path, path, chunk_size=4)
+    return path
+
+
+def rows(m):
+    return [m.row(x) for x in range(m.height)]
+
+
+def test_chunk_file_reads_like_the_map(chunk_path):
+    m = ChunkedMap(chunk_path, cache_chunks=2)
+    try:
+        assert (m.width, m.height) == (10, 5)
+        assert rows(m) == ROWS
+        assert m.count("D") == 2
+        assert m.find("W") == [(3, 2)]
+        assert m.nth("D", 1) == (3, 7)
+    finally:
+        m.close()
+
+
+def test_changes_survive_eviction_and_reopening(chunk_path):
+    m = ChunkedMap(chunk_path, cache_chunks=1)
+    m.set(1, 2, "X")
+    # reading the far corner evicts the changed chunk
+    assert m.get(3, 8) == " "
+    assert m.evictions >= 1 and m.writebacks == 1
+    m.set(3, 8, "C")
+    m.close()
+
+    m = ChunkedMap(chunk_path)
+    try:
+        assert m.get(1, 2) == "X"
+        assert m.get(3, 8) == "C"
+    finally:
+        m.close()
+
+
+def test_one_rover_may_use_a_chunk_file(chunk_path, map_path):
+    check_writers(chunk_path, 1)
+    check_writers(map_path, 5, shared_map=True)
+
+
+@pytest.mark.parametrize("rovers, shared", [(2, False), (1, True)])
+def test_chunk_file_is_refused_for_several_writers(chunk_path, rovers, shared):
+    with pytest.raises(ValueError, match="chunk file"):
+        check_writers(chunk_path, rovers, shared)
+
+
+def test_shared_map_refuses_chunk_files(chunk_path):
+    with pytest.raises(ValueError, match="chunk file"):
+        SharedMap.from_file(chunk_path)
+
+
+def test_simulate_refuses_chunk_files(chunk_path):
+    with pytest.raises(ValueError, match="chunk file"):
+        simulate.simulate("{ }", seeds=2, mapfile=chunk_path, workers=1)
+
+
+def test_template_never_opens_chunk_files(chunk_path, monkeypatch):
+    def fail(path):
+        raise AssertionError(f"{path} was loaded")
+
+    monkeypatch.setattr(grid, "load", fail)
+    monkeypatch.setattr(chunked_map, "ChunkedMap", fail)
+    assert MapRegistry().template(chunk_path) is None
+
+
+def test_template_skips_big_maps_without_reading_them(map_path, monkeypatch):
+    monkeypatch.setattr(map_registry, "TEMPLATE_MAX_BYTES", 10)
+    monkeypatch.setattr(grid, "read_tiles", pytest.fail)
+    assert MapRegistry().template(map_path) is None
+
+
+def test_template_copies_are_independent(map_path):
+    registry = MapRegistry()
+    first, second = registry.load(map_path), registry.load(map_path)
+    first.set(1, 1, "D")
+    assert rows(second) == ROWS
+    assert registry.template(map_path).tiles == "".join(ROWS).encode("ascii")
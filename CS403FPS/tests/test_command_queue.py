@@ -0,0 +1,45 @@
+import threading
+import time
+
+from command_queue import CommandQueue
+
+
+def test_commands_come_out_in_order_with_sequence_numbers():
+    commands = CommandQueue(8)
+    assert commands.put("first") == (1, 1)
+    assert commands.put("second", reply="r") == (2, 2)
+    first = commands.get()
+    second = commands.get()
+    assert (first.seq, first.command, first.reply) == (1, "first", None)
+    assert (second.seq, second.command, second.reply) == (2, "second", "r")
+    assert len(commands) == 0
+
+
+def test_empty_queue_times_out():
+    assert CommandQueue(1).get(timeout=0.01) is None
+
+
+def test_full_queue_blocks_instead_of_dropping():
+    commands = CommandQueue(1)
+    commands.put("first")
+    sender = threading.Thread(target=commands.put, args=("second",))
+    sender.start()
+    sender.join(0.05)
+    assert sender.is_alive()
+
+    assert commands.get().command == "first"
+    sender.join(2)
+    assert not sender.is_alive()
+    assert commands.get().command == "second"
+
+
+def test_stats_report_depth_and_wait():
+    commands = CommandQueue(8)
+    assert commands.stats() == {"depth": 0, "max_depth": 0, "run": 0, "average_wait": 0.0}
+    for i in range(3):
+        commands.put(str(i))
+    time.sleep(0.02)
+    commands.get()
+    stats = commands.stats()
+    assert (stats["depth"], stats["max_depth"], stats["run"]) == (2, 3, 1)
+    assert stats["average_wait"] >= 0.02
@@ -0,0 +1,92 @@
+import pytest
+
+import compiler
+from conftest import repeat, run_tree, run_vm
+
+
+PROGRAMS = [
+    ("{ int i ; i = 0 ; while ( i < 3 ) { rover . turnLeft ; i = i + 1 ; } }",
+     repeat(3)),
+    ("{ int i ; i = 10 ; while ( i > 0 ) { rover . turnLeft ; i = i - 3 ; } }",
+     repeat(4)),
+    ("{ int i ; i = 1 ; while ( i <= 100 ) { rover . turnLeft ; i = i * 2 ; } }",
+     repeat(7)),
+    ("{ double d ; d = 0 ; while ( d < 1 ) { rover . turnLeft ; d = d + 0.25 ; } }",
+     repeat(4)),
+    ("{ double d ; d = 7 / 2 ; if ( d == 3 ) rover . turnLeft ; else rover . turnRight ; }",
+     ["turnRight"]),
+    ("{ int [ 3 ] a ; int i ; i = 0 ;"
+     " while ( i < 3 ) { a [ i ] = i * i ; i = i + 1 ; }"
+     " i = a [ 2 ] ; while ( i > 0 ) { rover . info ; i = i - 1 ; } }",
+     repeat(4, "info")),
+    ("{ int i ; i = 0 ; { int j ; j = 2 ; while ( j > 0 ) { j = j - 1 ; i = i + 1 ; } }"
+     " { int k ; while ( i > 0 ) { rover . facing ; i = i - 1 ; } } }",
+     repeat(2, "facing")),
+    ("{ bool b ; b = ! ( 1 < 2 ) || 2 * 3 == 6 ; if ( b ) { rover . move_tile ; } }",
+     ["move_tile"]),
+    ("{ rover . switch_map 2 ; rover . print_map ; }",
+     ["switch_map 2", "print_map"]),
+]
+
+
+@pytest.mark.parametrize("source, calls", PROGRAMS)
+def test_vm_runs_like_the_tree_walker(source, calls):
+    assert run_vm(source) == calls
+    assert run_tree(source) == calls
+    assert run_tree(source, optimize=False) == calls
+
+
+def opcodes(source):
+    return [op for op, _ in compiler.compile_source(source).code]
+
+
+def test_comparison_and_jump_are_fused():
+    ops = opcodes("{ int i ; i = 0 ; while ( i < 3 ) { rover . turnLeft ; i = i + 1 ; } }")
+    assert compiler.TEST_CONST_JUMP in ops
+    assert compiler.JUMP_IF_FALSE not in ops
+
+
+def test_binary_and_store_are_fused():
+    ops = opcodes("{ int i ; i = 1 ; while ( i < 64 ) { i = i * 2 ; } }")
+    assert compiler.BINARY_CONST_STORE in ops
+    assert compiler.BINARY_CONST not in ops and compiler.LOAD_BINARY_CONST not in ops
+
+
+def test_jump_targets_are_not_fused_across():
+    # j = i * 2 follows the if, so its load of i is a jump target and has
+    # to stay a separate instruction
+    source = (
+        "{ int i ; int j ; bool b ; b = false ; i = 5 ; if ( b ) i = 1 ;"
+        " j = i * 2 ; while ( j > 0 ) { rover . info ; j = j - 1 ; } }"
+    )
+    assert run_vm(source) == run_tree(source) == repeat(10, "info")
+
+
+def test_two_variable_shapes_are_fused():
+    source = (
+        "{ int i ; int n ; int s ; i = 0 ; n = 4 ; s = 0 ;"
+        " while ( i < n ) { int t ; t = i ; s = s + t ; i = i + 1 ; }"
+        " while ( s > 0 ) { rover . info ; s = s - 1 ; } }"
+    )
+    ops = opcodes(source)
+    assert {compiler.TEST_JUMP, compiler.MOVE, compiler.BINARY_STORE} <= set(ops)
+    assert compiler.LOAD not in ops and compiler.BINARY not in ops
+    assert run_vm(source) == run_tree(source) == repeat(6, "info")
+
+
+def test_int_expressions_skip_the_int_conversion():
+    code = compiler.compile_source("{ int i ; int j ; i = 2 ; j = i * 3 ; i = j ; }").code
+    stores = [arg[-1] for op, arg in code if op in (compiler.BINARY_CONST_STORE, compiler.MOVE)]
+    # j = i * 3 is an int already, i = j still checks j was set
+    assert stores == [False, True]
+    assert (compiler.STORE, 0) in code
+
+
+def test_int_stores_truncate():
+    source = "{ int i ; double d ; d = 2.75 ; i = 0 ; while ( i < d ) { rover . turnLeft ; i = i + 1 ; } }"
+    assert run_vm(source) == run_tree(source) == repeat(3)
+
+
+def test_dis_names_the_features():
+    listing = compiler.compile_source("{ rover . turnLeft ; }").dis()
+    assert "FEATURE" in listing and "turnLeft" in listing
@@ -0,0 +1,58 @@
+import pytest
+
+from compiler import compile_source
+from parser1 import UnexpectedTokenError, get_parse_tree
+from parser_components import IncorrectTypeError
+
+
+def program(*stmts, decls="int x ; double d ; bool b ;"):
+    return "{ " + decls + " " + " ".join(stmts) + " }"
+
+
+@pytest.mark.parametrize("stmt", [
+    "x = 1 + 2 + 3 ;",
+    "x = 1 * 2 ;",
+    "x = x * 2 + 1 ;",
+    "x = x - 1 - 1 ;",
+    "d = 1 / 2 ;",
+    "d = x + 1.5 * 2 ;",
+    "b = 1 < 2 == 3 < 4 ;",
+    "b = x + 1 >= 2 * x && ! ( d < 1 ) ;",
+])
+def test_chains_type_left_to_right(stmt):
+    compile_source(program(stmt))
+
+
+@pytest.mark.parametrize("stmt", [
+    "x = 1 / 2 ;",
+    "x = x + 1.5 ;",
+    "x = 1 < 2 ;",
+    "b = true + 1 ;",
+    "b = true && 1 ;",
+    "b = ( 1 < 2 ) < 3 ;",
+    "d = - true ;",
+])
+def test_type_mismatches_are_rejected(stmt):
+    with pytest.raises(IncorrectTypeError):
+        compile_source(program(stmt))
+
+
+@pytest.mark.parametrize("stmt", [
+    "b = 1 < 2 < 3 ;",
+    "b = true == 1 < 2 < 3 ;",
+    "b = 1 <= 2 > 0 ;",
+    "b = ( 1 < 2 < 3 ) ;",
+])
+def test_relational_operators_do_not_chain(stmt):
+    with pytest.raises(UnexpectedTokenError):
+        get_parse_tree(program(stmt))
+
+
+def test_precedence():
+    tree = get_parse_tree(program("x = 1 + 2 * 3 - 4 ;"))
+    stmt = tree.children[0].children[1].children[0]
+    minus = stmt.children[2]
+    assert minus.token.value == "-"
+    plus = minus.children[0]
+    assert plus.token.value == "+"
+    assert plus.children[1].token.value == "*"
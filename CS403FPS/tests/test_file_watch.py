@@ -0,0 +1,79 @@
+import os
+import threading
+
+import pytest
+
+import file_watch
+from file_watch import StatWatcher
+
+
+@pytest.fixture
+def command_file(tmp_path):
+    path = tmp_path / "Rover1.txt"
+    path.touch()
+    return path
+
+
+def later(func, delay=0.05):
+    timer = threading.Timer(delay, func)
+    timer.start()
+    return timer
+
+
+def test_unchanged_file_times_out(command_file):
+    watcher = StatWatcher(command_file, interval=0.01)
+    assert watcher.wait(timeout=0.05) is False
+
+
+def test_write_is_seen(command_file):
+    watcher = StatWatcher(command_file, interval=0.01)
+    later(lambda: command_file.write_text("{ rover . info ; }"))
+    assert watcher.wait(timeout=2) is True
+    # the change is only reported once
+    assert watcher.wait(timeout=0.05) is False
+
+
+def test_rename_into_place_is_seen(command_file, tmp_path):
+    # main.py writes a temporary file and renames it over the command
+    # file, the size and mtime may match but the inode doesn't
+    tmp = tmp_path / "Rover1.txt.tmp"
+    tmp.touch()
+    watcher = StatWatcher(command_file, interval=0.01)
+    later(lambda: os.replace(tmp, command_file))
+    assert watcher.wait(timeout=2) is True
+
+
+def test_file_appearing_and_disappearing_is_a_change(tmp_path):
+    path = tmp_path / "Rover1.txt"
+    watcher = StatWatcher(path, interval=0.01)
+    assert watcher.last is None
+    path.write_text("x")
+    assert watcher.wait(timeout=1) is True
+    path.unlink()
+    assert watcher.wait(timeout=1) is True
+
+
+def test_watch_falls_back_to_polling(command_file, monkeypatch):
+    def no_inotify(path):
+        raise AttributeError("inotify_init1")
+    monkeypatch.setattr(file_watch, "InotifyWatcher", no_inotify)
+    watcher = file_watch.watch(command_file)
+    assert isinstance(watcher, StatWatcher)
+    later(lambda: command_file.write_text("x"))
+    assert watcher.wait(timeout=2) is True
+
+
+def test_inotify_watcher_sees_writes(command_file):
+    try:
+        watcher = file_watch.InotifyWatcher(command_file)
+    except (AttributeError, OSError, TypeError):
+        pytest.skip("inotify is not available here")
+    try:
+        assert watcher.wait(timeout=0.05) is False
+        # other files in the directory don't wake it up
+        (command_file.parent / "Rover2.txt").write_text("x")
+        assert watcher.wait(timeout=0.05) is False
+        later(lambda: command_file.write_text("x"))
+        assert watcher.wait(timeout=2) is True
+    finally:
+        watcher.close()
@@ -0,0 +1,148 @@
+import threading
+import time
+
+import pytest
+
+import fleet
+import rover
+from grid import Grid
+from shared_map import ROVER_TILES, SharedMap
+
+MAP = [
+    "XXXXXX",
+    "X    X",
+    "X    X",
+    "XXXXXX",
+]
+
+
+def wait_for(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("timed out")
+        time.sleep(0.01)
+
+
+class Pipe:
+    """Stands in for a worker's pipe, send blocks until released."""
+
+    def __init__(self, blocked=False):
+        self.sent = []
+        self.open = threading.Event()
+        if not blocked:
+            self.open.set()
+
+    def send(self, message):
+        self.open.wait()
+        self.sent.append(message)
+
+
+def test_full_pipe_only_holds_up_its_worker():
+    rovers = fleet.Fleet(["Rover1", "Rover2"], workers=2)
+    stuck, free = Pipe(blocked=True), Pipe()
+    for worker, pipe in zip(rovers.workers, (stuck, free)):
+        worker.conn = pipe
+        worker.sender.start()
+    try:
+        rovers.route("Rover1", "{ }", None)
+        rovers.route("Rover1", "{ }", None)
+        assert rovers.route("Rover2", "{ }", None) == (1, 1)
+        wait_for(lambda: free.sent)
+        assert free.sent[0][1:] == ("Rover2", "{ }")
+        assert stuck.sent == []
+    finally:
+        stuck.open.set()
+        for worker in rovers.workers:
+            worker.outbox.put(None)
+            worker.sender.join()
+    assert [message and message[1] for message in stuck.sent] == ["Rover1", "Rover1", None]
+
+
+def test_messages_for_a_replaced_process_are_dropped():
+    rovers = fleet.Fleet(["Rover1"], workers=1)
+    worker = rovers.workers[0]
+    worker.conn = pipe = Pipe()
+    rovers.route("Rover1", "{ old }", None)
+    # what restart() does once it has failed the pending commands
+    worker.generation += 1
+    rovers.route("Rover1", "{ new }", None)
+    worker.sender.start()
+    worker.outbox.put(None)
+    worker.sender.join()
+    assert [message and message[2] for message in pipe.sent] == ["{ new }", None]
+
+
+@pytest.fixture
+def shared_map():
+    grid = Grid(len(MAP[0]), len(MAP), bytearray("".join(MAP).encode("ascii")))
+    shared = SharedMap.create(grid, ["Rover1"])
+    yield shared
+    shared.close()
+
+
+def rover_tiles(shared):
+    return sum(shared.count(tile) for tile in ROVER_TILES)
+
+
+def test_rover_places_itself(shared_map, monkeypatch):
+    monkeypatch.setattr(rover, "PROGRAM_CACHE_DIR", None)
+    r = rover.Rover("Rover1", shared_map=shared_map, output="null")
+    assert shared_map.position("Rover1") == (r.pos_x, r.pos_y)
+    shared_map.remove_rover("Rover1")
+    assert rover_tiles(shared_map) == 0
+    assert shared_map.position("Rover1") is None
+
+
+def test_restart_clears_the_dead_rovers(shared_map, monkeypatch):
+    monkeypatch.setattr(rover, "PROGRAM_CACHE_DIR", None)
+    rovers = fleet.Fleet(["Rover1"], workers=1, shared_map=shared_map, output="null")
+    worker = rovers.workers[0]
+    worker.start()
+    try:
+        wait_for(lambda: shared_map.position("Rover1") is not None)
+        wait_for(lambda: worker.conn.poll())
+        rovers.receive(worker)
+        assert worker.ready
+
+        replies = []
+        worker.process.kill()
+        worker.process.join()
+        rovers.route("Rover1", "{ rover . info ; }", lambda ok, error: replies.append(ok))
+        rovers.restart(worker)
+        assert replies == [False]
+        assert rover_tiles(shared_map) == 0
+        with pytest.raises(LookupError, match="restarting"):
+            rovers.route("Rover1", "{ }", None)
+
+        rovers.respawn(worker)
+        wait_for(lambda: shared_map.position("Rover1") is not None)
+        assert rover_tiles(shared_map) == 1
+    finally:
+        worker.stop()
+
+
+def test_worker_that_dies_on_startup_is_given_up(monkeypatch):
+    monkeypatch.setattr(rover, "PROGRAM_CACHE_DIR", None)
+    monkeypatch.setattr(fleet, "RESTART_DELAY", 0.05)
+    monkeypatch.setattr(fleet, "MAX_STARTUP_FAILURES", 3)
+    # no empty tile to spawn on, the rover can't be built
+    walls = Grid(3, 3, bytearray(b"X" * 9))
+    shared = SharedMap.create(walls, ["Rover1"])
+    rovers = fleet.Fleet(["Rover1"], workers=1, shared_map=shared, output="null")
+    worker = rovers.workers[0]
+    try:
+        start = time.monotonic()
+        worker.start()
+        rovers.supervise(runtime=20)
+        elapsed = time.monotonic() - start
+
+        assert worker.given_up
+        assert worker.restarts == worker.startup_failures == 3
+        # waited 0.05s then 0.1s before the restarts
+        assert elapsed >= 0.15
+        with pytest.raises(LookupError, match="kept crashing"):
+            rovers.route("Rover1", "{ }", None)
+    finally:
+        worker.stop()
+        shared.close()
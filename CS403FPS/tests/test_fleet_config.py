@@ -0,0 +1,25 @@
+import pytest
+
+import fleet_config
+import rover
+
+
+def test_map_is_not_shared_by_default():
+    assert fleet_config.shared_map({}) is False
+    assert fleet_config.shared_map(fleet_config.load()) is False
+
+
+@pytest.mark.parametrize("program", [
+    "feature-test.txt",
+    "waypoint-sb.txt",
+    "circle-sb.txt",
+    "drill-sb.txt",
+])
+def test_switch_map_programs_run_with_the_default_config(package_dir, monkeypatch, program):
+    monkeypatch.setattr(rover, "PROGRAM_CACHE_DIR", None)
+    with open(f"parsing-tests/{program}") as f:
+        command = f.read()
+    config = fleet_config.load()
+    assert not fleet_config.shared_map(config)
+    r = rover.Rover("Rover1", output="null")
+    assert r.run_command(command) == (True, None)
@@ -0,0 +1,79 @@
+import pytest
+
+import grid
+from grid import Grid
+
+ROWS = [
+    "XXXXXX",
+    "X D  X",
+    "XW  DX",
+    "XXXXXX",
+]
+
+
+@pytest.fixture(params=["bytes", "numpy"])
+def scan_with(request, monkeypatch):
+    # count and find of unindexed tiles take the NumPy path when it's
+    # installed and the bytearray one when it isn't
+    if request.param == "numpy":
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(grid, "numpy", None)
+    return request.param
+
+
+def make(rows=ROWS):
+    width = len(rows[0])
+    return Grid(width, len(rows), bytearray("".join(rows).encode("ascii")))
+
+
+def test_get_set_and_rows():
+    m = make()
+    assert (m.width, m.height) == (6, 4)
+    assert m.get(1, 2) == "D"
+    m.set(1, 2, " ")
+    assert m.get(1, 2) == " "
+    assert list(m.rows())[1] == "X    X"
+    assert m.row(2, 1, 3) == "W "
+    assert str(m) == "\n".join(["XXXXXX", "X    X", "XW  DX", "XXXXXX"])
+
+
+def test_negative_indices_count_from_the_end():
+    m = make()
+    assert m.get(-2, -2) == "D"
+    assert m.index(-1, -1) == m.index(3, 5)
+
+
+@pytest.mark.parametrize("x, y", [(4, 0), (0, 6), (-5, 0)])
+def test_out_of_range_raises(x, y):
+    with pytest.raises(IndexError):
+        make().get(x, y)
+
+
+def test_count_find_and_nth(scan_with):
+    m = make()
+    assert m.count("X") == 16
+    assert m.count(" ") == 5
+    assert m.find(" ") == [(1, 1), (1, 3), (1, 4), (2, 2), (2, 3)]
+    assert m.find("D") == [(1, 2), (2, 4)]
+    assert m.nth(" ", 3) == (2, 2)
+    with pytest.raises(IndexError):
+        m.nth("D", 2)
+
+
+def test_read_tiles_pads_short_rows_and_ignores_the_last_newline(tmp_path):
+    path = tmp_path / "map.txt"
+    path.write_bytes(b"XXXX\r\nX D\r\nXXXX\r\n")
+    width, height, tiles = grid.read_tiles(path)
+    assert (width, height) == (4, 3)
+    assert tiles == bytearray(b"XXXXX DXXXXX")
+
+
+def test_track_changes():
+    m = make()
+    m.set(1, 1, "^")
+    assert m.track_changes()
+    m.set(1, 2, " ")
+    m.set(1, 3, ">")
+    assert sorted(m.take_changes()) == [(1, 2), (1, 3)]
+    assert m.take_changes() == []
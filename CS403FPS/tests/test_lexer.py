@@ -0,0 +1,92 @@
+import pytest
+
+from lexer import UnexpectedCharacterError, tokenize
+from parser_components import Vocab
+
+
+def lex(source):
+    return [(token.value, token.ttype) for token in tokenize(source)]
+
+
+def positions(source):
+    return [(token.value, token.line, token.column) for token in tokenize(source)]
+
+
+def test_whitespace_between_lexemes_is_optional():
+    spaced = lex("n = n + 1 ;")
+    assert lex("n=n+1;") == spaced
+    assert spaced == [
+        ("n", Vocab.ID),
+        ("=", Vocab.ASSIGN),
+        ("n", Vocab.ID),
+        ("+", Vocab.PLUS),
+        ("1", Vocab.NUM),
+        (";", Vocab.SEMICOLON),
+        (0, Vocab.EOS),
+    ]
+
+
+def test_longest_operator_wins():
+    ops = [ttype for _, ttype in lex("a<=b==c!=d>=e&&f||!g<h")[:-1] if ttype != Vocab.ID]
+    assert ops == [
+        Vocab.LTEQ, Vocab.EQ, Vocab.NEQ, Vocab.GTEQ, Vocab.AND, Vocab.OR, Vocab.NOT, Vocab.LT,
+    ]
+
+
+def test_keywords_types_and_numbers():
+    assert lex("while ( true ) int x ; double d ; d = 2.50 ; rover . turnLeft")[:-1] == [
+        ("while", Vocab.WHILE),
+        ("(", Vocab.OPEN_PAREN),
+        ("true", Vocab.TRUE),
+        (")", Vocab.CLOSE_PAREN),
+        ("int", Vocab.BASIC),
+        ("x", Vocab.ID),
+        (";", Vocab.SEMICOLON),
+        ("double", Vocab.BASIC),
+        ("d", Vocab.ID),
+        (";", Vocab.SEMICOLON),
+        ("d", Vocab.ID),
+        ("=", Vocab.ASSIGN),
+        ("2.50", Vocab.REAL),
+        (";", Vocab.SEMICOLON),
+        ("rover", Vocab.ROVER),
+        (".", Vocab.DOT),
+        ("turnLeft", Vocab.TURNLEFT),
+    ]
+
+
+def test_keyword_prefix_is_an_identifier():
+    assert lex("whilex iff rovers")[:-1] == [
+        ("whilex", Vocab.ID), ("iff", Vocab.ID), ("rovers", Vocab.ID),
+    ]
+
+
+def test_tokens_record_line_and_column():
+    source = "{\n  int x ;\r\n\tx = 10 ;\n}"
+    assert positions(source) == [
+        ("{", 1, 1),
+        ("int", 2, 3),
+        ("x", 2, 7),
+        (";", 2, 9),
+        ("x", 3, 2),
+        ("=", 3, 4),
+        ("10", 3, 6),
+        (";", 3, 9),
+        ("}", 4, 1),
+        (0, 4, 2),
+    ]
+
+
+@pytest.mark.parametrize("source, line, column", [
+    ("x = 1 @ 2 ;", 1, 7),
+    ("{\n  int x ;\n  x = $ ;\n}", 3, 7),
+    ("x = 'a' ;", 1, 5),
+])
+def test_unexpected_character_names_where_it_is(source, line, column):
+    with pytest.raises(UnexpectedCharacterError) as error:
+        list(tokenize(source))
+    assert f"at line {line}, column {column}" in str(error.value)
+
+
+def test_empty_source_is_just_the_end():
+    assert positions("") == [(0, 1, 1)]
@@ -0,0 +1,86 @@
+import json
+
+import pytest
+
+import main
+import transport
+
+
+class HangsUpAfterAck:
+    """A connection that acks the command, then drops."""
+
+    def __init__(self):
+        self.sent = []
+        self.replies = [{"status": "ack", "seq": 1, "queued": 1}]
+
+    def send_bytes(self, data):
+        self.sent.append(json.loads(data))
+
+    def recv_bytes(self, maxlength=None):
+        if not self.replies:
+            raise EOFError
+        return json.dumps(self.replies.pop(0)).encode()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+@pytest.fixture
+def command_file(tmp_path, monkeypatch):
+    path = tmp_path / "command.txt"
+    path.write_text("{ rover . info ; }")
+    monkeypatch.setattr("sys.argv", ["main.py", str(path), "Rover1"])
+    return path
+
+
+def fake_connect(monkeypatch, listening):
+    connected = []
+
+    def connect(name):
+        connected.append(name)
+        if name not in listening:
+            raise FileNotFoundError(name)
+        return listening[name]
+
+    monkeypatch.setattr(transport, "connect", connect)
+    return connected
+
+
+def test_dropped_connection_is_not_retried(command_file, monkeypatch):
+    conn = HangsUpAfterAck()
+    connected = fake_connect(monkeypatch, {transport.FLEET: conn})
+    written = []
+    monkeypatch.setattr(main, "write_command", lambda *args: written.append(args))
+
+    with pytest.raises(Exception, match="Lost the connection"):
+        main.main()
+
+    assert connected == [transport.FLEET]
+    assert len(conn.sent) == 1
+    assert written == []
+
+
+def test_rover_socket_when_no_fleet(command_file, monkeypatch, capsys):
+    conn = HangsUpAfterAck()
+    conn.replies.append({"status": "done", "ok": True, "error": None})
+    connected = fake_connect(monkeypatch, {"Rover1": conn})
+    monkeypatch.setattr(main, "write_command", pytest.fail)
+
+    main.main()
+
+    assert connected == [transport.FLEET, "Rover1"]
+    assert conn.sent == [{"rover": "Rover1", "command": "{ rover . info ; }"}]
+    assert "finished running the command successfully" in capsys.readouterr().out
+
+
+def test_command_file_when_nobody_listens(command_file, monkeypatch):
+    fake_connect(monkeypatch, {})
+    written = []
+    monkeypatch.setattr(main, "write_command", lambda *args: written.append(args))
+
+    main.main()
+
+    assert written == [("Rover1", "{ rover . info ; }")]
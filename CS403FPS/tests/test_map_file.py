@@ -0,0 +1,66 @@
+import mmap
+
+import pytest
+
+import grid
+
+ROWS = [b"XXXXX", b"X D X", b"XW  X", b"XXXXX"]
+
+
+def write(tmp_path, data):
+    path = tmp_path / "map.txt"
+    path.write_bytes(data)
+    return path
+
+
+@pytest.mark.parametrize("newline", [b"\n", b"\r\n"])
+@pytest.mark.parametrize("trailing", [True, False])
+def test_mapped_file_reads_like_the_old_loader(tmp_path, newline, trailing):
+    data = newline.join(ROWS) + (newline if trailing else b"")
+    path = write(tmp_path, data)
+    m = grid.map_file(path)
+    assert isinstance(m.tiles, mmap.mmap)
+    assert (m.width, m.height) == (5, 4)
+    assert m.stride == 5 + len(newline)
+    assert list(m.rows()) == [row.decode() for row in ROWS]
+    assert grid.read_tiles(path) == (5, 4, bytearray(b"".join(ROWS)))
+
+
+def test_single_row_without_newline(tmp_path):
+    m = grid.map_file(write(tmp_path, b"X D X"))
+    assert (m.width, m.height) == (5, 1)
+    assert m.get(0, 2) == "D"
+
+
+def test_changes_are_copy_on_write(tmp_path):
+    data = b"\n".join(ROWS) + b"\n"
+    path = write(tmp_path, data)
+    m = grid.map_file(path)
+    m.set(1, 2, "X")
+    assert m.get(1, 2) == "X"
+    assert m.find("D") == []
+    assert path.read_bytes() == data
+
+
+def test_count_and_find_across_scan_chunks(tmp_path, monkeypatch):
+    monkeypatch.setattr(grid, "numpy", None)
+    monkeypatch.setattr(grid, "SCAN_CHUNK", 4)
+    m = grid.map_file(write(tmp_path, b"\n".join(ROWS)))
+    assert m.count(" ") == 4
+    assert m.find(" ") == [(1, 1), (1, 3), (2, 2), (2, 3)]
+    assert m.nth(" ", 2) == (2, 2)
+
+
+@pytest.mark.parametrize("data", [
+    b"",
+    b"XXXXX\nX D\nXXXXX\n",
+    b"XXXXX\nX D XX\nXXXXX",
+])
+def test_files_that_cant_be_mapped(tmp_path, data):
+    assert grid.map_file(write(tmp_path, data)) is None
+
+
+def test_load_falls_back_for_ragged_rows(tmp_path):
+    m = grid.load(write(tmp_path, b"XXXXX\nX D\nXXXXX\n"))
+    assert isinstance(m.tiles, bytearray)
+    assert list(m.rows()) == ["XXXXX", "X DXX", "XXXXX"]
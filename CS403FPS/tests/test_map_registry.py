@@ -0,0 +1,34 @@
+import pytest
+
+from map_registry import MapRegistry
+
+
+def make_maps(directory, *names):
+    for name in names:
+        (directory / name).write_text("XXX\nX X\nXXX\n")
+
+
+def test_discover_numbers_the_maps(tmp_path):
+    make_maps(tmp_path, "map.txt", "map2.txt", "map10.txt", "notamap.txt")
+    registry = MapRegistry()
+    registry.discover(tmp_path)
+    assert registry.ids() == [1, 2, 10]
+    assert registry.path(1).name == "map.txt"
+
+
+@pytest.mark.parametrize("names", [
+    ("map.txt", "map1.txt"),
+    ("map2.txt", "map02.txt"),
+])
+def test_duplicate_ids_are_refused(tmp_path, names):
+    make_maps(tmp_path, *names)
+    with pytest.raises(ValueError, match="both"):
+        MapRegistry().discover(tmp_path)
+
+
+def test_registering_the_same_file_again_is_fine(tmp_path):
+    make_maps(tmp_path, "map.txt")
+    registry = MapRegistry()
+    registry.register(1, tmp_path / "map.txt")
+    registry.register(1, tmp_path / "." / "map.txt")
+    assert len(registry) == 1
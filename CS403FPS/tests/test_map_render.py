@@ -0,0 +1,66 @@
+import json
+import random
+
+import pytest
+
+import map_render
+import rover
+from grid import Grid
+from map_render import MapRenderer
+
+PREFIX = "printing map changes: "
+
+
+def grid_of(*rows):
+    return Grid(len(rows[0]), len(rows), bytearray("".join(rows).encode("ascii")))
+
+
+def test_diff_is_the_default():
+    assert map_render.RENDER_MODE == "diff"
+    renderer = MapRenderer()
+    grid = grid_of("X X", "X X")
+    assert renderer.frame(grid) == "printing map\nX X\nX X\n"
+    grid.set(0, 1, "D")
+    grid.set(1, 1, "D")
+    grid.set(1, 1, " ")
+    assert renderer.frame(grid) == PREFIX + '[[0, 1, "D"]]\n'
+
+
+def test_full_mode_draws_every_frame():
+    renderer = MapRenderer("full")
+    grid = grid_of("X X")
+    renderer.frame(grid)
+    grid.set(0, 1, "D")
+    assert renderer.frame(grid) == "printing map\nXDX\n"
+
+
+def test_ansi_redraws_in_place(monkeypatch):
+    # nothing to reset at exit, the frames never reach the terminal
+    monkeypatch.setattr(map_render.atexit, "register", lambda func: None)
+    renderer = MapRenderer("ansi")
+    grid = grid_of("X X")
+    assert renderer.frame(grid).startswith(map_render.CLEAR_SCREEN + "X X")
+    grid.set(0, 1, "D")
+    frame = renderer.frame(grid)
+    assert frame == map_render.SAVE_CURSOR + "\x1b[1;2HD" + map_render.RESTORE_CURSOR
+    assert renderer.frame(grid) == ""
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_zigzag_frames_rebuild_the_final_map(package_dir, monkeypatch, capsys, seed):
+    monkeypatch.setattr(rover, "PROGRAM_CACHE_DIR", None)
+    random.seed(seed)
+    r = rover.Rover("Rover1")
+    with open("parsing-tests/zigzag-test.txt") as f:
+        assert r.run_command(f.read()) == (True, None)
+
+    lines = capsys.readouterr().out.splitlines()
+    assert not any("\x1b" in line for line in lines)
+    first = lines.index("printing map")
+    shown = [list(row) for row in lines[first + 1:first + 1 + r.map.height]]
+    changes = [line[len(PREFIX):] for line in lines if line.startswith(PREFIX)]
+    assert changes
+    for change in changes:
+        for x, y, tile in json.loads(change):
+            shown[x][y] = tile
+    assert ["".join(row) for row in shown] == [r.map.row(x) for x in range(r.map.height)]
@@ -0,0 +1,117 @@
+import pytest
+
+import compiler
+import optimizer
+from parser1 import get_parse_tree
+from parser_components import (
+    STMT_EMPTY,
+    STMT_FEATURE,
+    STMT_IF,
+    STMT_INCREMENT,
+    BinaryNode,
+    Context,
+    FeatureNode,
+    LiteralNode,
+)
+from conftest import repeat, run_tree, run_vm
+
+
+def optimized(source):
+    tree = get_parse_tree(source)
+    tree.check_semantics(Context())
+    removed = optimizer.optimize(tree)
+    return tree, removed
+
+
+def statements(tree):
+    # the statements of the program's outer block
+    return tree.children[0].children[1].children
+
+
+def test_constant_expressions_fold():
+    tree, removed = optimized("{ int x ; bool b ; x = 2 * 3 + 4 ; b = ! ( 1 < 2 ) || 7 / 2 == 3.5 ; }")
+    x, b = statements(tree)
+    assert isinstance(x.children[2], LiteralNode) and x.children[2].value == 10
+    assert isinstance(b.children[2], LiteralNode) and b.children[2].value is True
+    assert removed > 0
+
+
+def test_expressions_with_variables_keep_their_constant_parts_folded():
+    tree, _ = optimized("{ int x ; x = 0 ; x = x * ( 2 + 3 ) ; }")
+    value = statements(tree)[1].children[2]
+    assert isinstance(value, BinaryNode)
+    assert isinstance(value.children[1], LiteralNode) and value.children[1].value == 5
+
+
+def test_division_by_zero_is_left_for_the_run():
+    tree, _ = optimized("{ double d ; bool b ; d = 1 / 0 ; b = 1 / 0 > 2 ; }")
+    assert all(isinstance(stmt.children[2], BinaryNode) for stmt in statements(tree))
+    with pytest.raises(ZeroDivisionError):
+        run_vm("{ double d ; d = 1 / 0 ; }")
+
+
+def test_dead_branches_are_removed():
+    tree, _ = optimized(
+        "{ int x ; x = 0 ;"
+        " if ( 1 > 2 ) rover . turnLeft ;"
+        " if ( 1 < 2 ) rover . turnRight ; else rover . turnLeft ;"
+        " while ( false ) rover . info ; }"
+    )
+    assert len(statements(tree)) == 2
+    kept = statements(tree)[1]
+    assert kept.kind == STMT_FEATURE
+    assert [child.method for child in kept.children if isinstance(child, FeatureNode)] == ["turnRight"]
+
+
+def test_arms_that_must_stay_become_empty():
+    tree, _ = optimized("{ int x ; x = 0 ; if ( x < 1 ) { } else if ( false ) rover . info ; }")
+    stmt = statements(tree)[1]
+    assert stmt.children[4].kind == STMT_EMPTY
+
+
+def test_tree_walker_runs_increments_and_empty_statements():
+    source = (
+        "{ int x ; x = 0 ; while ( x < 3 ) {"
+        " if ( x < 1 ) rover . info ; else if ( false ) rover . drill ;"
+        " rover . turnLeft ; x = x + 1 ; } }"
+    )
+    tree, _ = optimized(source)
+    body = statements(tree)[1].children[2].children[0].children[1].children
+    assert [stmt.kind for stmt in body] == [STMT_IF, STMT_FEATURE, STMT_INCREMENT]
+    # the else arm that runs from the second time round is empty
+    assert body[0].children[4].kind == STMT_EMPTY
+    assert run_tree(source) == run_vm(source) == ["info", "turnLeft", "turnLeft", "turnLeft"]
+
+
+@pytest.mark.parametrize("stmt, step", [
+    ("x = x + 2 ;", 2),
+    ("x = 2 + x ;", 2),
+    ("x = x - 3 ;", -3),
+])
+def test_increments(stmt, step):
+    tree, _ = optimized("{ int x ; x = 0 ; " + stmt + " }")
+    increment = statements(tree)[1]
+    assert increment.kind == STMT_INCREMENT
+    assert increment.children[2].value == step
+
+
+@pytest.mark.parametrize("stmt", [
+    "x = 2 - x ;",
+    "x = y + 1 ;",
+    "x = x * 2 ;",
+    "a [ 0 ] = a [ 0 ] + 1 ;",
+])
+def test_not_increments(stmt):
+    tree, _ = optimized("{ int x ; int y ; int [ 2 ] a ; x = 0 ; y = 0 ; " + stmt + " }")
+    assert statements(tree)[-1].kind != STMT_INCREMENT
+
+
+def test_optimized_programs_run_the_same():
+    source = (
+        "{ int x ; double d ; x = 10 - 2 * 3 ; d = 0.5 ;"
+        " while ( x > 0 ) { rover . turnLeft ; x = x - 1 ; d = d + 0.5 ; }"
+        " if ( 2 > 1 && d == 2.5 ) rover . info ;"
+        " while ( false ) rover . drill ; }"
+    )
+    assert run_vm(source) == run_tree(source) == repeat(4) + ["info"]
+    assert compiler.compile_source(source).removed > 0
@@ -0,0 +1,79 @@
+import io
+import json
+
+import pytest
+
+import output_sink
+import rover
+from output_sink import JsonLinesSink, NullSink, TextSink, make_sink
+
+
+def test_text_is_buffered_until_flushed():
+    stream = io.StringIO()
+    sink = TextSink("Rover1", stream)
+    sink.message("hello")
+    sink.line([1, 2])
+    sink.write("XX\nXX", "map")
+    assert stream.getvalue() == ""
+    sink.flush()
+    assert stream.getvalue() == "Rover1: hello\n[1, 2]\nXX\nXX"
+
+
+def test_text_flushes_once_the_buffer_is_big_enough():
+    stream = io.StringIO()
+    sink = TextSink(None, stream, flush_bytes=10)
+    sink.line("1234")
+    assert stream.getvalue() == ""
+    sink.line("56789")
+    assert stream.getvalue() == "1234\n56789\n"
+    assert sink.buffered == 0
+
+
+def test_text_goes_to_the_current_stdout(capsys):
+    sink = make_sink("text", "Rover1")
+    sink.message("hi")
+    sink.flush()
+    assert capsys.readouterr().out == "Rover1: hi\n"
+
+
+def test_json_lines():
+    stream = io.StringIO()
+    sink = JsonLinesSink("Rover1", stream)
+    sink.message("hello")
+    sink.line(3)
+    sink.write("XX\n", "map")
+    sink.write("")
+    sink.flush()
+    assert [json.loads(line) for line in stream.getvalue().splitlines()] == [
+        {"rover": "Rover1", "kind": "message", "text": "hello"},
+        {"rover": "Rover1", "kind": "output", "text": "3"},
+        {"rover": "Rover1", "kind": "map", "text": "XX"},
+    ]
+
+
+def test_null_sink_is_quiet():
+    sink = make_sink("null", "Rover1")
+    assert isinstance(sink, NullSink) and sink.quiet
+    sink.message("hello")
+    sink.flush()
+
+
+def test_default_and_unknown_kinds(monkeypatch):
+    monkeypatch.setattr(output_sink, "OUTPUT", "json")
+    assert type(make_sink()) is JsonLinesSink
+    with pytest.raises(ValueError):
+        make_sink("xml")
+
+
+def test_rover_output_goes_through_its_sink(package_dir, monkeypatch):
+    monkeypatch.setattr(rover, "PROGRAM_CACHE_DIR", None)
+    r = rover.Rover("Rover1", output="json")
+    stream = io.StringIO()
+    r.output.stream = stream
+    ok, _ = r.run_command("{ rover . facing ; rover . print_map ; }")
+    assert ok
+    records = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert {record["rover"] for record in records} == {"Rover1"}
+    assert [record["text"] for record in records if record["kind"] == "output"][0] == "Rover is facing: "
+    assert [record["kind"] for record in records].count("map") == 1
+    assert records[-1] == {"rover": "Rover1", "kind": "message", "text": "Finished running command.\n\n"}
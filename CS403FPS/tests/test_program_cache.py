@@ -0,0 +1,60 @@
+import pytest
+
+from parser1 import UnexpectedTokenError
+from program_cache import ProgramCache
+
+
+def program(n):
+    return f"{{ int i ; i = {n} ; }}"
+
+
+def test_repeated_source_is_a_hit():
+    cache = ProgramCache(4)
+    first = cache.get(program(1))
+    assert cache.get(program(1)) is first
+    assert (cache.hits, cache.misses, len(cache)) == (1, 1, 1)
+
+
+def test_least_recently_used_program_is_evicted():
+    cache = ProgramCache(2)
+    one = cache.get(program(1))
+    cache.get(program(2))
+    # using 1 again makes 2 the least recently used
+    assert cache.get(program(1)) is one
+    cache.get(program(3))
+    assert len(cache) == 2
+    assert cache.get(program(1)) is one
+    misses = cache.misses
+    cache.get(program(2))
+    assert cache.misses == misses + 1
+
+
+def test_size_zero_caches_nothing():
+    cache = ProgramCache(0)
+    first = cache.get(program(1))
+    assert cache.get(program(1)) is not first
+    assert (cache.hits, cache.misses, len(cache)) == (0, 2, 0)
+
+
+def test_failed_programs_are_not_cached():
+    cache = ProgramCache(4)
+    with pytest.raises(UnexpectedTokenError):
+        cache.get("{ int i ; i = ; }")
+    assert len(cache) == 0
+
+
+def test_stats_report_hits_and_misses():
+    cache = ProgramCache(2)
+    cache.get(program(1))
+    cache.get(program(1))
+    assert cache.stats() == {"hits": 1, "disk_hits": 0, "misses": 1, "size": 1, "max_size": 2}
+    assert str(cache) == "1 hits, 0 disk hits, 1 misses, 1/2 programs cached"
+
+
+def test_misses_fall_back_to_the_directory(tmp_path):
+    ProgramCache(2, tmp_path).get(program(1))
+    assert len(list(tmp_path.glob("*.rvc"))) == 1
+
+    cache = ProgramCache(2, tmp_path)
+    cache.get(program(1))
+    assert (cache.hits, cache.disk_hits, cache.misses) == (0, 1, 0)
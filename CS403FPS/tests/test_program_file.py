@@ -0,0 +1,58 @@
+import pytest
+
+import compiler
+import parser1
+import program_file
+
+SOURCE = "{ int i ; i = 0 ; while ( i < 3 ) { rover . turnLeft ; i = i + 1 ; } }"
+
+
+@pytest.fixture
+def rvc(tmp_path):
+    path = program_file.cache_path(tmp_path, SOURCE)
+    program_file.write(path, compiler.compile_source(SOURCE), SOURCE)
+    return path
+
+
+def test_round_trip(rvc):
+    program = program_file.load(rvc, SOURCE)
+    expected = compiler.compile_source(SOURCE)
+    assert program.code == expected.code
+    assert (program.nslots, program.features) == (expected.nslots, expected.features)
+
+
+def test_changed_source_is_a_miss(rvc):
+    assert program_file.load(rvc, SOURCE.replace("3", "4")) is None
+
+
+@pytest.mark.parametrize("module, name", [
+    (parser1, "GRAMMAR_VERSION"),
+    (compiler, "BYTECODE_VERSION"),
+])
+def test_new_version_invalidates_the_file(rvc, monkeypatch, module, name):
+    monkeypatch.setattr(module, name, getattr(module, name) + 1)
+    assert program_file.load(rvc, SOURCE) is None
+
+
+@pytest.mark.parametrize("data", [
+    b"",
+    b"RVRC",
+    b"XXXX" + bytes(program_file.HEADER.size),
+])
+def test_bad_files_are_a_miss(tmp_path, data):
+    path = tmp_path / "bad.rvc"
+    path.write_bytes(data)
+    assert program_file.load(path, SOURCE) is None
+
+
+def test_truncated_body_is_a_miss(rvc):
+    rvc.write_bytes(rvc.read_bytes()[:-3])
+    assert program_file.load(rvc, SOURCE) is None
+
+
+def test_missing_file_is_a_miss(tmp_path):
+    assert program_file.load(tmp_path / "missing.rvc", SOURCE) is None
+
+
+def test_write_leaves_no_temporary_files(rvc):
+    assert [path.name for path in rvc.parent.iterdir()] == [rvc.name]
@@ -0,0 +1,83 @@
+import pickle
+import queue
+import random
+import threading
+import time
+
+import pytest
+
+import chunked_map
+import map_registry
+import rover
+
+
+@pytest.fixture
+def no_cache(package_dir, monkeypatch):
+    monkeypatch.setattr(rover, "PROGRAM_CACHE_DIR", None)
+
+
+def test_default_rover_pickles(no_cache):
+    # multiprocessing pickles the rover to start wait_for_command under spawn
+    r = rover.Rover("Rover1", output="null")
+    copy = pickle.loads(pickle.dumps(r))
+    assert (copy.name, copy.pos_x, copy.pos_y, copy.direction) == (r.name, r.pos_x, r.pos_y, r.direction)
+    assert copy.rng is None
+
+
+def test_rover_with_its_own_rng_pickles(no_cache):
+    r = rover.Rover("Rover1", output="null", rng=random.Random(4))
+    copy = pickle.loads(pickle.dumps(r))
+    assert copy.rng.random() == r.rng.random()
+
+
+def test_own_rng_leaves_the_random_module_alone(no_cache):
+    random.seed(9)
+    state = random.getstate()
+    first = rover.Rover("Rover1", output="null", rng=random.Random(4))
+    second = rover.Rover("Rover1", output="null", rng=random.Random(4))
+    assert random.getstate() == state
+    assert (first.pos_x, first.pos_y, first.direction) == (second.pos_x, second.pos_y, second.direction)
+
+
+def test_command_file_is_made_when_watched(no_cache, tmp_path, monkeypatch):
+    path = tmp_path / "Rover1.txt"
+    monkeypatch.setitem(rover.ROVER_COMMAND_FILES, "Rover1", path)
+    rover.clear_command_files()
+    assert not path.exists()
+
+    r = rover.Rover("Rover1", output="null")
+    received = queue.Queue()
+    threading.Thread(
+        target=r.watch_command_file,
+        args=(lambda command, reply: received.put(command),),
+        daemon=True,
+    ).start()
+    deadline = time.monotonic() + 10
+    while not path.exists():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    rover.write_command("Rover1", "{ rover . info ; }")
+    assert received.get(timeout=10) == "{ rover . info ; }"
+
+
+def test_switching_away_from_a_chunk_file_saves_and_closes_it(no_cache, tmp_path, monkeypatch):
+    source = tmp_path / "map.txt"
+    source.write_text("XXXXXX\nX    X\nX    X\nXXXXXX\n")
+    path = tmp_path / "world.chunks"
+    chunked_map.convert(source, path, chunk_size=2)
+    maps = map_registry.MapRegistry()
+    maps.register(1, source)
+    monkeypatch.setattr(rover, "MAPS", maps)
+
+    r = rover.Rover("Rover1", output="null", mapfile=path)
+    old = r.map
+    assert isinstance(old, chunked_map.ChunkedMap)
+    old.set(0, 0, "C")
+    r.switch_map(1)
+    assert old.file.closed
+
+    m = chunked_map.ChunkedMap(path)
+    try:
+        assert m.get(0, 0) == "C"
+    finally:
+        m.close()
@@ -0,0 +1,54 @@
+import random
+
+import pytest
+
+import compiler
+import simulate
+import vm
+
+LOOP = "{ int x ; x = 0 ; while ( x < 5 ) { x = x + 1 ; } }"
+RUNAWAY = "{ int x ; x = 0 ; while ( true ) { x = x + 1 ; } }"
+DRILL = "{ int i ; i = 0 ; while ( i < 4 ) { rover . drill ; rover . turnLeft ; i = i + 1 ; } }"
+
+
+def test_loop_budget_counts_iterations():
+    program = compiler.compile_source(LOOP)
+    list(vm.steps(program, None, max_iterations=5))
+    with pytest.raises(vm.LoopLimitError):
+        list(vm.steps(program, None, max_iterations=4))
+
+
+def test_runaway_loop_is_stopped(package_dir, monkeypatch):
+    monkeypatch.setattr(simulate, "MAX_ITERATIONS", 1000)
+    summaries = simulate.simulate(RUNAWAY, seeds=3, workers=1)
+    assert [s["ok"] for s in summaries] == [False] * 3
+    assert all("LoopLimitError" in s["error"] for s in summaries)
+
+
+def test_runaway_loop_is_stopped_in_the_pool(package_dir, monkeypatch):
+    monkeypatch.setattr(simulate, "MAX_ITERATIONS", 1000)
+    monkeypatch.setattr(simulate, "PARALLEL_MIN_SEEDS", 1)
+    summaries = simulate.simulate(RUNAWAY, seeds=4, workers=2)
+    assert [s["seed"] for s in summaries] == [0, 1, 2, 3]
+    assert not any(s["ok"] for s in summaries)
+
+
+def test_feature_budget(package_dir):
+    summaries = simulate.simulate(DRILL, seeds=1, workers=1, max_features=3)
+    assert summaries[0]["features"] == 3
+    assert summaries[0]["error"] == "Stopped after 3 features"
+
+
+def test_global_random_state_is_left_alone(package_dir):
+    random.seed(403)
+    state = random.getstate()
+    simulate.simulate(DRILL, seeds=5, workers=1)
+    assert random.getstate() == state
+
+
+def test_runs_are_repeatable(package_dir):
+    first = simulate.simulate(DRILL, seeds=[7, 8], workers=1)
+    random.seed(1)
+    second = simulate.simulate(DRILL, seeds=[8, 7], workers=1)
+    assert first == second[::-1]
+    assert first[0]["ok"] and first[0]["features"] == 8
@@ -0,0 +1,80 @@
+import random
+
+import pytest
+
+import rover
+from grid import Grid
+
+MAP = [
+    "XXXXXXX",
+    "X  D  X",
+    "XXXXXXX",
+]
+
+
+def scanned(m, tile):
+    # Where the tiles really are, read from the buffer without the index
+    return [divmod(i, m.stride) for i in m.scan(ord(tile))]
+
+
+def assert_index_matches(m):
+    for tile in "DWC":
+        assert m.find(tile) == scanned(m, tile)
+        assert m.count(tile) == len(scanned(m, tile))
+
+
+def test_index_is_built_on_first_use_and_kept_up_to_date():
+    m = Grid(7, 3, bytearray("".join(MAP).encode("ascii")))
+    assert m.positions == {}
+    assert m.find("D") == [(1, 3)]
+    assert set(m.positions) == {ord("D")}
+
+    m.set(1, 1, "D")
+    m.set(1, 3, "X")
+    m.set(1, 5, "W")
+    assert m.find("D") == [(1, 1)]
+    assert_index_matches(m)
+
+
+def test_unindexed_tiles_are_scanned():
+    m = Grid(7, 3, bytearray("".join(MAP).encode("ascii")))
+    assert m.count(" ") == 4
+    assert ord(" ") not in m.positions
+
+
+@pytest.fixture
+def corridor_rover(package_dir, tmp_path, monkeypatch):
+    monkeypatch.setattr(rover, "PROGRAM_CACHE_DIR", None)
+    path = tmp_path / "map.txt"
+    path.write_text("\n".join(MAP) + "\n")
+    r = rover.Rover("Rover1", output="null", mapfile=path, rng=random.Random(1))
+    # Face east from the west end of the corridor
+    r.map.set(r.pos_x, r.pos_y, " ")
+    r.pos_x, r.pos_y, r.direction = 1, 1, 1
+    r.map.set(1, 1, r.roverchar())
+    for tile in "DWC":
+        r.map.count(tile)
+    return r
+
+
+def test_rover_features_keep_the_index_up_to_date(corridor_rover):
+    r = corridor_rover
+    m = r.map
+
+    r.cache_make()
+    assert m.find("C") == [(1, 2)]
+    r.bomb()
+    assert m.find("C") == []
+
+    r.waypoint_set()
+    r.move_tile()
+    assert (r.pos_x, r.pos_y) == (1, 2)
+    assert m.find("W") == [(1, 1)]
+
+    r.drill()
+    assert m.find("D") == [] and len(r.inventory) == 1
+
+    r.moveto_waypoint()
+    assert (r.pos_x, r.pos_y) == (1, 1)
+    assert m.find("W") == []
+    assert_index_matches(m)
@@ -0,0 +1,126 @@
+import multiprocessing.connection
+import os
+import stat
+import sys
+import threading
+
+import pytest
+
+import transport
+
+pytestmark = pytest.mark.skipif(sys.platform == "win32", reason="Unix sockets only")
+
+
+@pytest.fixture
+def socket_dir(tmp_path, monkeypatch):
+    path = tmp_path / "sockets"
+    monkeypatch.setattr(transport, "SOCKET_DIR", path)
+    return path
+
+
+def start_listener(on_command):
+    listener = transport.CommandListener("Rover1", on_command)
+    listener.start()
+    return listener
+
+
+def test_command_is_acked_then_done(socket_dir):
+    received = []
+
+    def on_command(command, reply):
+        received.append(command)
+        threading.Thread(target=reply, args=(False, "boom")).start()
+        return 7, 1
+
+    listener = start_listener(on_command)
+    try:
+        with transport.connect("Rover1") as conn:
+            replies = list(transport.send_command(conn, "Rover1", "{ }"))
+    finally:
+        listener.close()
+
+    assert received == ["{ }"]
+    assert replies == [
+        {"status": "ack", "seq": 7, "queued": 1},
+        {"status": "done", "ok": False, "error": "boom"},
+    ]
+
+
+def test_socket_dir_is_private(socket_dir):
+    listener = transport.listen("Rover1")
+    listener.close()
+    info = os.lstat(socket_dir)
+    assert stat.S_ISDIR(info.st_mode)
+    assert stat.S_IMODE(info.st_mode) == 0o700
+
+
+def test_socket_dir_others_can_open_is_refused(socket_dir):
+    socket_dir.mkdir(mode=0o755)
+    os.chmod(socket_dir, 0o755)
+    with pytest.raises(PermissionError):
+        transport.listen("Rover1")
+    with pytest.raises(PermissionError):
+        transport.connect("Rover1")
+
+
+def test_socket_dir_symlink_is_refused(socket_dir, tmp_path):
+    target = tmp_path / "elsewhere"
+    target.mkdir(mode=0o700)
+    socket_dir.symlink_to(target)
+    with pytest.raises(PermissionError):
+        transport.listen("Rover1")
+
+
+def test_pickles_are_not_accepted(socket_dir):
+    calls = []
+    listener = start_listener(lambda command, reply: calls.append(command))
+    try:
+        with multiprocessing.connection.Client(transport.rover_address("Rover1")) as conn:
+            # a pickled message instead of JSON gets the connection closed
+            conn.send({"rover": "Rover1", "command": "{ }"})
+            with pytest.raises(EOFError):
+                conn.recv_bytes()
+    finally:
+        listener.close()
+    assert calls == []
+
+
+@pytest.mark.parametrize("message", [
+    [1, 2],
+    {"rover": "Rover1"},
+    {"rover": "Rover1", "command": 3},
+    {"rover": ["Rover1"], "command": "{ }"},
+])
+def test_malformed_messages_are_dropped(socket_dir, message):
+    calls = []
+    listener = start_listener(lambda command, reply: calls.append(command))
+    try:
+        with transport.connect("Rover1") as conn:
+            transport.send(conn, message)
+            with pytest.raises(EOFError):
+                conn.recv_bytes()
+    finally:
+        listener.close()
+    assert calls == []
+
+
+
+def test_closed_before_done_raises(socket_dir):
+    listener = transport.listen("Rover1")
+
+    def ack_and_hang_up():
+        with listener.accept() as conn:
+            transport.receive(conn)
+            transport.send(conn, {"status": "ack", "seq": 1, "queued": 1})
+
+    thread = threading.Thread(target=ack_and_hang_up)
+    thread.start()
+    try:
+        with transport.connect("Rover1") as conn:
+            replies = transport.send_command(conn, "Rover1", "{ }")
+            assert next(replies)["status"] == "ack"
+            with pytest.raises(ConnectionError):
+                next(replies)
+    finally:
+        thread.join()
+        listener.close()
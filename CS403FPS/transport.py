@@ -0,0 +1,207 @@
+"""
+Local IPC channel between the controller (main.py) and the rovers.
+
+Each rover listens on its own Unix domain socket (a named pipe on
+Windows). The controller connects, sends the command and gets two
+replies back on the same connection: an acknowledgement as soon as
+the rover has queued the command, then the completion status once it
+ran.
+
+When the rovers run under the fleet supervisor (fleet.py) the
+controller talks to the supervisor's socket instead, which routes the
+command to the rover named in the message.
+
+Messages are JSON objects, sent with send_bytes so nothing received
+is ever unpickled:
+
+    controller -> rover   {"rover": <rover name>, "command": <program source>}
+    rover -> controller   {"status": "ack", "seq": <int>, "queued": <int>}
+                          {"status": "done", "ok": <bool>, "error": <str or None>}
+
+seq is the command's sequence number on that rover and queued how many
+commands are waiting to run, including this one.
+
+The sockets live in a directory only the user running the rovers can
+get into. It is created with mode 0700, and one that already exists is
+refused unless it is a real directory owned by that user that nobody
+else can open.
+"""
+import json
+import multiprocessing.connection
+import os
+import pathlib
+import stat
+import sys
+import tempfile
+import threading
+
+# Directory holding the rover sockets, one per user, kept short since
+# Unix socket paths are limited to ~100 characters
+if hasattr(os, "getuid"):
+    SOCKET_DIR = pathlib.Path(tempfile.gettempdir(), f"cs403-rovers-{os.getuid()}")
+else:
+    SOCKET_DIR = pathlib.Path(tempfile.gettempdir(), "cs403-rovers")
+
+# Longest message accepted, commands are program source
+MAX_MESSAGE_BYTES = 1 << 20
+
+# Name the fleet supervisor listens under
+FLEET = "fleet"
+
+
+def check_socket_dir():
+    """Raises PermissionError unless SOCKET_DIR is private to this user."""
+    info = os.lstat(SOCKET_DIR)
+    if not stat.S_ISDIR(info.st_mode):
+        raise PermissionError(f"{SOCKET_DIR} is not a directory")
+    if info.st_uid != os.getuid():
+        raise PermissionError(f"{SOCKET_DIR} belongs to another user")
+    if info.st_mode & 0o077:
+        raise PermissionError(
+            f"{SOCKET_DIR} can be opened by other users (mode {stat.S_IMODE(info.st_mode):o})"
+        )
+
+
+def make_socket_dir():
+    try:
+        # mkdir applies the umask, which can only take permissions away
+        SOCKET_DIR.mkdir(mode=0o700)
+    except FileExistsError:
+        pass
+    check_socket_dir()
+
+
+def send(conn, message):
+    conn.send_bytes(json.dumps(message).encode())
+
+
+def receive(conn):
+    """Returns the next message on conn, raises ValueError for anything but a JSON object."""
+    message = json.loads(conn.recv_bytes(MAX_MESSAGE_BYTES))
+    if not isinstance(message, dict):
+        raise ValueError(f"expected a JSON object, got {type(message).__name__}")
+    return message
+
+
+def rover_address(rover_name):
+    if sys.platform == "win32":
+        return rf"\\.\pipe\cs403-{rover_name}"
+    return str(pathlib.Path(SOCKET_DIR, f"{rover_name}.sock"))
+
+
+def connect(rover_name):
+    """Connects to a rover, raises OSError if it isn't listening."""
+    if sys.platform != "win32":
+        check_socket_dir()
+    return multiprocessing.connection.Client(rover_address(rover_name))
+
+
+def listen(name):
+    """Returns a Listener on the address for name."""
+    address = rover_address(name)
+    if sys.platform != "win32":
+        make_socket_dir()
+        # A rover that crashed leaves its socket file behind
+        if os.path.exists(address):
+            os.unlink(address)
+    return multiprocessing.connection.Listener(address)
+
+
+def send_command(conn, rover_name, command):
+    """Sends a command on a connection made by connect() and yields every
+    reply the rover sends back, up to the completion status.
+
+    Raises OSError (ConnectionError when it was closed cleanly) if the
+    connection is lost before the command is done. By then the command
+    may have been queued or run, so it must not be sent again.
+    """
+    send(conn, {"rover": rover_name, "command": command})
+    while True:
+        try:
+            reply = receive(conn)
+        except EOFError:
+            raise ConnectionError(
+                f"the connection closed before {rover_name} finished the command"
+            ) from None
+        yield reply
+        if reply["status"] != "ack":
+            return
+
+
+class CommandListener:
+    """Accepts commands for one rover on a background thread.
+
+    Every received command is handed to on_command(command, reply),
+    which queues it and returns its sequence number and the queue
+    depth for the acknowledgement. reply(ok, error) sends the
+    completion status back to the controller once it ran.
+    Subclasses can override dispatch() to look at the whole message,
+    raising LookupError rejects the command.
+    """
+
+    def __init__(self, rover_name, on_command):
+        self.rover_name = rover_name
+        self.on_command = on_command
+        self.listener = listen(rover_name)
+        self.thread = threading.Thread(
+            target=self.accept_commands, name=f"{rover_name}-listener", daemon=True
+        )
+
+    def start(self):
+        self.thread.start()
+
+    def accept_commands(self):
+        while True:
+            try:
+                conn = self.listener.accept()
+            except OSError:
+                # The listener was closed
+                return
+            try:
+                message = receive(conn)
+                if not isinstance(message.get("command"), str):
+                    raise ValueError("the message has no command")
+                if not isinstance(message.get("rover", ""), str):
+                    raise ValueError("the rover name isn't a string")
+            except (EOFError, OSError, ValueError):
+                conn.close()
+                continue
+
+            # Blocks while the rover's queue is full, the controller
+            # just waits a little longer for its acknowledgement
+            acked = threading.Event()
+            try:
+                seq, queued = self.dispatch(message, self.replier(conn, acked))
+            except LookupError as e:
+                try:
+                    send(conn, {"status": "done", "ok": False, "error": str(e)})
+                except OSError:
+                    pass
+                conn.close()
+                continue
+            try:
+                send(conn, {"status": "ack", "seq": seq, "queued": queued})
+            except OSError:
+                pass
+            finally:
+                acked.set()
+
+    def dispatch(self, message, reply):
+        return self.on_command(message["command"], reply)
+
+    @staticmethod
+    def replier(conn, acked):
+        def reply(ok, error=None):
+            # A quick command can finish before its ack went out
+            acked.wait()
+            try:
+                send(conn, {"status": "done", "ok": ok, "error": error})
+            except OSError:
+                # The controller went away, nobody to tell
+                pass
+            finally:
+                conn.close()
+        return reply
+
+    def close(self):
+        self.listener.close()
@@ -0,0 +1,317 @@
+"""
+VM that runs the bytecode made by compiler.compile_program.
+
+Before a program runs, every instruction is turned into a small closure
+that does its work and returns the index of the next instruction, so
+the dispatch loop is just `pc = ops[pc]()` and never compares opcodes.
+The bytecode itself stays plain data, which is what .rvc files hold.
+
+steps() is a generator that yields after every rover feature (and
+switch_map), run() just drives it to the end while run_async() hands
+control back to the event loop at each of those points so many rovers
+can share one thread.
+"""
+import asyncio
+
+from compiler import OPNAMES
+from parser_components import BINARY_OPERATORS, UNARY_OPERATORS, new_array
+
+BINARY_FUNCS = tuple(func for _, func in BINARY_OPERATORS)
+UNARY_FUNCS = tuple(func for _, func in UNARY_OPERATORS)
+
+
+def run(program, rover):
+    """Runs a CodeObject against the given rover."""
+    for _ in steps(program, rover):
+        pass
+
+
+async def run_async(program, rover):
+    """Runs a CodeObject, letting other tasks run after every feature."""
+    for _ in steps(program, rover):
+        await asyncio.sleep(0)
+
+
+class LoopLimitError(RuntimeError):
+    pass
+
+
+def steps(program, rover, max_iterations=None):
+    """Runs a CodeObject, yielding after every feature the rover performs.
+
+    With max_iterations set, raises LoopLimitError once the program's
+    loops have gone round that many times in total, so a loop that never
+    calls a feature can't hang the caller.
+    """
+    ops = Machine(program, rover, max_iterations).ops
+    end = len(ops)
+    pc = 0
+    while pc < end:
+        pc = ops[pc]()
+        # Features return the next index inverted, to be yielded at
+        if pc < 0:
+            pc = ~pc
+            yield
+
+
+class Machine:
+    """The frame of one run of a program and the closures that work on it.
+
+    Each op_<NAME> method returns the closure for one instruction, given
+    its argument and the index of the instruction after it.
+    """
+
+    def __init__(self, program, rover, max_iterations=None):
+        self.rover = rover
+        self.slots = [None] * program.nslots
+        self.stack = []
+        self.features = [getattr(rover, name) for name in program.features]
+        self.max_iterations = max_iterations
+        # Only taken on the jump back to the top of a loop
+        self.iterations_left = max_iterations
+        self.ops = [
+            getattr(self, f"op_{OPNAMES[op]}")(arg, pc + 1)
+            for pc, (op, arg) in enumerate(program.code)
+        ]
+
+    def op_LOAD_CONST(self, const, nxt):
+        push = self.stack.append
+
+        def run():
+            push(const)
+            return nxt
+        return run
+
+    def op_LOAD(self, slot, nxt):
+        slots = self.slots
+        push = self.stack.append
+
+        def run():
+            push(slots[slot])
+            return nxt
+        return run
+
+    def op_STORE(self, slot, nxt):
+        slots = self.slots
+        pop = self.stack.pop
+
+        def run():
+            slots[slot] = pop()
+            return nxt
+        return run
+
+    def op_STORE_INT(self, slot, nxt):
+        slots = self.slots
+        pop = self.stack.pop
+
+        def run():
+            slots[slot] = int(pop())
+            return nxt
+        return run
+
+    def op_LOAD_ELEM(self, arg, nxt):
+        slot, ndims = arg
+        slots = self.slots
+        stack = self.stack
+
+        def run():
+            indices = stack[-ndims:]
+            del stack[-ndims:]
+            item = slots[slot]
+            for i in indices:
+                item = item[i]
+            stack.append(item)
+            return nxt
+        return run
+
+    def op_STORE_ELEM(self, arg, nxt):
+        slot, ndims, is_int = arg
+        slots = self.slots
+        stack = self.stack
+
+        def run():
+            val = stack.pop()
+            if is_int:
+                val = int(val)
+            indices = stack[-ndims:]
+            del stack[-ndims:]
+            item = slots[slot]
+            for i in indices[:-1]:
+                item = item[i]
+            item[indices[-1]] = val
+            return nxt
+        return run
+
+    def op_INIT(self, slot, nxt):
+        slots = self.slots
+
+        def run():
+            slots[slot] = None
+            return nxt
+        return run
+
+    def op_INIT_ARRAY(self, arg, nxt):
+        slot, dims = arg
+        slots = self.slots
+
+        def run():
+            slots[slot] = new_array(dims)
+            return nxt
+        return run
+
+    def op_BINARY(self, index, nxt):
+        func = BINARY_FUNCS[index]
+        stack = self.stack
+        pop = stack.pop
+
+        def run():
+            right = pop()
+            stack[-1] = func(stack[-1], right)
+            return nxt
+        return run
+
+    def op_BINARY_CONST(self, arg, nxt):
+        index, const = arg
+        func = BINARY_FUNCS[index]
+        stack = self.stack
+
+        def run():
+            stack[-1] = func(stack[-1], const)
+            return nxt
+        return run
+
+    def op_LOAD_BINARY_CONST(self, arg, nxt):
+        slot, index, const = arg
+        func = BINARY_FUNCS[index]
+        slots = self.slots
+        push = self.stack.append
+
+        def run():
+            push(func(slots[slot], const))
+            return nxt
+        return run
+
+    def op_UNARY(self, index, nxt):
+        func = UNARY_FUNCS[index]
+        stack = self.stack
+
+        def run():
+            stack[-1] = func(stack[-1])
+            return nxt
+        return run
+
+    def op_JUMP(self, target, nxt):
+        if target >= nxt or self.max_iterations is None:
+            return lambda: target
+
+        def run():
+            self.iterations_left -= 1
+            if self.iterations_left < 0:
+                raise LoopLimitError(f"Stopped after {self.max_iterations} loop iterations")
+            return target
+        return run
+
+    def op_JUMP_IF_FALSE(self, target, nxt):
+        pop = self.stack.pop
+
+        def run():
+            return nxt if pop() else target
+        return run
+
+    def op_FEATURE(self, index, nxt):
+        feature = self.features[index]
+
+        def run():
+            feature()
+            return ~nxt
+        return run
+
+    def op_SWITCH_MAP(self, number, nxt):
+        rover = self.rover
+
+        def run():
+            rover.switch_map(number)
+            return ~nxt
+        return run
+
+    def op_TEST_CONST_JUMP(self, arg, nxt):
+        slot, index, const, target = arg
+        func = BINARY_FUNCS[index]
+        slots = self.slots
+
+        def run():
+            return nxt if func(slots[slot], const) else target
+        return run
+
+    def op_BINARY_CONST_STORE(self, arg, nxt):
+        slot, index, const, target, is_int = arg
+        func = BINARY_FUNCS[index]
+        slots = self.slots
+
+        if is_int:
+            def run():
+                slots[target] = int(func(slots[slot], const))
+                return nxt
+        else:
+            def run():
+                slots[target] = func(slots[slot], const)
+                return nxt
+        return run
+
+    def op_INCREMENT(self, arg, nxt):
+        slot, const = arg
+        slots = self.slots
+
+        def run():
+            slots[slot] += const
+            return nxt
+        return run
+
+    def op_LOAD_BINARY(self, arg, nxt):
+        slot, index, right = arg
+        func = BINARY_FUNCS[index]
+        slots = self.slots
+        push = self.stack.append
+
+        def run():
+            push(func(slots[slot], slots[right]))
+            return nxt
+        return run
+
+    def op_TEST_JUMP(self, arg, nxt):
+        slot, index, right, target = arg
+        func = BINARY_FUNCS[index]
+        slots = self.slots
+
+        def run():
+            return nxt if func(slots[slot], slots[right]) else target
+        return run
+
+    def op_BINARY_STORE(self, arg, nxt):
+        slot, index, right, target, is_int = arg
+        func = BINARY_FUNCS[index]
+        slots = self.slots
+
+        if is_int:
+            def run():
+                slots[target] = int(func(slots[slot], slots[right]))
+                return nxt
+        else:
+            def run():
+                slots[target] = func(slots[slot], slots[right])
+                return nxt
+        return run
+
+    def op_MOVE(self, arg, nxt):
+        slot, target, is_int = arg
+        slots = self.slots
+
+        if is_int:
+            def run():
+                slots[target] = int(slots[slot])
+                return nxt
+        else:
+            def run():
+                slots[target] = slots[slot]
+                return nxt
+        return run